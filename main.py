@@ -1,20 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # main.py
-import getpass
 import sqlite3
 import sys
 from typing import Tuple
 
+from src.buha.scripts.catalog import find_company
+from src.buha.scripts.database import open_company_database
 from src.buha.scripts.helpers import check_databases
 from src.buha.scripts.helpers import state_company
 from src.buha.scripts.helpers import path_to_database
+from src.buha.scripts.helpers import add_to_catalog
 from src.buha.scripts.helpers import check_for_matches
 from src.buha.scripts.helpers import clear_screen
 from src.buha.scripts.helpers import continue_
 from src.buha.scripts.helpers import Menu
+from src.buha.scripts.helpers import Navigation
 from src.buha.scripts.login import LoginMenu
-from src.buha.scripts.person import MenuNewPerson as NewPerson
 from src.buha.scripts.start import MenuStart
 
 
@@ -60,8 +62,11 @@ def initialize() -> Tuple[sqlite3.Connection, str, str]:
     if targets == []:   # no database found --> first database
         return setup_new_company(company_name, language)
     else:
-        # check for typos -> return best match
-        match = check_for_matches(company_name, targets, language)
+        # exact match (ignoring case) -> no fuzzy matching needed
+        match = find_company(company_name, targets)
+        if match is None:
+            # check for typos -> return best match
+            match = check_for_matches(company_name, targets, language)
 
         # if difference too big --> different/new company
         if match is None:
@@ -75,11 +80,15 @@ def initialize() -> Tuple[sqlite3.Connection, str, str]:
 def setup_new_company(company_name: str, language: str) -> Tuple[sqlite3.Connection, str, str]:  # noqa
     # database will be named after company
     conn = activate_database(company_name)
+    add_to_catalog(company_name)
 
     # Owner of PC does the first database entry
+    import getpass
     created_by = getpass.getuser()
 
     # A first user needs to be created bc otherwise no access to db ...
+    # (imported here: only the first start of a company needs it)
+    from src.buha.scripts.person import MenuNewPerson as NewPerson
     new_person = NewPerson()
     new_person.enter_name(conn, created_by, company_name, language)
 
@@ -88,15 +97,37 @@ def setup_new_company(company_name: str, language: str) -> Tuple[sqlite3.Connect
 
 def activate_database(company_name: str) -> sqlite3.Connection:
     db_path = path_to_database(company_name)
-    conn = sqlite3.connect(db_path)
+    conn = open_company_database(db_path)
 
     return conn
 
 
 def main():
+    if sys.argv[1:2] == ["batch"]:
+        # headless: commands from stdin, no menus (see batch.py)
+        from src.buha.scripts.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["import"]:
+        from src.buha.scripts.importer import main as import_main
+        sys.exit(import_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["bank-import"]:
+        from src.buha.scripts.bank_import import main as bank_import_main
+        sys.exit(bank_import_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["reconcile"]:
+        from src.buha.scripts.reconcile import main as reconcile_main
+        sys.exit(reconcile_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["report"]:
+        from src.buha.scripts.reports import main as report_main
+        sys.exit(report_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["close"]:
+        from src.buha.scripts.closing import main as close_main
+        sys.exit(close_main(sys.argv[2:]))
+
     conn, language, company_name = initialize()
 
-    login_menu = LoginMenu()
+    # one navigation state for all menus of this session
+    navigation = Navigation()
+    login_menu = LoginMenu(navigation)
     authenticated, initials = login_menu.run(conn, language, company_name)
     if 0:
         print("initials: ", initials)
@@ -105,7 +136,7 @@ def main():
         conn.close()
         sys.exit()
     else:
-        menu = MenuStart()
+        menu = MenuStart(navigation)
         menu.run(conn, initials, company_name, language)
 
 
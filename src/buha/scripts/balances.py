@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# balances.py
+"""Running balances: debit and credit per account and period in the table
+"account_balances". Every posting adds its lines in the same transaction
+(see journal.write_entries), so a balance is one lookup by primary key
+instead of a sum over all journal lines of the account.
+
+Posted entries are never changed, corrections are posted as new entries;
+rebuild_balances() sums the journal up from scratch nonetheless and
+verify_balances() compares both."""
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from .database import UnitOfWork
+
+
+Totals = Dict[Tuple[int, int], List[int]]  # (account_id, period_id) -> [debit, credit]  # noqa
+
+sum_journal = """SELECT l.account_id, e.period_id,
+                        SUM(MAX(l.amount, 0)), SUM(MAX(-l.amount, 0))
+                 FROM journal_lines AS l
+                 JOIN journal_entries AS e ON e.entry_id = l.entry_id
+                 GROUP BY l.account_id, e.period_id"""
+
+
+@dataclass
+class Balance():
+    number: str
+    name: str
+    kind: str
+    debit: int  # cents
+    credit: int  # cents
+
+    @property
+    def balance(self) -> int:
+        return self.debit - self.credit
+
+
+def add_to_totals(totals: Totals, account_id: int, period_id: int,
+                  amount: int) -> None:
+    debit_credit = totals.setdefault((account_id, period_id), [0, 0])
+    if amount > 0:
+        debit_credit[0] = debit_credit[0] + amount
+    else:
+        debit_credit[1] = debit_credit[1] - amount
+
+
+def add_to_balances(cur: sqlite3.Cursor, totals: Totals) -> None:
+    """One upsert per account and period of a chunk, not one per line."""
+    upsert = """INSERT INTO account_balances (
+                account_id, period_id, debit, credit)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (account_id, period_id) DO UPDATE SET
+                    debit = debit + excluded.debit,
+                    credit = credit + excluded.credit"""
+    cur.executemany(upsert, [(account_id, period_id, debit, credit)
+                             for (account_id, period_id), (debit, credit)
+                             in totals.items()])
+
+
+def account_balance(conn: sqlite3.Connection, number: str,
+                    period_id: int | None = None) -> int:
+    """Balance in cents of an account, of all periods if "period_id" is None."""  # noqa
+    query = """SELECT COALESCE(SUM(b.debit - b.credit), 0)
+               FROM accounts AS a
+               JOIN account_balances AS b ON b.account_id = a.account_id
+               WHERE a.number = ?"""
+    params: Tuple = (number,)
+    if period_id is not None:
+        query = query + " AND b.period_id = ?"
+        params = (number, period_id)
+    cur = conn.cursor()
+    return cur.execute(query, params).fetchone()[0]
+
+
+def period_balances(conn: sqlite3.Connection,
+                    period_id: int) -> List[Balance]:
+    """The accounts with postings in a period, by number: a trial balance."""
+    query = """SELECT a.number, a.name, a.kind, b.debit, b.credit
+               FROM account_balances AS b
+               JOIN accounts AS a ON a.account_id = b.account_id
+               WHERE b.period_id = ?
+               ORDER BY a.number"""
+    cur = conn.cursor()
+    return [Balance(*row) for row in cur.execute(query, (period_id,))]
+
+
+def rebuild_balances(conn: sqlite3.Connection) -> None:
+    """Throw the running balances away and sum up the journal again."""
+    with UnitOfWork(conn) as cur:
+        cur.execute("DELETE FROM account_balances")
+        cur.execute(f"""INSERT INTO account_balances (
+                        account_id, period_id, debit, credit)
+                        {sum_journal}""")
+
+
+def verify_balances(conn: sqlite3.Connection) -> List[Tuple]:
+    """
+    (account_id, period_id, stored, summed up) for every balance that does
+    not match the journal, [] if all is well.
+    """
+    cur = conn.cursor()
+    stored = {row[:2]: row[2:] for row in cur.execute(
+        "SELECT account_id, period_id, debit, credit FROM account_balances")}
+    summed = {row[:2]: row[2:] for row in cur.execute(sum_journal)}
+    return [(*key, stored.get(key), summed.get(key))
+            for key in sorted(stored.keys() | summed.keys())
+            if stored.get(key) != summed.get(key)]
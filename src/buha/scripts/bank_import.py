@@ -0,0 +1,488 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# bank_import.py
+"""Import bank statements into "bank_transactions":
+
+    BUHA_PASSWORD=... python main.py bank-import --company X --user ab \\
+        statement.xml
+
+CAMT.053 (.xml), MT940 (.sta, .mt940, .940) and bank CSV (.csv) are read
+by generators: CAMT with iterparse, every entry is removed from the tree
+once it is read, MT940 and CSV line by line. Memory does not grow with the
+size of the file.
+
+Every transaction gets a key, the SHA-256 of the fields that identify it
+and of how often the same fields came before in this run: two equal coffee
+purchases on one day are two transactions, the same statement imported
+again (or two statements that overlap) adds nothing. The transactions are
+written in chunks, one transaction of the database per chunk, with
+executemany and ON CONFLICT (txn_key) DO NOTHING."""
+import csv
+import datetime
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+from .database import UnitOfWork
+from .journal import cents
+
+
+CHUNK_SIZE = 5000
+
+formats = {
+    ".xml": "camt",
+    ".sta": "mt940",
+    ".mt940": "mt940",
+    ".940": "mt940",
+    ".csv": "csv",
+}
+
+
+class StatementError(Exception):
+    """A transaction of a statement that cannot be read."""
+
+
+@dataclass
+class Transaction():
+    account: str | None  # IBAN or bank code/account number
+    booking_date: str  # "YYYY-MM-DD"
+    amount: int  # cents, credit > 0, debit < 0
+    currency: str = "EUR"
+    value_date: str | None = None
+    counterparty: str | None = None
+    counterparty_account: str | None = None
+    purpose: str | None = None
+    reference: str | None = None
+
+
+# (position in the file, the transaction or why it cannot be read)
+Parsed = Tuple[int, Transaction | StatementError]
+
+
+@dataclass
+class BankImportReport():
+    imported: int = 0
+    duplicates: int = 0
+    # (position, reason)
+    rejected: List[Tuple[int, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.seconds:
+            return 0.0
+        return (self.imported + self.duplicates) / self.seconds
+
+    def __str__(self) -> str:
+        return (f"{self.imported} imported, {self.duplicates} duplicates, "
+                f"{len(self.rejected)} rejected, {self.seconds:.2f} s, "
+                f"{self.rows_per_second:.0f} rows/s")
+
+
+def german_date(text: str) -> str:
+    """"01.03.2024" or "01.03.24" -> "2024-03-01", ISO dates as they are."""
+    text = text.strip()
+    if "." not in text:
+        return datetime.date.fromisoformat(text[:10]).isoformat()
+    day, month, year = text.split(".")
+    if len(year) == 2:
+        year = "20" + year
+    return datetime.date(int(year), int(month), int(day)).isoformat()
+
+
+# ######## CAMT.053 ###########################################################
+
+@lru_cache(maxsize=None)
+def qualified(ns: str, path: str) -> str:
+    """("{urn:...camt.053.001.02}", "BookgDt/Dt") -> "{urn:...}BookgDt/{urn:...}Dt"."""  # noqa
+    return "/".join(ns + name for name in path.split("/"))
+
+
+def camt_entry(entry, account: str | None, ns: str) -> Transaction:
+    def text_of(path: str, element=entry) -> str | None:
+        if element is None:
+            return None
+        text = element.findtext(qualified(ns, path))
+        return text.strip() or None if text else None
+
+    amount = entry.find(qualified(ns, "Amt"))
+    if amount is None or amount.text is None:
+        raise StatementError("no amount")
+    value = cents(amount.text)
+    if text_of("CdtDbtInd") == "DBIT":
+        value = -value
+    booked = text_of("BookgDt/Dt") or text_of("BookgDt/DtTm")
+    if booked is None:
+        raise StatementError("no booking date")
+    valued = text_of("ValDt/Dt") or text_of("ValDt/DtTm")
+
+    details = entry.find(qualified(ns, "NtryDtls/TxDtls"))
+    # the other party: the creditor of a debit, the debtor of a credit
+    party = "RltdPties/Cdtr" if value < 0 else "RltdPties/Dbtr"
+    purpose = None
+    if details is not None:
+        purpose = " ".join(e.text.strip() for e in details.iterfind(
+            qualified(ns, "RmtInf/Ustrd")) if e.text)
+    return Transaction(
+        account=account,
+        booking_date=german_date(booked),
+        amount=value,
+        currency=amount.get("Ccy", "EUR"),
+        value_date=german_date(valued) if valued else None,
+        counterparty=(text_of(party + "/Nm", details)
+                      or text_of(party + "/Pty/Nm", details)),
+        counterparty_account=text_of(party + "Acct/Id/IBAN", details),
+        purpose=purpose or text_of("AddtlNtryInf"),
+        reference=(text_of("AcctSvcrRef")
+                   or text_of("Refs/EndToEndId", details)
+                   or text_of("NtryRef")))
+
+
+def read_camt(source) -> Iterator[Parsed]:
+    """The entries ("Ntry") of all statements of a CAMT.053 file."""
+    import xml.etree.ElementTree as ET
+
+    ns = None
+    statement = None
+    account = None
+    position = 0
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if ns is None:
+            # the version of camt.053 is in the namespace, any will do
+            ns = element.tag.partition("}")[0] + "}" if element.tag[0] == "{" else ""  # noqa
+            stmt_tag, acct_tag, ntry_tag = ns + "Stmt", ns + "Acct", ns + "Ntry"  # noqa
+        tag = element.tag
+        if event == "start":
+            if tag == stmt_tag:
+                statement, account = element, None
+        elif tag == ntry_tag:
+            position = position + 1
+            try:
+                yield position, camt_entry(element, account, ns)
+            except (StatementError, ValueError) as e:
+                yield position, StatementError(str(e))
+            # read and done: keeps the tree at the entries read ahead
+            element.clear()
+            if statement is not None:
+                statement.remove(element)
+        elif tag == acct_tag and statement is not None and account is None:
+            account = (element.findtext(qualified(ns, "Id/IBAN"))
+                       or element.findtext(qualified(ns, "Id/Othr/Id")))
+
+
+# ######## MT940 ##############################################################
+
+mt940_line = re.compile(
+    r"(?P<value_date>\d{6})(?P<entry_date>\d{4})?(?P<mark>R?[CD])[A-Z]?"
+    r"(?P<amount>\d+,\d{0,2})[NFS][A-Z0-9]{3}(?P<customer_ref>[^/]*)"
+    r"(?://(?P<bank_ref>.*))?")
+
+# subfields of :86: (German "DFÜ-Abkommen"): ?20-?29, ?60-?63 purpose,
+# ?31 IBAN and ?32, ?33 name of the other party
+purpose_fields = [f"{n}" for n in range(20, 30)] + ["60", "61", "62", "63"]
+
+
+def mt940_fields(lines: Iterable[str]) -> Iterator[Tuple[int, str, str]]:
+    """(line number, tag, value); continuation lines joined to their tag."""
+    tag, value, start = None, "", 0
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        match = re.match(r":(\w{2,3}):", line)
+        if match or line.startswith("-"):
+            if tag is not None:
+                yield start, tag, value
+            tag, value, start = None, "", line_no
+            if match:
+                tag, value = match.group(1), line[match.end():]
+        elif tag is not None:
+            value = value + line
+    if tag is not None:
+        yield start, tag, value
+
+
+def mt940_details(text: str) -> Dict[str, str]:
+    """"166?00GUTSCHRIFT?20SVWZ+Rechnung 1" -> {"00": ..., "20": ...}."""
+    parts = re.split(r"\?(\d{2})", text)
+    return {parts[i]: parts[i + 1] for i in range(1, len(parts) - 1, 2)}
+
+
+def mt940_transaction(line: str, details: str | None, account: str | None,
+                      currency: str) -> Transaction:
+    match = mt940_line.match(line)
+    if match is None:
+        raise StatementError(f"cannot read ':61:{line}'")
+    value_date = datetime.datetime.strptime(match["value_date"],
+                                            "%y%m%d").date()
+    booking_date = value_date
+    if match["entry_date"]:
+        month, day = int(match["entry_date"][:2]), int(match["entry_date"][2:])  # noqa
+        year = value_date.year
+        # booked in December, value in January or the other way round
+        if month == 12 and value_date.month == 1:
+            year = year - 1
+        elif month == 1 and value_date.month == 12:
+            year = year + 1
+        booking_date = datetime.date(year, month, day)
+    amount = cents(match["amount"])
+    if match["mark"] in ("D", "RC"):
+        amount = -amount
+
+    transaction = Transaction(
+        account=account,
+        booking_date=booking_date.isoformat(),
+        amount=amount,
+        currency=currency,
+        value_date=value_date.isoformat(),
+        reference=(match["bank_ref"] or match["customer_ref"]).strip() or None)  # noqa
+    if details:
+        subfields = mt940_details(details)
+        if subfields:
+            purpose = "".join(subfields.get(n, "") for n in purpose_fields)
+            name = subfields.get("32", "") + subfields.get("33", "")
+            transaction.purpose = purpose.strip() or None
+            transaction.counterparty = name.strip() or None
+            transaction.counterparty_account = subfields.get("31") or None
+        else:
+            transaction.purpose = details.strip() or None
+    return transaction
+
+
+def read_mt940(lines: Iterable[str]) -> Iterator[Parsed]:
+    account, currency = None, "EUR"
+    pending = None  # (line number, :61: value), waits for its :86:
+
+    def flush(details):
+        position, line = pending
+        try:
+            return position, mt940_transaction(line, details, account,
+                                               currency)
+        except (StatementError, ValueError) as e:
+            return position, StatementError(str(e))
+
+    for line_no, tag, value in mt940_fields(lines):
+        if tag == "86" and pending is not None:
+            yield flush(value)
+            pending = None
+            continue
+        if pending is not None:
+            yield flush(None)
+            pending = None
+        if tag == "25":
+            account = value.strip()
+        elif tag in ("60F", "60M"):
+            # C/D, YYMMDD, currency, amount
+            currency = value[7:10]
+        elif tag == "61":
+            pending = (line_no, value)
+    if pending is not None:
+        yield flush(None)
+
+
+# ######## CSV ################################################################
+
+# field -> column headers of German banks and the field name itself
+csv_columns = {
+    "account": ("IBAN Auftragskonto", "Auftragskonto", "account"),
+    "booking_date": ("Buchungstag", "Buchungsdatum", "booking_date"),
+    "value_date": ("Valutadatum", "Wertstellung", "value_date"),
+    "amount": ("Betrag", "Umsatz", "amount"),
+    "currency": ("Waehrung", "Währung", "currency"),
+    "counterparty": ("Name Zahlungsbeteiligter",
+                     "Beguenstigter/Zahlungspflichtiger",
+                     "Empfänger/Auftraggeber", "counterparty"),
+    "counterparty_account": ("IBAN Zahlungsbeteiligter", "Kontonummer/IBAN",
+                             "Kontonummer", "counterparty_account"),
+    "purpose": ("Verwendungszweck", "purpose"),
+    "reference": ("Kundenreferenz (End-to-End)", "Referenz", "reference"),
+}
+
+
+def csv_mapping(header: List[str]) -> Dict[str, str]:
+    """field -> the column of "header" that holds it."""
+    mapping = {}
+    for name, candidates in csv_columns.items():
+        for column in candidates:
+            if column in header:
+                mapping[name] = column
+                break
+    missing = {"booking_date", "amount"} - set(mapping)
+    if missing:
+        raise StatementError(f"no column for {', '.join(sorted(missing))}")
+    return mapping
+
+
+def csv_transaction(row: Dict[str, str],
+                    mapping: Dict[str, str]) -> Transaction:
+    values = {name: (row.get(column) or "").strip() or None
+              for name, column in mapping.items()}
+    values.setdefault("account", None)
+    if values["booking_date"] is None or values["amount"] is None:
+        raise StatementError("booking date and amount are required")
+    values["booking_date"] = german_date(values["booking_date"])
+    if values.get("value_date"):
+        values["value_date"] = german_date(values["value_date"])
+    values["amount"] = cents(values["amount"])
+    values["currency"] = values.get("currency") or "EUR"
+    return Transaction(**values)
+
+
+def read_bank_csv(lines: Iterable[str]) -> Iterator[Parsed]:
+    """";" or "," separated, with a header line."""
+    lines = iter(lines)
+    first = next(lines, "")
+    delimiter = ";" if first.count(";") >= first.count(",") else ","
+    reader = csv.DictReader([first], delimiter=delimiter)
+    mapping = csv_mapping(reader.fieldnames or [])
+    reader = csv.DictReader(lines, fieldnames=reader.fieldnames,
+                            delimiter=delimiter)
+    for row in reader:
+        position = reader.line_num + 1
+        try:
+            yield position, csv_transaction(row, mapping)
+        except (StatementError, ValueError) as e:
+            yield position, StatementError(str(e))
+
+
+# ######## writing ############################################################
+
+def identity(transaction: Transaction) -> bytes:
+    fields = (transaction.account, transaction.booking_date,
+              transaction.value_date, transaction.amount,
+              transaction.currency, transaction.counterparty_account,
+              transaction.purpose, transaction.reference)
+    return "\x1f".join("" if f is None else str(f) for f in fields).encode()
+
+
+class TransactionKeys():
+    """SHA-256 of the identity and of how often it came before in this run."""
+
+    def __init__(self) -> None:
+        self.seen: Dict[bytes, int] = {}
+
+    def key(self, transaction: Transaction) -> bytes:
+        base = hashlib.sha256(identity(transaction)).digest()
+        occurrence = self.seen.get(base, 0)
+        self.seen[base] = occurrence + 1
+        if occurrence == 0:
+            return base
+        return hashlib.sha256(base + str(occurrence).encode()).digest()
+
+
+def write_transactions(conn: sqlite3.Connection, created_by: str,
+                       source: str, keyed: List[Tuple[bytes, Transaction]]
+                       ) -> int:
+    """One transaction for the chunk, returns the number of rows added."""
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    add_transaction = """INSERT INTO bank_transactions (
+                         txn_key, account, booking_date, value_date, amount,
+                         currency, counterparty, counterparty_account,
+                         purpose, reference, source, imported_by, timestamp)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                         ON CONFLICT (txn_key) DO NOTHING"""
+    rows = [(key, t.account, t.booking_date, t.value_date, t.amount,
+             t.currency, t.counterparty, t.counterparty_account, t.purpose,
+             t.reference, source, created_by, timestamp)
+            for key, t in keyed]
+    with UnitOfWork(conn) as cur:
+        before = conn.total_changes
+        cur.executemany(add_transaction, rows)
+        return conn.total_changes - before
+
+
+def import_transactions(conn: sqlite3.Connection, created_by: str,
+                        parsed: Iterable[Parsed], source: str,
+                        chunk_size: int = CHUNK_SIZE) -> BankImportReport:
+    report = BankImportReport()
+    start = time.perf_counter()
+    keys = TransactionKeys()
+
+    parsed = iter(parsed)
+    while True:
+        chunk = list(islice(parsed, chunk_size))
+        if not chunk:
+            break
+        keyed = []
+        for position, transaction in chunk:
+            if isinstance(transaction, StatementError):
+                report.rejected.append((position, str(transaction)))
+            else:
+                keyed.append((keys.key(transaction), transaction))
+        if keyed:
+            added = write_transactions(conn, created_by, source, keyed)
+            report.imported = report.imported + added
+            report.duplicates = report.duplicates + len(keyed) - added
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def read_statement(f, kind: str) -> Iterator[Parsed]:
+    if kind == "camt":
+        return read_camt(f)
+    if kind == "mt940":
+        return read_mt940(f)
+    return read_bank_csv(f)
+
+
+# ######## command line #######################################################
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: all read, 1: some rejected, 2: nothing done."""
+    import argparse
+
+    from .batch import open_for_cli
+
+    parser = argparse.ArgumentParser(
+        prog="main.py bank-import",
+        description="Import a CAMT.053, MT940 or CSV bank statement.")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    parser.add_argument("--format", choices=sorted(set(formats.values())),
+                        help="default: by the suffix of the file")
+    parser.add_argument("--encoding", default="utf-8-sig",
+                        help="of MT940 and CSV files, e.g. cp1252")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    kind = args.format or formats.get(args.file.suffix.lower())
+    if kind is None:
+        print(f"Unknown format of {args.file.name}, use --format",
+              file=sys.stderr)
+        return 2
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        if kind == "camt":
+            # bytes: the XML declaration names the encoding
+            f = open(args.file, "rb")
+        else:
+            f = open(args.file, encoding=args.encoding, newline="")
+        with f:
+            report = import_transactions(conn, args.user,
+                                         read_statement(f, kind), kind,
+                                         args.chunk_size)
+    except StatementError as e:
+        print(f"{args.file.name}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        conn.close()
+
+    for position, reason in report.rejected:
+        print(f"{position}: {reason}", file=sys.stderr)
+    print(report)
+    return 1 if report.rejected else 0
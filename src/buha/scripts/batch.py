@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# batch.py
+"""Headless mode for data loads and load tests:
+
+    BUHA_PASSWORD=... python main.py batch --company X --user ab < cmds.jsonl
+
+Every line of stdin is one command as JSON, e.g.
+
+    {"op": "add_person", "first_name": "Tom", "last_name": "Test"}
+    {"op": "update_language", "initials": "tt", "language": "en"}
+
+and every line of stdout is the result of the command in the same line of
+stdin. The same functions as in the menus do the work, but nothing is
+rendered and nothing is asked. Commands are written in chunks, one
+transaction per chunk and a savepoint per command: a failing command is
+reported and skipped, the others are kept. The password hashes of a chunk
+are computed in a process pool before its transaction starts; with the
+"fast" hashing profile thousands of persons per second can be added."""
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import TextIO
+from typing import Tuple
+
+from .database import open_company_database
+from .database import UnitOfWork
+from .hashing import current_params
+from .hashing import HashParams
+from .helpers import get_person_id
+from .helpers import mk_initials
+from .helpers import path_to_database
+from .login import credentials_match
+from .login import load_credentials
+from .names import insert_name
+from .names import name_in_db
+from .onboarding import hash_passwords
+from .person import insert_person
+from .settings import INITIAL_PASSWORD
+from .settings import insert_settings
+from .settings import update_language
+from .settings import write_password
+from .shared import Name
+
+
+CHUNK_SIZE = 1000
+
+
+class BatchError(Exception):
+    """A command that cannot be carried out, e.g. the name exists already."""
+
+
+@dataclass
+class Command():
+    line: int
+    op: str | None
+    args: dict
+    # salt, hash and parameters, computed before the chunk is written
+    credentials: Tuple[bytes, bytes, HashParams] | None = None
+    # set if the line is no valid command
+    error: str | None = None
+
+
+# ######## operations #########################################################
+
+def name_from_args(args: dict) -> Name:
+    if not args.get("first_name") or not args.get("last_name"):
+        raise BatchError("first_name and last_name are required")
+    return Name(args["first_name"], args["last_name"],
+                middle_names=args.get("middle_names"),
+                nickname=args.get("nickname"),
+                previous_name=args.get("previous_name"),
+                suffix=args.get("suffix"),
+                salutation=args.get("salutation"))
+
+
+def person_id_from_args(conn: sqlite3.Connection, args: dict) -> int:
+    person_id = get_person_id(conn, args.get("initials"))
+    if person_id is None:
+        raise BatchError(f"unknown initials '{args.get('initials')}'")
+    return person_id
+
+
+def add_person(conn: sqlite3.Connection, created_by: str,
+               command: Command) -> dict:
+    """Like MenuNewPerson.enter_name, without the questions."""
+    args = command.args
+    name = name_from_args(args)
+    if name_in_db(conn, name):
+        raise BatchError("name already exists")
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    initials = mk_initials(conn, name, 2)
+    person_id = insert_person(conn, created_by, timestamp, name, initials)
+    insert_name(conn, created_by, timestamp, name, person_id)
+    insert_settings(conn, created_by, timestamp, args.get("language", "de"),
+                    person_id, initials, bool(args.get("is_internal", True)),
+                    command.credentials)
+    return {"person_id": person_id, "initials": initials}
+
+
+def change_language(conn: sqlite3.Connection, created_by: str,
+                    command: Command) -> dict:
+    person_id = person_id_from_args(conn, command.args)
+    update_language(conn, command.args["language"], person_id)
+    return {"person_id": person_id}
+
+
+def change_password(conn: sqlite3.Connection, created_by: str,
+                    command: Command) -> dict:
+    """The new password was hashed by prepare_passwords already."""
+    if command.credentials is None:
+        raise BatchError("password is required")
+    person_id = person_id_from_args(conn, command.args)
+    write_password(conn, person_id, command.credentials)
+    return {"person_id": person_id}
+
+
+def find_similar(conn: sqlite3.Connection, created_by: str,
+                 command: Command) -> dict:
+    from .duplicates import find_similar_names
+
+    name = name_from_args(command.args)
+    similar = find_similar_names(conn, name)
+    return {"similar": [{"person_id": match.person_id,
+                         "first_name": match.first_name,
+                         "middle_names": match.middle_names,
+                         "last_name": match.last_name,
+                         "score": match.score} for match in similar]}
+
+
+OPERATIONS: Dict[str, Callable[[sqlite3.Connection, str, Command], dict]] = {
+    "add_person": add_person,
+    "update_language": change_language,
+    "update_password": change_password,
+    "find_similar": find_similar,
+}
+
+
+# ######## running commands ###################################################
+
+def parse_command(line_no: int, line: str) -> Command:
+    try:
+        args = json.loads(line)
+    except ValueError as e:
+        return Command(line_no, None, {}, error=f"no valid JSON: {e}")
+    if not isinstance(args, dict):
+        return Command(line_no, None, {}, error="a command is a JSON object")
+    op = args.pop("op", None)
+    if op not in OPERATIONS:
+        return Command(line_no, op, args, error=f"unknown op '{op}'")
+    return Command(line_no, op, args)
+
+
+def run_command(conn: sqlite3.Connection, created_by: str,
+                command: Command) -> dict:
+    """The result line of one command, in a savepoint of its own."""
+    if command.error is not None:
+        return {"line": command.line, "ok": False, "error": command.error}
+    operation = OPERATIONS[command.op]
+    try:
+        with UnitOfWork(conn):
+            result = operation(conn, created_by, command)
+    except (BatchError, sqlite3.Error, KeyError, TypeError, ValueError) as e:
+        return {"line": command.line, "ok": False,
+                "error": str(e) or type(e).__name__}
+    return {"line": command.line, "ok": True, **result}
+
+
+def chunks(lines: Iterable[str], size: int) -> Iterator[List[Tuple[int, str]]]:  # noqa
+    numbered = ((line_no, line) for line_no, line in enumerate(lines, 1)
+                if line.strip())
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def prepare_passwords(commands: List[Command],
+                      max_workers: int | None) -> None:
+    """
+    Hash the passwords of all "add_person" and "update_password" commands
+    of a chunk at once, before its transaction holds the write lock.
+    """
+    with_password = [command for command in commands
+                     if command.error is None
+                     and (command.op == "add_person"
+                          or (command.op == "update_password"
+                              and "password" in command.args))]
+    if not with_password:
+        return
+    params = current_params()
+    passwords = [str(command.args.get("password", INITIAL_PASSWORD))
+                 for command in with_password]
+    hashes = hash_passwords(passwords, params, max_workers)
+    for command, (salt, password_hash) in zip(with_password, hashes):
+        command.credentials = (salt, password_hash, params)
+
+
+def run_batch(conn: sqlite3.Connection, created_by: str,
+              lines: Iterable[str], out: TextIO,
+              chunk_size: int = CHUNK_SIZE,
+              max_workers: int | None = None) -> int:
+    """Carry out the commands in "lines", returns the number of failures."""
+    failures = 0
+    for chunk in chunks(lines, chunk_size):
+        commands = [parse_command(line_no, line) for line_no, line in chunk]
+        prepare_passwords(commands, max_workers)
+
+        with UnitOfWork(conn):
+            results = [run_command(conn, created_by, command)
+                       for command in commands]
+
+        # written after the commit, a result is never reported too early
+        for result in results:
+            failures = failures + (not result["ok"])
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+    return failures
+
+
+# ######## command line #######################################################
+
+def authenticate(conn: sqlite3.Connection, initials: str,
+                 password: str) -> bool:
+    credentials = load_credentials(conn, initials)
+    if credentials is None or not credentials.is_internal:
+        return False
+    return credentials_match(credentials, password)
+
+
+def company_file(company: str) -> str:
+    """"Becker KG" -> "Becker_KG.db", like state_company."""
+    if company.endswith(".db"):
+        return company
+    return re.sub(" +", "_", company.strip()) + ".db"
+
+
+def open_for_cli(company: str, user: str) -> sqlite3.Connection | None:
+    """
+    The database of "company" with "user" logged in, for the main() of the
+    commands run from the shell. The password comes from BUHA_PASSWORD or
+    from the terminal: stdin may carry the input of the command. None, with
+    the reason on stderr, if there is no such database or the login failed.
+    """
+    db_path = path_to_database(company_file(company))
+    if not db_path.exists():
+        print(f"No company database {db_path.name}", file=sys.stderr)
+        return None
+
+    password = os.environ.get("BUHA_PASSWORD")
+    if password is None:
+        import getpass
+        password = getpass.getpass("Password: ")
+
+    conn = open_company_database(db_path)
+    if not authenticate(conn, user, password):
+        conn.close()
+        print("Login failed", file=sys.stderr)
+        return None
+    return conn
+
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: all commands done, 1: some failed, 2: nothing done."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="main.py batch", description="Run JSON commands from stdin.")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for password hashing")
+    args = parser.parse_args(argv)
+
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        failures = run_batch(conn, args.user, sys.stdin, sys.stdout,
+                             args.chunk_size, args.workers)
+    finally:
+        conn.close()
+    return 1 if failures else 0
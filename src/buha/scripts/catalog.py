@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# catalog.py
+"""The company catalog: the names of the company databases in the data
+directory, kept in "catalog.json" next to them. Looking up a company reads
+this small file instead of walking the directory tree with all its backups.
+
+The catalog also keeps the mtime of the directory when it was written.
+While that is unchanged the file is all that is read. Otherwise the
+directory is listed again (not recursively), but the catalog is only
+replaced when the *.db files differ: every session with WAL creates and
+removes "-wal" and "-shm" files next to the database, which changes the
+mtime without adding a company."""
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+
+CATALOG_FILE = "catalog.json"
+
+
+def path_to_catalog(db_dir: Path) -> Path:
+    return Path(db_dir) / CATALOG_FILE
+
+
+@lru_cache(maxsize=1024)
+def normalize_company(filename: str) -> str:
+    """"Becker_KG.db" and "becker kg" are both "becker kg"."""
+    if filename.endswith(".db"):
+        filename = filename[:-3]
+    return " ".join(filename.replace("_", " ").casefold().split())
+
+
+def list_databases(db_dir: Path) -> List[str]:
+    """The *.db files in "db_dir" itself, subdirectories are not entered."""
+    try:
+        with os.scandir(db_dir) as entries:
+            return sorted(entry.name for entry in entries
+                          if entry.name.endswith(".db") and entry.is_file())
+    except FileNotFoundError:
+        return []
+
+
+def dir_mtime(db_dir: Path) -> int | None:
+    try:
+        return os.stat(db_dir).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def write_catalog(db_dir: Path, companies: List[str],
+                  mtime: int | None) -> None:
+    """Written in place, so writing it does not change the directory."""
+    try:
+        with open(path_to_catalog(db_dir), "w", encoding="utf-8") as f:
+            json.dump({"companies": sorted(set(companies)),
+                       "dir_mtime_ns": mtime}, f, indent=2)
+    except OSError:
+        pass  # read-only data directory: list it every time
+
+
+def read_catalog(db_dir: Path) -> Dict | None:
+    """{"companies": [...], "dir_mtime_ns": ...} or None."""
+    try:
+        with open(path_to_catalog(db_dir), encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data["companies"], list):
+            return None
+        data.setdefault("dir_mtime_ns", None)
+        return data
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def load_companies(db_dir: Path) -> List[str]:
+    # the mtime before listing: a file added meanwhile shows up next time
+    mtime = dir_mtime(db_dir)
+    data = read_catalog(db_dir)
+    if data is not None and mtime is not None \
+            and data["dir_mtime_ns"] == mtime:
+        return data["companies"]
+
+    companies = list_databases(db_dir)
+    if data is None or data["companies"] != companies:
+        write_catalog(db_dir, companies, mtime)
+    return companies
+
+
+def register_company(db_dir: Path, company_name: str) -> None:
+    """Called when a new company database was created."""
+    companies = load_companies(db_dir) + [company_name]
+    write_catalog(db_dir, companies, dir_mtime(db_dir))
+
+
+def company_index(companies: List[str]) -> Dict[str, str]:
+    """Normalized name -> file name."""
+    return {normalize_company(company): company for company in companies}
+
+
+def find_company(company_name: str, companies: List[str]) -> str | None:
+    """Exact match, ignoring case, blanks and underscores."""
+    return company_index(companies).get(normalize_company(company_name))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# change_entry.py
+import sqlite3
+from typing import Any
+from typing import Dict
+
+from .constants import choose_option
+from .constants import edit_conflict
+from .constants import edit_deleted
+from .constants import edit_saved
+from .constants import enter_initials
+from .constants import field_labels
+from .constants import keep_value_hint
+from .constants import languages
+from .constants import not_found
+from .editing import EditConflict
+from .editing import editable
+from .editing import load_row_of_person
+from .editing import Row
+from .editing import update_row
+from .helpers import get_person_id
+from .helpers import Menu
+from .helpers import Navigation
+
+
+class MenuChangeEntry(Menu):
+    """Menu options for changing an entry."""
+
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
+        super().change_menu("change entry")
+
+        self.choices = {
+            "1": "persons",
+            "2": "names",
+            "3": "settings",
+            "9": False
+        }
+
+    def display_menu(self, company_name: str, language: str,
+                     task="change entry") -> None:
+        super().display_menu(company_name, language, task=task)
+
+    def run(self, conn: sqlite3.Connection, created_by: str,
+            company_name: str, language: str) -> None:
+
+        while True:
+            self.display_menu(company_name, language, task="change entry")
+            choice = choose_option(language)
+
+            table = self.choices.get(choice)
+            if not table:
+                break
+            self.change_row(conn, table, language)
+
+        super().go_back()
+
+    def change_row(self, conn: sqlite3.Connection, table: str,
+                   language: str) -> Row | None:
+        """
+        The row is read without a lock; update_row() only writes it if
+        nobody saved it in the meantime.
+        """
+        person_id = get_person_id(conn, enter_initials(language).strip())
+        row = None
+        if person_id is not None:
+            row = load_row_of_person(conn, table, person_id)
+        if row is None:
+            print(not_found[language])
+            return None
+
+        changes = self.ask_changes(row, language)
+        try:
+            row = update_row(conn, row, changes)
+        except EditConflict as e:
+            if e.current is None:
+                print(edit_deleted[language])
+            else:
+                print(edit_conflict[language])
+                self.show_row(e.current, language)
+            return e.current
+        if changes:
+            print(edit_saved[language])
+        return row
+
+    def ask_changes(self, row: Row, language: str) -> Dict[str, Any]:
+        print(keep_value_hint[language])
+        labels = field_labels[language]
+        changes = {}
+        for column in editable[row.table][1]:
+            current = row.values[column]
+            while True:
+                answer = input(f"    {labels[column]} [{display(column, current)}]: ").strip()  # noqa
+                try:
+                    value = parse_value(column, answer) if answer else current
+                    break
+                except ValueError as e:
+                    print(f"    {e}")
+            if value != current:
+                changes[column] = value
+        return changes
+
+    def show_row(self, row: Row, language: str) -> None:
+        labels = field_labels[language]
+        for column, value in row.values.items():
+            print(f"    {labels[column]}: {display(column, value)}")
+
+
+def display(column: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if column == "is_internal":
+        return "y" if value else "n"
+    return str(value)
+
+
+def parse_value(column: str, answer: str) -> Any:
+    """The typed answer as it goes into the column, "-" for NULL."""
+    if answer == "-":
+        if column in ("first_name", "last_name", "language", "is_internal"):
+            raise ValueError(f"{column} cannot be empty")
+        return None
+    if column == "is_internal":
+        return answer.lower() in ("y", "j", "yes", "ja")
+    if column == "language" and answer not in languages:
+        raise ValueError(f"unknown language '{answer}'")
+    return answer
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# chart.py
+"""Standard charts of accounts (SKR03, SKR04) and the account index.
+
+The charts in buha/data are abridged to the accounts a small business uses;
+more accounts are added in the menu like any other. load_chart() writes a
+chart in one transaction.
+
+account_index() keeps the accounts of a database in memory for the session:
+number -> account and number -> account class by the ranges of the chart.
+Posting checks every line against it without a query. The index is kept per
+database file, not per connection, together with a signature of the
+accounts: their number, the highest account_id and the chart. Accounts are
+only ever added, so the index is built again exactly when someone added
+accounts. Databases in memory have no file to key by and get a new index
+every time."""
+import bisect
+import csv
+import datetime
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from .database import UnitOfWork
+
+
+# first number, last number, account class
+account_classes: Dict[str, List[Tuple[str, str, str]]] = {
+    "SKR03": [
+        ("0000", "0999", "Anlage- und Kapitalkonten"),
+        ("1000", "1999", "Finanz- und Privatkonten"),
+        ("2000", "2999", "Abgrenzungskonten"),
+        ("3000", "3999", "Wareneingangs- und Bestandskonten"),
+        ("4000", "4999", "Betriebliche Aufwendungen"),
+        ("7000", "7999", "Bestände an Erzeugnissen"),
+        ("8000", "8999", "Erlöskonten"),
+        ("9000", "9999", "Vortrags- und statistische Konten"),
+    ],
+    "SKR04": [
+        ("0000", "0999", "Anlagevermögen"),
+        ("1000", "1999", "Umlaufvermögen"),
+        ("2000", "2999", "Eigenkapital"),
+        ("3000", "3999", "Fremdkapital"),
+        ("4000", "4999", "Betriebliche Erträge"),
+        ("5000", "6999", "Betriebliche Aufwendungen"),
+        ("7000", "7999", "Weitere Erträge und Aufwendungen"),
+        ("9000", "9999", "Vortrags- und statistische Konten"),
+    ],
+}
+
+charts = list(account_classes)
+
+CACHE_SIZE = 8
+
+
+@dataclass
+class Account():
+    account_id: int
+    number: str
+    name: str
+    kind: str
+
+
+def chart_file(chart: str) -> Path:
+    if chart not in account_classes:
+        raise ValueError(f"unknown chart of accounts '{chart}'")
+    return Path(__file__).resolve().parent.parent / "data" / f"{chart.lower()}.csv"  # noqa
+
+
+def read_chart(path: Path) -> List[Tuple[str, str, str]]:
+    """(number, name, kind) from a ";" separated file with a header."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["number"], row["name"], row["kind"])
+                for row in csv.DictReader(f, delimiter=";")]
+
+
+def company_chart(conn: sqlite3.Connection) -> str | None:
+    cur = conn.cursor()
+    res = cur.execute("""SELECT value FROM company_settings
+                         WHERE key = 'chart'""").fetchone()
+    return res[0] if res else None
+
+
+def load_chart(conn: sqlite3.Connection, created_by: str, chart: str) -> int:
+    """
+    Add the accounts of "chart", returns the number added. Accounts that
+    exist already are kept as they are, so loading twice adds nothing. A
+    company keeps the chart it started with.
+    """
+    rows = read_chart(chart_file(chart))
+    current = company_chart(conn)
+    if current is not None and current != chart:
+        raise ValueError(f"the company uses {current}, not {chart}")
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    add_accounts = """INSERT INTO accounts (
+                      number, name, kind, created_by, timestamp)
+                      VALUES (?, ?, ?, ?, ?)
+                      ON CONFLICT (number) DO NOTHING"""
+    with UnitOfWork(conn) as cur:
+        cur.execute("""INSERT OR IGNORE INTO company_settings (key, value)
+                       VALUES ('chart', ?)""", (chart,))
+        before = conn.total_changes
+        cur.executemany(add_accounts, [(number, name, kind, created_by,
+                                        timestamp)
+                                       for number, name, kind in rows])
+        added = conn.total_changes - before
+    forget_index(conn)
+    return added
+
+
+# ######## account index ######################################################
+
+class AccountIndex():
+    """All accounts of a database, looked up without a query."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        cur = conn.cursor()
+        self.accounts = {row[1]: Account(*row) for row in cur.execute(
+            "SELECT account_id, number, name, kind FROM accounts")}
+        # number -> account_id, what posting needs
+        self.ids = {number: account.account_id
+                    for number, account in self.accounts.items()}
+        self.chart = company_chart(conn)
+        self.ranges = account_classes.get(self.chart, [])
+        self.starts = [start for start, _, _ in self.ranges]
+
+    def __contains__(self, number: str) -> bool:
+        return number in self.accounts
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def get(self, number: str) -> Account | None:
+        return self.accounts.get(number)
+
+    def account_class(self, number: str) -> str | None:
+        """The class of the range "number" is in, None outside of all."""
+        number = number.zfill(4)
+        i = bisect.bisect_right(self.starts, number) - 1
+        if i >= 0:
+            _, end, name = self.ranges[i]
+            if number <= end:
+                return name
+        return None
+
+    def in_class(self, name: str) -> List[Account]:
+        return [account for number, account in sorted(self.accounts.items())
+                if self.account_class(number) == name]
+
+
+# database file -> (signature, index)
+_indexes: OrderedDict[str, Tuple[Tuple, AccountIndex]] = OrderedDict()
+
+
+def index_signature(conn: sqlite3.Connection) -> Tuple[str, Tuple]:
+    """The database file and what the index depends on, in one query."""
+    row = conn.execute("""SELECT
+        (SELECT file FROM pragma_database_list WHERE name = 'main'),
+        (SELECT COUNT(*) FROM accounts),
+        (SELECT MAX(account_id) FROM accounts),
+        (SELECT value FROM company_settings WHERE key = 'chart')""").fetchone()
+    return row[0], tuple(row[1:])
+
+
+def account_index(conn: sqlite3.Connection) -> AccountIndex:
+    """The index of the database of "conn", built once per change."""
+    path, signature = index_signature(conn)
+    cached = _indexes.get(path) if path else None
+    if cached is not None and cached[0] == signature:
+        _indexes.move_to_end(path)
+        return cached[1]
+    index = AccountIndex(conn)
+    # what an open transaction sees may still be rolled back
+    if path and not conn.in_transaction:
+        _indexes[path] = (signature, index)
+        _indexes.move_to_end(path)
+        if len(_indexes) > CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def forget_index(conn: sqlite3.Connection) -> None:
+    """After accounts were added through "conn" itself."""
+    path, _ = index_signature(conn)
+    _indexes.pop(path, None)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# closing.py
+"""Closing periods:
+
+    BUHA_PASSWORD=... python main.py close 2024-01 --company X --user ab
+
+Periods are closed one after the other. Closing one writes its snapshot
+into "account_snapshots": debit and credit of every account from the first
+posting up to the end of the period. It is the snapshot of the period
+before plus the running balances of this one (see balances.py), so closing
+reads two small sets of rows and no journal line. Afterwards the period
+takes no postings (see journal.PeriodIndex) and triggers refuse to change
+its entries, its lines or the snapshot.
+
+A balance on any day is then the latest snapshot before it plus what was
+posted since, see balances_up_to()."""
+import datetime
+import sqlite3
+import sys
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from .balances import Balance
+from .database import UnitOfWork
+
+
+class ClosingError(Exception):
+    """A period that cannot be closed, nothing is written."""
+
+
+def find_period(cur: sqlite3.Cursor, name: str) -> Tuple:
+    """(period_id, start_date, end_date, closed) of the period "name"."""
+    row = cur.execute("""SELECT period_id, start_date, end_date, closed
+                         FROM periods WHERE name = ?""", (name,)).fetchone()
+    if row is None:
+        raise ClosingError(f"no period '{name}'")
+    return row
+
+
+def latest_snapshot(conn: sqlite3.Connection,
+                    day: str) -> Tuple[int, str] | None:
+    """(period_id, end_date) of the last period closed by "day", or None."""
+    cur = conn.cursor()
+    return cur.execute("""SELECT period_id, end_date FROM periods
+                          WHERE closed = 1 AND end_date <= ?
+                          ORDER BY end_date DESC LIMIT 1""",
+                       (day,)).fetchone()
+
+
+def close_period(conn: sqlite3.Connection, closed_by: str, name: str) -> int:
+    """Snapshot and lock the period "name". Returns the number of accounts."""
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    with UnitOfWork(conn) as cur:
+        # BEGIN IMMEDIATE: no posting slips in between snapshot and lock
+        period_id, start_date, end_date, closed = find_period(cur, name)
+        if closed:
+            raise ClosingError(f"period '{name}' is closed already")
+        earlier = cur.execute("""SELECT name FROM periods
+                                 WHERE closed = 0 AND start_date < ?
+                                 ORDER BY start_date LIMIT 1""",
+                              (start_date,)).fetchone()
+        if earlier is not None:
+            raise ClosingError(f"close period '{earlier[0]}' first")
+        before = latest_snapshot(conn, start_date)
+        previous_id = before[0] if before is not None else None
+        cur.execute("""INSERT INTO account_snapshots (
+                       period_id, account_id, debit, credit)
+                       SELECT ?, account_id, SUM(debit), SUM(credit)
+                       FROM (SELECT account_id, debit, credit
+                             FROM account_snapshots WHERE period_id = ?
+                             UNION ALL
+                             SELECT account_id, debit, credit
+                             FROM account_balances WHERE period_id = ?)
+                       GROUP BY account_id""",
+                    (period_id, previous_id, period_id))
+        accounts = cur.rowcount
+        cur.execute("""UPDATE periods
+                       SET closed = 1, closed_by = ?, closed_at = ?
+                       WHERE period_id = ?""",
+                    (closed_by, timestamp, period_id))
+    return accounts
+
+
+def snapshot_balances(conn: sqlite3.Connection,
+                      period_id: int) -> List[Balance]:
+    """The balances at the end of a closed period, by number."""
+    query = """SELECT a.number, a.name, a.kind, s.debit, s.credit
+               FROM account_snapshots AS s
+               JOIN accounts AS a ON a.account_id = s.account_id
+               WHERE s.period_id = ?
+               ORDER BY a.number"""
+    cur = conn.cursor()
+    return [Balance(*row) for row in cur.execute(query, (period_id,))]
+
+
+def opening_balances(conn: sqlite3.Connection, name: str) -> List[Balance]:
+    """The balances the period "name" starts with, [] before the first close."""  # noqa
+    period_id, start_date, end_date, closed = find_period(conn.cursor(), name)
+    before = latest_snapshot(conn, start_date)
+    if before is None:
+        return []
+    return snapshot_balances(conn, before[0])
+
+
+def balances_up_to(conn: sqlite3.Connection, day: str,
+                   max_workers: int | None = None) -> List[Balance]:
+    """
+    Debit and credit of every account from the first posting up to "day":
+    the latest snapshot plus what was posted after it.
+    """
+    from .reports import FIRST_DAY
+    from .reports import account_totals
+
+    snapshot = latest_snapshot(conn, day)
+    if snapshot is None:
+        return account_totals(conn, FIRST_DAY, day, max_workers)
+    period_id, end_date = snapshot
+    totals: Dict[str, Balance] = {
+        b.number: b for b in snapshot_balances(conn, period_id)}
+    if end_date < day:
+        start = datetime.date.fromisoformat(end_date) + datetime.timedelta(1)
+        for b in account_totals(conn, start.isoformat(), day, max_workers):
+            known = totals.setdefault(b.number, Balance(b.number, b.name,
+                                                        b.kind, 0, 0))
+            known.debit = known.debit + b.debit
+            known.credit = known.credit + b.credit
+    return [totals[number] for number in sorted(totals)]
+
+
+# ######## command line #######################################################
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: period closed, 2: nothing done."""
+    import argparse
+
+    from .batch import open_for_cli
+
+    parser = argparse.ArgumentParser(
+        prog="main.py close",
+        description="Close a period: snapshot its balances and lock it.")
+    parser.add_argument("period", help="name of the period")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    args = parser.parse_args(argv)
+
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        try:
+            accounts = close_period(conn, args.user, args.period)
+        except ClosingError as e:
+            print(e, file=sys.stderr)
+            return 2
+    finally:
+        conn.close()
+    print(f"Period {args.period} closed, {accounts} accounts in its snapshot",
+          file=sys.stderr)
+    return 0
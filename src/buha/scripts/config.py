@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# config.py
+"""Per-deployment settings read from buha.ini. Every key has a default, so a
+missing file or a missing section just means "use the defaults". The file can
+be swapped with the environment variable BUHA_CONFIG."""
+import configparser
+import os
+from functools import lru_cache
+from pathlib import Path
+
+
+defaults = {
+    "hashing": {
+        # "default", "strong" or "fast" (cheap, for tests and batch imports)
+        "profile": "default",
+    },
+    "database": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "foreign_keys": "on",
+        "mmap_size": str(256 * 1024 * 1024),
+        # negative: KiB, positive: pages
+        "cache_size": str(-16000),
+        "cached_statements": "256",
+        # milliseconds to wait for the write lock of another employee
+        "busy_timeout": "5000",
+    },
+    "startup": {
+        # milliseconds "import main" may take, checked by test_startup.py
+        "import_budget_ms": "300",
+    },
+}
+
+
+def path_to_config() -> Path:
+    config_path = os.environ.get("BUHA_CONFIG")
+    if config_path:
+        return Path(config_path)
+    buha_dir = Path(__file__).resolve().parent.parent
+    return buha_dir / "buha.ini"
+
+
+@lru_cache(maxsize=None)
+def load_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read_dict(defaults)
+    config.read(path_to_config(), encoding="utf-8")
+    return config
+
+
+def get_setting(section: str, key: str) -> str:
+    """Environment variables BUHA_<SECTION>_<KEY> beat the config file."""
+    env_key = f"BUHA_{section}_{key}".upper()
+    if env_key in os.environ:
+        return os.environ[env_key]
+    return load_config().get(section, key)
+
+
+def get_int(section: str, key: str) -> int:
+    return int(get_setting(section, key))
+
+
+def get_bool(section: str, key: str) -> bool:
+    return get_setting(section, key).strip().lower() in ("1", "on", "true", "yes")  # noqa
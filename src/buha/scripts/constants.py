@@ -17,6 +17,7 @@ def task_headline(task: str, language: str) -> str:
         "person": person_headline,
         "start": start_headline,
         "names": names_headline,
+        "change entry": change_entry_headline,
     }
     return headlines[task][language]
 
@@ -29,6 +30,7 @@ def task_menu(task: str, language: str) -> str:
         "person": person_menu,
         "start": start_menu,
         "names": names_menu,
+        "change entry": change_entry_menu,
     }
     return menu[task][language]
 
@@ -174,6 +176,11 @@ suffix_prompt = {
     "de": "    Generations-Suffix (Jr., Sr.): ",
 }
 
+similar_names_prompt = {
+    "en": "    Similar names exist. Add this name anyway? y/N: ",
+    "de": "    Ähnliche Namen vorhanden. Trotzdem anlegen? y/N: ",
+}
+
 
 def enter_prompt(prompt: dict, language: str) -> Callable:
     return input(prompt[language])
@@ -209,6 +216,124 @@ new_entry_menu["de"] = """
     9: Zurück
     """
 
+account_prompts = {
+    "en": {
+        "number": "    Account number: ",
+        "name": "    Account name: ",
+        "kind": "    Kind of account: ",
+    },
+    "de": {
+        "number": "    Kontonummer: ",
+        "name": "    Kontobezeichnung: ",
+        "kind": "    Kontoart: ",
+    },
+}
+
+account_kind_labels = {
+    "en": {
+        "asset": "Asset",
+        "liability": "Liability",
+        "equity": "Equity",
+        "revenue": "Revenue",
+        "expense": "Expense",
+    },
+    "de": {
+        "asset": "Aktivkonto",
+        "liability": "Passivkonto (Verbindlichkeit)",
+        "equity": "Eigenkapital",
+        "revenue": "Ertrag",
+        "expense": "Aufwand",
+    },
+}
+
+account_exists = {
+    "en": "    An account with this number exists already.",
+    "de": "    Ein Konto mit dieser Nummer gibt es schon.",
+}
+
+chart_prompt = {
+    "en": "    Start with a standard chart of accounts (Enter: no): ",
+    "de": "    Mit einem Standardkontenrahmen beginnen (Enter: nein): ",
+}
+
+chart_loaded = {
+    "en": "    {added} accounts of {chart} added.",
+    "de": "    {added} Konten des {chart} angelegt.",
+}
+
+# ######## import -> change_entry.py ##########################################
+
+change_entry_headline = {
+    "en": "CHANGE ENTRY",
+    "de": "EINTRAG ÄNDERN",
+}
+
+change_entry_menu = dict()
+change_entry_menu["en"] = """
+    1: Person
+    2: Name
+    3: Settings (language, internal)
+    9: Back
+    """
+
+change_entry_menu["de"] = """
+    1: Person
+    2: Name
+    3: Einstellungen (Sprache, intern)
+    9: Zurück
+    """
+
+field_labels = {
+    "en": {
+        "first_name": "First name",
+        "middle_names": "Middle names",
+        "last_name": "Last name",
+        "nickname": "Nickname",
+        "previous_name": "Previous name",
+        "suffix": "Suffix",
+        "salutation": "Salutation",
+        "language": "Language",
+        "is_internal": "Internal (y/n)",
+    },
+    "de": {
+        "first_name": "Vorname",
+        "middle_names": "weitere Vornamen",
+        "last_name": "Nachname",
+        "nickname": "Spitzname",
+        "previous_name": "früherer Name",
+        "suffix": "Suffix",
+        "salutation": "Anrede",
+        "language": "Sprache",
+        "is_internal": "intern (y/n)",
+    },
+}
+
+keep_value_hint = {
+    "en": "    [Enter] keeps a value, - clears it.",
+    "de": "    [Enter] behält einen Wert, - löscht ihn.",
+}
+
+not_found = {
+    "en": "    No entry for these initials.",
+    "de": "    Kein Eintrag zu diesen Initialen.",
+}
+
+edit_saved = {
+    "en": "    Saved.",
+    "de": "    Gespeichert.",
+}
+
+edit_conflict = {
+    "en": "    Someone else changed this entry meanwhile, nothing was saved. Current values:",  # noqa
+    "de": "    Jemand anderes hat den Eintrag inzwischen geändert, nichts wurde gespeichert. Aktuelle Werte:",  # noqa
+}
+
+edit_deleted = {
+    "en": "    Someone else deleted this entry meanwhile.",
+    "de": "    Jemand anderes hat den Eintrag inzwischen gelöscht.",
+}
+
+
 # ######## import -> person.py ################################################
 
 person_headline = {
@@ -288,6 +413,37 @@ start_headline = {
 }
 
 
+# ######## import -> search.py ################################################
+
+search_prompt = {
+    "en": "    Search (empty line: back): ",
+    "de": "    Suchen (leere Zeile: zurück): ",
+}
+
+search_as_you_type = {
+    "en": "    Search ([Enter]: back): ",
+    "de": "    Suchen ([Enter]: zurück): ",
+}
+
+search_no_match = {
+    "en": "    No matches.",
+    "de": "    Keine Treffer.",
+}
+
+
+# ######## import -> pager.py #################################################
+
+pager_prompt = {
+    "en": "    [Enter] next  p previous  g <id> go to  f <column> <text> filter  f all  q quit: ",  # noqa
+    "de": "    [Enter] weiter  p zurück  g <id> gehe zu  f <Spalte> <Text> Filter  f alle  q Ende: ",  # noqa
+}
+
+pager_empty = {
+    "en": "    No entries.",
+    "de": "    Keine Einträge.",
+}
+
+
 # ######## import -> shared.py ################################################
 
 german_attrs = {
@@ -334,3 +490,52 @@ german_attrs = {
     "year_of_death": "Todesjahr",
     "zip_code": "Postleitzahl",
 }
+
+
+# ######## import -> reports.py ###############################################
+
+report_titles = {
+    "en": {
+        "trial balance": "Trial balance",
+        "pnl": "Profit and loss",
+        "balance sheet": "Balance sheet",
+    },
+    "de": {
+        "trial balance": "Summen- und Saldenliste",
+        "pnl": "Gewinn- und Verlustrechnung",
+        "balance sheet": "Bilanz",
+    },
+}
+
+report_columns = {
+    "en": {
+        "number": "Account",
+        "name": "Name",
+        "debit": "Debit",
+        "credit": "Credit",
+        "balance": "Balance",
+        "amount": "Amount",
+        "side": "Side",
+        "total": "Total",
+        "revenue": "Revenue",
+        "expenses": "Expenses",
+        "result": "Result",
+        "assets": "Assets",
+        "liabilities": "Equity and liabilities",
+    },
+    "de": {
+        "number": "Konto",
+        "name": "Bezeichnung",
+        "debit": "Soll",
+        "credit": "Haben",
+        "balance": "Saldo",
+        "amount": "Betrag",
+        "side": "Seite",
+        "total": "Summe",
+        "revenue": "Erträge",
+        "expenses": "Aufwendungen",
+        "result": "Ergebnis",
+        "assets": "Aktiva",
+        "liabilities": "Passiva",
+    },
+}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# database.py
+"""Opening company databases and writing to them. Every code path that opens
+a company file uses connect() so all connections share the pragmas from the
+[database] section of buha.ini. Writes that belong together go through one
+UnitOfWork."""
+import sqlite3
+from pathlib import Path
+
+from .config import get_bool
+from .config import get_int
+from .config import get_setting
+from .schema import ensure_schema
+
+
+journal_modes = ["delete", "truncate", "persist", "memory", "wal", "off"]
+synchronous_levels = ["off", "normal", "full", "extra"]
+
+
+def connect(db_path: Path | str) -> sqlite3.Connection:
+    journal_mode = get_setting("database", "journal_mode").lower()
+    synchronous = get_setting("database", "synchronous").lower()
+    if journal_mode not in journal_modes:
+        raise ValueError(f"Unknown journal_mode '{journal_mode}'")
+    if synchronous not in synchronous_levels:
+        raise ValueError(f"Unknown synchronous level '{synchronous}'")
+
+    conn = sqlite3.connect(
+        db_path,
+        timeout=get_int("database", "busy_timeout") / 1000,
+        cached_statements=get_int("database", "cached_statements"),
+    )
+    cur = conn.cursor()
+    cur.execute(f"PRAGMA journal_mode = {journal_mode}")
+    cur.execute(f"PRAGMA synchronous = {synchronous}")
+    foreign_keys = "ON" if get_bool("database", "foreign_keys") else "OFF"
+    cur.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+    cur.execute(f"PRAGMA mmap_size = {get_int('database', 'mmap_size')}")
+    cur.execute(f"PRAGMA cache_size = {get_int('database', 'cache_size')}")
+
+    return conn
+
+
+def open_company_database(db_path: Path | str) -> sqlite3.Connection:
+    """A tuned connection to a company database with an up to date schema."""
+    conn = connect(db_path)
+    ensure_schema(conn)  # the only place where tables are created/migrated
+    return conn
+
+
+class UnitOfWork:
+    """
+    One logical change, e.g. a new person with names and settings, written in
+    exactly one transaction: committed as a whole or not at all. The
+    functions called inside must not commit themselves. Nested inside a
+    transaction that is already open it becomes a savepoint.
+
+        with UnitOfWork(conn):
+            person_id = insert_person(conn, ...)
+            insert_name(conn, ..., person_id)
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.nested = False
+
+    def __enter__(self) -> sqlite3.Cursor:
+        cur = self.conn.cursor()
+        self.nested = self.conn.in_transaction
+        if self.nested:
+            cur.execute("SAVEPOINT unit_of_work")
+        else:
+            # take the write lock right away instead of on the first write
+            cur.execute("BEGIN IMMEDIATE")
+        return cur
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if self.nested:
+            if exc_type is not None:
+                self.conn.execute("ROLLBACK TO unit_of_work")
+            self.conn.execute("RELEASE unit_of_work")
+        elif exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        return False
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# duplicates.py
+"""Find names that are probably the same person's: "Müller" vs "Mueller",
+first and middle names swapped, typos in the last name. Only the names that
+share a blocking key with the new name (see phonetics.py) are read from the
+database and scored, never the whole table."""
+import sqlite3
+from dataclasses import dataclass
+from typing import List
+from typing import Tuple
+
+from .phonetics import blocking_keys
+from .phonetics import transliterate
+from .shared import Name
+
+
+@dataclass
+class SimilarName():
+    name_id: int
+    person_id: int
+    first_name: str
+    middle_names: str | None
+    last_name: str
+    score: int
+
+
+name_block_insert = """INSERT OR IGNORE INTO name_blocks (block, name_id)
+                       VALUES (?, ?)"""
+
+
+def name_block_rows(name_id: int, last_name: str) -> List[Tuple[str, int]]:
+    return [(key, name_id) for key in blocking_keys(last_name)]
+
+
+def add_name_blocks(conn: sqlite3.Connection, name_id: int,
+                    last_name: str) -> None:
+    """Keep "name_blocks" in step with "names", every insert calls this."""
+    cur = conn.cursor()
+    cur.executemany(name_block_insert, name_block_rows(name_id, last_name))
+
+
+def comparable(first_name: str, middle_names: str | None,
+               last_name: str) -> str:
+    """All names in one string, token_sort_ratio ignores their order."""
+    parts = [first_name, middle_names or "", last_name]
+    return transliterate(" ".join(parts))
+
+
+def probe_keys(cur: sqlite3.Cursor, keys: List[str]) -> List[str]:
+    """
+    The keys to look up candidates with. A candidate shares the phonetic
+    code or at least half of the trigrams of the last name. Whoever shares
+    half of n trigrams shares one of the n - n/2 + 1 rarest, so the long
+    lists of common trigrams ("sch", "ler") are never read.
+    """
+    placeholders = ", ".join("?" * len(keys))
+    select_counts = f"""SELECT block, COUNT(*) FROM name_blocks
+                        WHERE block IN ({placeholders}) GROUP BY block"""
+    counts = dict(cur.execute(select_counts, keys).fetchall())
+
+    phonetic = [key for key in keys if key.startswith("p:")]
+    grams = sorted((key for key in keys if key.startswith("t:")),
+                   key=lambda key: counts.get(key, 0))
+    needed = (len(grams) + 1) // 2
+    return phonetic + grams[:len(grams) - needed + 1]
+
+
+def find_similar_names(conn: sqlite3.Connection, name: Name,
+                       threshold: int = 85,
+                       max_candidates: int = 200) -> List[SimilarName]:
+    """
+    Names scoring at least "threshold" against "name", best first. At most
+    "max_candidates" of the names found by probe_keys() are scored, those
+    sharing the most keys first.
+    """
+    keys = sorted(blocking_keys(name.last_name))
+    if not keys:
+        return []
+    cur = conn.cursor()
+    probe = probe_keys(cur, keys)
+    placeholders = ", ".join("?" * len(probe))
+    select_candidates = f"""
+        WITH candidates AS (
+            SELECT name_id, COUNT(*) AS shared
+            FROM name_blocks
+            WHERE block IN ({placeholders})
+            GROUP BY name_id
+            ORDER BY shared DESC
+            LIMIT ?)
+        SELECT n.name_id, n.person_id, n.first_name, n.middle_names,
+               n.last_name
+        FROM candidates JOIN names AS n USING (name_id)"""
+    rows = cur.execute(select_candidates, (*probe, max_candidates)).fetchall()
+
+    if not rows:
+        return []
+    # loaded only once there is something to score
+    from fuzzywuzzy import fuzz
+
+    wanted = comparable(name.first_name, name.middle_names, name.last_name)
+    similar = []
+    for name_id, person_id, fn, mn, ln in rows:
+        score = fuzz.token_sort_ratio(wanted, comparable(fn, mn, ln))
+        if score >= threshold:
+            similar.append(SimilarName(name_id, person_id, fn, mn, ln, score))
+    similar.sort(key=lambda match: match.score, reverse=True)
+    return similar
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# editing.py
+"""Edit rows of "persons", "names" and "settings" with optimistic locking.
+A row is read together with its "version"; the UPDATE then only matches if
+the version is unchanged and raises it by one:
+
+    UPDATE names SET ..., version = version + 1
+    WHERE name_id = ? AND version = ?
+
+No lock is held while the user types. If someone else saved the row in the
+meantime nothing is written and EditConflict is raised; the caller shows the
+new values and lets the user decide. Every other UPDATE of these tables goes
+through versioned_update() as well, so no write slips past a version check."""
+import datetime
+import sqlite3
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Tuple
+
+from .database import UnitOfWork
+from .duplicates import add_name_blocks
+from .shared import name_key
+
+
+# table -> primary key, columns that may be edited
+editable: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "persons": ("person_id", ("first_name", "middle_names", "last_name")),
+    "names": ("name_id", ("first_name", "middle_names", "last_name",
+                          "nickname", "previous_name", "suffix",
+                          "salutation")),
+    "settings": ("settings_id", ("language", "is_internal")),
+}
+
+
+class EditConflict(Exception):
+    """The row was changed or deleted since it was read."""
+
+    def __init__(self, table: str, key: int, current: "Row | None") -> None:
+        self.table = table
+        self.key = key
+        # the row as it is now, None if it was deleted
+        self.current = current
+        state = "deleted" if current is None else "changed"
+        super().__init__(f"{table} {key} was {state} by someone else")
+
+
+@dataclass
+class Row():
+    table: str
+    key: int
+    version: int
+    values: Dict[str, Any]
+
+
+def load_row(conn: sqlite3.Connection, table: str, key: int) -> Row | None:
+    pk, columns = editable[table]
+    query = f"""SELECT version, {", ".join(columns)} FROM {table}
+                WHERE {pk} = ?"""
+    cur = conn.cursor()
+    res = cur.execute(query, (key,)).fetchone()
+    if res is None:
+        return None
+    return Row(table, key, res[0], dict(zip(columns, res[1:])))
+
+
+def load_row_of_person(conn: sqlite3.Connection, table: str,
+                       person_id: int) -> Row | None:
+    """The row of "table" for a person, for names the latest name."""
+    pk, _ = editable[table]
+    query = f"""SELECT {pk} FROM {table} WHERE person_id = ?
+                ORDER BY {pk} DESC LIMIT 1"""
+    cur = conn.cursor()
+    res = cur.execute(query, (person_id,)).fetchone()
+    if res is None:
+        return None
+    return load_row(conn, table, res[0])
+
+
+def versioned_update(cur: sqlite3.Cursor, table: str, changes: Dict[str, Any],
+                     where: Dict[str, Any], version: int | None = None) -> int:
+    """
+    UPDATE "table" SET "changes", raising "version" and setting "updated_at",
+    for the rows matching "where". With "version" only a row still at that
+    version is written. Returns the number of rows written. The column names
+    come from the code, never from the user.
+    """
+    updated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    assignments = ", ".join(f"{column} = ?" for column in changes)
+    conditions = [f"{column} = ?" for column in where]
+    params = [*changes.values(), updated_at, *where.values()]
+    if version is not None:
+        conditions.append("version = ?")
+        params.append(version)
+    update = f"""UPDATE {table}
+                 SET {assignments},
+                     version = version + 1,
+                     updated_at = ?
+                 WHERE {" AND ".join(conditions)}"""
+    cur.execute(update, params)
+    return cur.rowcount
+
+
+def update_row(conn: sqlite3.Connection, row: Row,
+               changes: Dict[str, Any]) -> Row:
+    """
+    Write "changes" if "row" is still at the version it was read with.
+    Returns the row as written; raises EditConflict otherwise.
+    """
+    pk, columns = editable[row.table]
+    unknown = set(changes) - set(columns)
+    if unknown:
+        raise ValueError(f"cannot edit {', '.join(sorted(unknown))} of {row.table}")  # noqa
+    if not changes:
+        return row
+
+    values = {**row.values, **changes}
+    written = dict(changes)
+    if row.table == "names":
+        # duplicates.py and names.py look names up by these
+        written["name_key"] = name_key(values["first_name"],
+                                       values["middle_names"],
+                                       values["last_name"])
+
+    with UnitOfWork(conn) as cur:
+        if versioned_update(cur, row.table, written, {pk: row.key},
+                            row.version) == 0:
+            raise EditConflict(row.table, row.key,
+                               load_row(conn, row.table, row.key))
+        if row.table == "names" and "last_name" in changes:
+            cur.execute("DELETE FROM name_blocks WHERE name_id = ?",
+                        (row.key,))
+            add_name_blocks(conn, row.key, values["last_name"])
+
+    return Row(row.table, row.key, row.version + 1, values)
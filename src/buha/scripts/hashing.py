@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# hashing.py
+"""Password hashing for login and settings. Every stored hash records the
+algorithm and the number of iterations it was made with, so the cost can be
+raised later and old hashes get replaced on the next successful login."""
+import os
+from dataclasses import dataclass
+from typing import Tuple
+
+from .config import get_setting
+
+
+ALGORITHM = "pbkdf2_sha256"
+
+# hashes stored before the parameters were recorded used these
+LEGACY_ITERATIONS = 100000
+
+hash_profiles = {
+    "strong": 600000,
+    "default": 100000,
+    "fast": 1000,
+}
+
+
+@dataclass(frozen=True)
+class HashParams():
+    algorithm: str
+    iterations: int
+
+
+def current_params() -> HashParams:
+    profile = get_setting("hashing", "profile")
+    if profile not in hash_profiles:
+        raise ValueError(f"Unknown hashing profile '{profile}'")
+    return HashParams(ALGORITHM, hash_profiles[profile])
+
+
+def stored_params(algorithm: str | None, iterations: int | None) -> HashParams:  # noqa
+    """Parameters of a settings row, rows without any are legacy hashes."""
+    if algorithm is None or iterations is None:
+        return HashParams(ALGORITHM, LEGACY_ITERATIONS)
+    return HashParams(algorithm, iterations)
+
+
+def hash_password(password: str, salt: bytes | None = None,
+                  params: HashParams | None = None) -> Tuple[bytes, bytes]:
+    if not salt:
+        salt = os.urandom(16)  # Generate a random salt
+    if params is None:
+        params = current_params()
+    if params.algorithm != ALGORITHM:
+        raise ValueError(f"Unknown hash algorithm '{params.algorithm}'")
+
+    import hashlib  # not needed at startup, only when a password is checked
+
+    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                                        salt, params.iterations)
+    return salt, password_hash
+
+
+def verify_password(password: str, salt: bytes, password_hash: bytes,
+                    params: HashParams) -> bool:
+    """False as well for a hash made with parameters we cannot compute."""
+    import hmac
+
+    try:
+        _, computed_password_hash = hash_password(password, salt, params)
+    except (ValueError, TypeError, OverflowError):
+        # unknown algorithm or garbage iterations in the settings row
+        return False
+    return hmac.compare_digest(computed_password_hash, password_hash)
+
+
+def needs_rehash(params: HashParams) -> bool:
+    """
+    Only weaker hashes are replaced: a stronger one stays when the profile
+    is lowered, e.g. to "fast" for tests.
+    """
+    current = current_params()
+    if params.algorithm != current.algorithm:
+        return True
+    return params.iterations < current.iterations
@@ -2,46 +2,72 @@
 # -*- coding: utf-8 -*-
 # helpers.py
 """Helper functions: exceptions, print style, ..."""
-import inspect
-import os
 import re
 import sqlite3
 import sys
-from fuzzywuzzy import fuzz
 from pathlib import Path
+from typing import List
+from .catalog import company_index
+from .catalog import load_companies
+from .catalog import normalize_company
+from .catalog import register_company
 from .constants import state_company_prompt
 from .constants import task_headline
 from .constants import task_menu
+from .pager import Pager
 from .shared import Name
 from .shared import clear_screen
 
 
+# ############## navigation ###################################################
+
+class Navigation:
+    """
+    Where the user is: a stack of menu tasks ("start", "new entry", ...) and
+    the task whose headline is on screen. One instance is handed from menu
+    to submenu, so every transition is a push or a pop.
+    """
+
+    def __init__(self):
+        self.stack: List[str] = []
+        self.shown: str | None = None
+
+    @property
+    def current(self) -> str | None:
+        return self.stack[-1] if self.stack else None
+
+    def push(self, task: str) -> None:
+        if self.current != task:
+            self.stack.append(task)
+
+    def pop(self) -> None:
+        # the first menu stays, there is nothing to go back to
+        if len(self.stack) > 1:
+            del self.stack[-1]
+
+    def reset(self) -> None:
+        self.stack = []
+        self.shown = None
+
+    def changed(self, task: str) -> bool:
+        """True if the headline of "task" is not on screen yet."""
+        if task == self.shown:
+            return False
+        self.shown = task
+        return True
+
+
 # ############## basic class Menu #############################################
 
 class Menu:
-    last_caller_module = None
-    current_caller_module = None
-    navigation_stack = []
-
-    def menu_changed(self) -> bool:
-        if 0:
-            print("menu_changed, nav stack: ", Menu.navigation_stack)
-            print("menu_changed, caller_modules")
-            print("last: ", Menu.last_caller_module)
-            print("current: ", Menu.current_caller_module)
-            continue_()
-        if Menu.current_caller_module != Menu.last_caller_module:
-            Menu.last_caller_module = Menu.current_caller_module
-            return True
-        else:
-            current_menu = Menu.navigation_stack[-1] if Menu.navigation_stack else None  # noqa
-            try:
-                if (Menu.navigation_stack and current_menu != Menu.navigation_stack[-2]):  # noqa
-                    return True
-            except IndexError:
-                pass
 
-        return False
+    def __init__(self, navigation: Navigation | None = None):
+        if navigation is None:
+            navigation = Navigation()
+        self.navigation = navigation
+
+    def menu_changed(self, task: str) -> bool:
+        return self.navigation.changed(task)
 
     def print_headline(self, company_name: str, language: str, task: str) -> None:  # noqa
         clear_screen()
@@ -50,28 +76,16 @@ class Menu:
         print(menu_task_head)
 
     def change_menu(self, task: str) -> None:
-        Menu.navigation_stack.append(task)
-        if self.get_caller_module_name() != "src.buha.scripts.helpers":
-            Menu.current_caller_module = self.get_caller_module_name()
-
-    def go_back(self):
-        if Menu.navigation_stack:
-            if len(Menu.navigation_stack) > 1:
-                del Menu.navigation_stack[-1]
-        self.last_caller_module = self.get_caller_module_name()
-
-    def get_caller_module_name(self) -> str:
-        # Gets the caller's module name. The index 2 refers to the caller of
-        # the current function.
-        frame = inspect.stack()[2]
-        module = inspect.getmodule(frame[0])
-        return module.__name__ if module else None
+        self.navigation.push(task)
+
+    def go_back(self) -> None:
+        self.navigation.pop()
 
     def display_menu(self, company_name: str, language: str,
                      task: str = "") -> None:
         # with "task" being the actual "what": a new entry, login, ...
 
-        if self.menu_changed():
+        if self.menu_changed(task):
             clear_screen()
             self.print_headline(company_name, language, task)
         print(task_menu(task, language))
@@ -100,36 +114,65 @@ def create_headline(company_name: str, headline: str) -> str:
 # ############## initials #####################################################
 
 def mk_initials(conn: sqlite3.Connection, name: Name, length: int) -> str:
-    fn = name.first_name
-    ln = name.last_name
-
-    if length == 2:
-        initials = ''.join(fn[0].lower() + ln[0].lower())
-    elif not length % 2:
-        li = ri = length // 2
-        initials = ''.join(fn[:li].lower() + ln[:ri].lower())
-    else:
-        li = length // 2 + 1
-        ri = length // 2
-        initials = ''.join(fn[:li].lower() + ln[:ri].lower())
+    """
+    Pick the shortest initials for "name" that are not taken yet. All
+    candidate lengths are checked against the table in one query.
+    """
+    candidates = initials_candidates(name, length)
+    taken = initials_taken(conn, candidates)
+    for initials in candidates:
+        if initials not in taken:
+            return initials
+
+    # every combination of first and last name is taken -> number the longest
+    base = candidates[-1]
+    counter = 2
+    while initials_in_table(conn, f"{base}{counter}"):
+        counter = counter + 1
+    return f"{base}{counter}"
+
+
+def initials_candidates(name: Name, length: int) -> list:
+    """
+    Initials for "name" starting with "length" chars and growing by one char
+    until first and last name are used up, shortest first, without doubles.
+    """
+    fn = name.first_name.lower()
+    ln = name.last_name.lower()
+
+    longest = max(length, 2 * max(len(fn), len(ln)))
+
+    candidates = []
+    for size in range(length, longest + 1):
+        if size == 2:
+            initials = fn[0] + ln[0]
+        elif not size % 2:
+            li = ri = size // 2
+            initials = fn[:li] + ln[:ri]
+        else:
+            li = size // 2 + 1
+            ri = size // 2
+            initials = fn[:li] + ln[:ri]
+        if initials not in candidates:
+            candidates.append(initials)
 
-    if initials_in_table(conn, initials):
-        length = length + 1
-        initials = mk_initials(conn, name, length)
+    return candidates
 
-    return initials
+
+def initials_taken(conn: sqlite3.Connection, candidates: list) -> set:
+    placeholders = ", ".join("?" * len(candidates))
+    query = f"SELECT initials FROM persons WHERE initials IN ({placeholders})"
+    cur = conn.cursor()
+    res = cur.execute(query, candidates)
+    return {row[0] for row in res.fetchall()}
 
 
 def initials_in_table(conn: sqlite3.Connection, new_initials: str) -> bool:
-    with conn:
-        cur = conn.cursor()
-        res = cur.execute("SELECT initials FROM persons")
-        res_initials = res.fetchall()
-        for initials_in_db in res_initials:
-            existing_initials = ''.join(str(c) for c in initials_in_db)
-            if existing_initials == new_initials:
-                return True
-        return False
+    # uses the unique index on persons.initials, no scan of the table
+    query = "SELECT 1 FROM persons WHERE initials = ? LIMIT 1"
+    cur = conn.cursor()
+    res = cur.execute(query, (new_initials,))
+    return res.fetchone() is not None
 
 
 # ############## initialize database and activate #############################
@@ -167,10 +210,17 @@ def check_for_matches(company_name: str, targets: list, language: str) -> str |
     targets is checked if it's an empty list.
     """
 
+    # loaded here, not at startup: most logins match a company exactly
+    from fuzzywuzzy import fuzz
+
     threshold = 80
-    scores = [fuzz.ratio(target, company_name) for target in targets]
+    # compare normalized names, "Becker_KG.db" scores 100 for "becker kg"
+    index = company_index(targets)
+    normalized = list(index)
+    wanted = normalize_company(company_name)
+    scores = [fuzz.ratio(target, wanted) for target in normalized]
     best_match_index = scores.index(max(scores))
-    best_match = targets[best_match_index]
+    best_match = index[normalized[best_match_index]]
 
     if max(scores) > threshold:
         return best_match
@@ -186,18 +236,13 @@ def check_for_matches(company_name: str, targets: list, language: str) -> str |
 
 def check_databases() -> list:
     """
-    Check if there are any databases inside the directory.
+    Names of the company databases, from the catalog in the data directory.
     """
-    targets = []
+    return load_companies(path_to_db_dir())
 
-    path_to_database_dir = path_to_db_dir()
-    for (dirpath, dirnames, filenames) in os.walk(path_to_database_dir):
-        for filename in filenames:
-            # print(filename)
-            if filename.endswith(".db"):
-                targets.append(filename)
 
-    return targets
+def add_to_catalog(company_name: str) -> None:
+    register_company(path_to_db_dir(), company_name)
 
 
 def pick_language() -> str:
@@ -234,13 +279,12 @@ def continue_() -> bool:
     return check == "y"
 
 
-def get_person_id(conn: sqlite3.Connection, initials: str) -> int:
-    with conn:
-        cur = conn.cursor()
-        cur.execute("SELECT person_id FROM persons WHERE initials = ?", (initials,))  # noqa
-        row = cur.fetchone()
-        person_id = row[0]
-        return person_id
+def get_person_id(conn: sqlite3.Connection, initials: str) -> int | None:
+    # no "with conn": a read must not commit the caller's transaction
+    cur = conn.cursor()
+    cur.execute("SELECT person_id FROM persons WHERE initials = ?", (initials,))  # noqa
+    row = cur.fetchone()
+    return row[0] if row else None
 
 
 def check_if_internal() -> bool:
@@ -252,13 +296,10 @@ def check_if_internal() -> bool:
 
 # ############## show tables ##################################################
 
-def show_table(conn: sqlite3.Connection, table: str) -> None:
-    with conn:
-        cur = conn.cursor()
-        res = cur.execute(f"SELECT * FROM {table}")
-        res_table = res.fetchall()
-        for row in res_table:
-            print(row)
+def show_table(conn: sqlite3.Connection, table: str,
+               language: str = "de") -> None:
+    """Page through "table", see pager.py."""
+    Pager(conn, table).run(language)
 
 
 def show_my_table(conn: sqlite3.Connection, table: str, person_id: int) -> None:  # noqa
@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# importer.py
+"""Import persons from a CSV or JSONL file:
+
+    BUHA_PASSWORD=... python main.py import --company X --user ab staff.csv
+
+One record per row (CSV with a header line) or per line (JSONL) with the
+fields of Name and optionally "language", "is_internal" and "password".
+The file is read as a stream and written in chunks, one transaction per
+chunk, with executemany for "persons", "names", "settings" and
+"name_blocks". The initials are picked from a set of all initials read
+once, not by a query per collision as mk_initials does; inside every
+chunk's transaction one indexed query checks the initials picked for it
+against persons added by others meanwhile. Names that exist already - in
+the database or earlier in the file - are rejected and reported with their
+line number. The database is asked again inside the transaction, so a name
+added by someone else meanwhile is rejected as well."""
+import csv
+import datetime
+import json
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from itertools import islice
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from .constants import languages
+from .database import UnitOfWork
+from .duplicates import name_block_insert
+from .duplicates import name_block_rows
+from .hashing import current_params
+from .helpers import initials_candidates
+from .names import name_insert
+from .names import name_row
+from .onboarding import hash_passwords
+from .person import person_insert
+from .person import person_row
+from .settings import INITIAL_PASSWORD
+from .settings import settings_insert
+from .settings import settings_row
+from .shared import Name
+from .shared import name_key
+
+
+CHUNK_SIZE = 500
+
+name_fields = ("first_name", "last_name", "middle_names", "nickname",
+               "previous_name", "suffix", "salutation")
+
+
+class RecordError(Exception):
+    """A record that cannot be imported."""
+
+
+@dataclass
+class Record():
+    line: int
+    name: Name
+    language: str = "de"
+    is_internal: bool = True
+    password: str = INITIAL_PASSWORD
+
+
+@dataclass
+class ImportReport():
+    imported: int = 0
+    # (line, reason)
+    rejected: List[Tuple[int, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.seconds:
+            return 0.0
+        return self.imported / self.seconds
+
+    def __str__(self) -> str:
+        return (f"{self.imported} imported, {len(self.rejected)} rejected, "
+                f"{self.seconds:.2f} s, {self.rows_per_second:.0f} rows/s")
+
+
+# ######## reading ############################################################
+
+def read_csv(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # a broken line is reported by parse_record, not raised here
+        yield line_no, row if isinstance(row, dict) else {}
+
+
+def read_rows(path: Path, lines: Iterable[str]) -> Iterator[Tuple[int, dict]]:
+    if Path(path).suffix.lower() in (".jsonl", ".json", ".ndjson"):
+        return read_jsonl(lines)
+    return read_csv(lines)
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().casefold() not in ("", "0", "n", "no", "nein",
+                                                "false")
+    return bool(value)
+
+
+def parse_record(line: int, row: dict) -> Record:
+    """A Record or RecordError for a row without first or last name."""
+    # CSV has "" for an empty cell, the names keep None like the menus do
+    values = {key: (str(row[key]).strip() or None)
+              for key in name_fields if row.get(key) not in (None, "")}
+    if not values.get("first_name") or not values.get("last_name"):
+        raise RecordError("first_name and last_name are required")
+
+    language = row.get("language") or "de"
+    if language not in languages:
+        raise RecordError(f"unknown language '{language}'")
+    record = Record(line, Name(**values), language)
+    if row.get("is_internal") not in (None, ""):
+        record.is_internal = to_bool(row["is_internal"])
+    if row.get("password"):
+        record.password = str(row["password"])
+    return record
+
+
+# ######## initials ###########################################################
+
+class InitialsPool():
+    """
+    All initials in "persons". Picks the same initials as mk_initials would,
+    but checks the candidates against this set. take_chunk() checks what it
+    picked against the database as well, write_chunk() calls it inside its
+    transaction: persons added by another process meanwhile are seen before
+    any initials are handed out.
+    """
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        cur = conn.cursor()
+        self.taken: Set[str] = {row[0] for row in
+                                cur.execute("SELECT initials FROM persons")}
+        # base -> next number to try, "Tom Test" twenty times counts on
+        self.counters: Dict[str, int] = {}
+
+    def take_chunk(self, cur: sqlite3.Cursor, names: List[Name]) -> List[str]:
+        """
+        Initials for "names", checked by one indexed query. If another
+        process took some of them they are added to the set and the
+        initials are picked again.
+        """
+        while True:
+            taken, counters = set(self.taken), dict(self.counters)
+            picked = [self.take(name) for name in names]
+            in_db = taken_initials(cur, picked)
+            if not in_db:
+                return picked
+            self.taken, self.counters = taken | in_db, counters
+
+    def take(self, name: Name, length: int = 2) -> str:
+        candidates = initials_candidates(name, length)
+        for initials in candidates:
+            if initials not in self.taken:
+                self.taken.add(initials)
+                return initials
+
+        base = candidates[-1]
+        counter = self.counters.get(base, 2)
+        while f"{base}{counter}" in self.taken:
+            counter = counter + 1
+        self.counters[base] = counter + 1
+        self.taken.add(f"{base}{counter}")
+        return f"{base}{counter}"
+
+
+def taken_initials(cur: sqlite3.Cursor, initials: List[str]) -> Set[str]:
+    """The initials in "initials" that "persons" has already."""
+    if not initials:
+        return set()
+    placeholders = ", ".join("?" * len(initials))
+    query = f"SELECT initials FROM persons WHERE initials IN ({placeholders})"  # noqa
+    return {row[0] for row in cur.execute(query, initials)}
+
+
+# ######## writing ############################################################
+
+def existing_keys(cur: sqlite3.Cursor, keys: List[str]) -> Set[str]:
+    """The keys in "keys" that "names" has already, one indexed query."""
+    if not keys:
+        return set()
+    placeholders = ", ".join("?" * len(keys))
+    query = f"SELECT name_key FROM names WHERE name_key IN ({placeholders})"
+    return {row[0] for row in cur.execute(query, keys)}
+
+
+def next_id(cur: sqlite3.Cursor, table: str, column: str) -> int:
+    query = f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}"
+    return cur.execute(query).fetchone()[0]
+
+
+def record_key(record: Record) -> str:
+    return name_key(record.name.first_name, record.name.middle_names,
+                    record.name.last_name)
+
+
+def write_chunk(conn: sqlite3.Connection, created_by: str,
+                records: List[Record], pool: InitialsPool,
+                max_workers: int | None = None) -> List[Record]:
+    """
+    All records of the chunk in one transaction, or none of them. Returns
+    the records not written because their name exists already.
+    """
+    params = current_params()
+    hashes = hash_passwords([record.password for record in records], params,
+                            max_workers)
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    with UnitOfWork(conn) as cur:
+        # the ids are given, not taken from lastrowid: executemany has none
+        # per row. BEGIN IMMEDIATE keeps other writers out until the commit,
+        # so names, ids and initials checked here stay free.
+        keys = [record_key(record) for record in records]
+        in_db = existing_keys(cur, list(set(keys)))
+        rejected = [record for record, key in zip(records, keys)
+                    if key in in_db]
+        new = [(record, hashed) for record, key, hashed
+               in zip(records, keys, hashes) if key not in in_db]
+        all_initials = pool.take_chunk(cur, [record.name
+                                             for record, _ in new])
+        person_id = next_id(cur, "persons", "person_id")
+        name_id = next_id(cur, "names", "name_id")
+        persons, names, settings, blocks = [], [], [], []
+        for (record, (salt, password_hash)), initials in zip(new,
+                                                             all_initials):
+            name = record.name
+            persons.append((person_id, *person_row(created_by, timestamp,
+                                                   name, initials)))
+            names.append((name_id, *name_row(created_by, timestamp, name,
+                                             person_id)))
+            settings.append(settings_row(created_by, timestamp,
+                                         record.language, person_id,
+                                         initials, record.is_internal,
+                                         (salt, password_hash, params)))
+            blocks.extend(name_block_rows(name_id, name.last_name))
+            person_id = person_id + 1
+            name_id = name_id + 1
+
+        cur.executemany(person_insert, persons)
+        cur.executemany(name_insert, names)
+        cur.executemany(settings_insert, settings)
+        cur.executemany(name_block_insert, blocks)
+    return rejected
+
+
+def import_persons(conn: sqlite3.Connection, created_by: str,
+                   rows: Iterable[Tuple[int, dict]],
+                   chunk_size: int = CHUNK_SIZE,
+                   max_workers: int | None = None) -> ImportReport:
+    report = ImportReport()
+    start = time.perf_counter()
+    pool = InitialsPool(conn)
+    # keys of this file, a name twice in the file is imported once
+    seen: Set[str] = set()
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        records = []
+        for line, row in chunk:
+            try:
+                records.append(parse_record(line, row))
+            except RecordError as e:
+                report.rejected.append((line, str(e)))
+
+        # asked before hashing the passwords, write_chunk asks again
+        keys = [record_key(record) for record in records]
+        in_db = existing_keys(conn.cursor(), list(set(keys)))
+        new_records, new_keys = [], set()
+        for record, key in zip(records, keys):
+            if key in in_db or key in seen or key in new_keys:
+                report.rejected.append((record.line, "name already exists"))
+                continue
+            new_keys.add(key)
+            new_records.append(record)
+
+        if new_records:
+            try:
+                rejected = write_chunk(conn, created_by, new_records, pool,
+                                       max_workers)
+            except sqlite3.IntegrityError as e:
+                # rolled back as a whole, every record of it is reported
+                report.rejected.extend((record.line, f"not written: {e}")
+                                       for record in new_records)
+                continue
+            # only once written: after a rollback the names are still free
+            seen.update(new_keys)
+            report.rejected.extend((record.line, "name already exists")
+                                   for record in rejected)
+            report.imported = report.imported + len(new_records) - len(rejected)  # noqa
+
+    report.rejected.sort()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# ######## command line #######################################################
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: all records imported, 1: some rejected, 2: nothing done."""
+    import argparse
+
+    from .batch import open_for_cli
+
+    parser = argparse.ArgumentParser(
+        prog="main.py import", description="Import persons from CSV/JSONL.")
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for password hashing")
+    args = parser.parse_args(argv)
+
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        with open(args.file, encoding="utf-8", newline="") as f:
+            report = import_persons(conn, args.user, read_rows(args.file, f),
+                                    args.chunk_size, args.workers)
+    finally:
+        conn.close()
+
+    for line, reason in report.rejected:
+        print(f"line {line}: {reason}", file=sys.stderr)
+    print(report)
+    return 1 if report.rejected else 0
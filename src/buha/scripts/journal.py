@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# journal.py
+"""Double-entry bookkeeping: accounts, periods and the journal. An entry has
+two or more lines, amounts are integer cents (debit positive, credit
+negative) and the lines of every entry sum up to zero.
+
+Entries are posted in chunks: the ids are handed out in Python and entries
+and lines go in with one executemany each, only appended to the tables.
+Before the chunk commits, one query over the new lines checks that every
+entry balances; if one does not the whole chunk is rolled back. The running
+balances of the accounts (see balances.py) and the last entry of every
+period touched (see report_cache.py) are updated in the same transaction."""
+import bisect
+import datetime
+import sqlite3
+from dataclasses import dataclass
+from dataclasses import field
+from decimal import Decimal
+from decimal import InvalidOperation
+from itertools import islice
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+from .balances import add_to_balances
+from .balances import add_to_totals
+from .chart import account_index
+from .chart import forget_index
+from .database import UnitOfWork
+
+
+CHUNK_SIZE = 5000
+
+account_kinds = ["asset", "liability", "equity", "revenue", "expense"]
+
+
+class PostingError(Exception):
+    """An entry that cannot be posted, nothing of its chunk is written."""
+
+
+class UnbalancedEntry(PostingError):
+    """The lines of an entry do not sum up to zero."""
+
+
+@dataclass
+class Line():
+    account: str  # account number, e.g. "1200"
+    amount: int  # cents, debit > 0, credit < 0
+
+
+@dataclass
+class JournalEntry():
+    entry_date: str  # "YYYY-MM-DD"
+    lines: List[Line]
+    description: str | None = None
+    reference: str | None = None
+    # set when posted
+    entry_id: int | None = field(default=None, compare=False)
+
+
+def cents(amount: str | int | Decimal) -> int:
+    """
+    "1.234,56", "1234.56" and Decimal("1234.56") are all 123456. An int is
+    taken as cents already, like every amount in the journal.
+    """
+    if isinstance(amount, bool):
+        raise ValueError(f"no amount: {amount!r}")
+    if isinstance(amount, int):
+        return amount
+    text = str(amount).strip().replace(" ", "")
+    if "," in text:
+        # German notation, "." separates thousands
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        value = Decimal(text) * 100
+    except InvalidOperation:
+        raise ValueError(f"no amount: '{amount}'") from None
+    if value != value.to_integral_value():
+        raise ValueError(f"more than two decimals: '{amount}'")
+    return int(value)
+
+
+def iso_date(value: str | datetime.date) -> str:
+    """"YYYY-MM-DD", other strings raise ValueError."""
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if len(value) != 10:
+        raise ValueError(f"no date: '{value}'")
+    datetime.date.fromisoformat(value)  # only to check it
+    return value
+
+
+# ######## accounts and periods ###############################################
+
+def add_account(conn: sqlite3.Connection, created_by: str, number: str,
+                name: str, kind: str) -> int:
+    """Does not commit, the caller's transaction does (see UnitOfWork)."""
+    if kind not in account_kinds:
+        raise ValueError(f"unknown kind of account '{kind}'")
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    add_account = """INSERT INTO accounts (
+                     number, name, kind, created_by, timestamp)
+                     VALUES (?, ?, ?, ?, ?)"""
+    cur = conn.cursor()
+    cur.execute(add_account, (number.strip(), name.strip(), kind, created_by,
+                              timestamp))
+    forget_index(conn)
+    return cur.lastrowid
+
+
+def add_period(conn: sqlite3.Connection, name: str, start_date: str,
+               end_date: str) -> int:
+    """Does not commit, the caller's transaction does (see UnitOfWork)."""
+    start_date, end_date = iso_date(start_date), iso_date(end_date)
+    cur = conn.cursor()
+    overlap = cur.execute("""SELECT name FROM periods
+                             WHERE start_date <= ? AND end_date >= ?""",
+                          (end_date, start_date)).fetchone()
+    if overlap is not None:
+        raise ValueError(f"overlaps with period '{overlap[0]}'")
+    cur.execute("""INSERT INTO periods (name, start_date, end_date)
+                   VALUES (?, ?, ?)""", (name, start_date, end_date))
+    return cur.lastrowid
+
+
+class PeriodIndex():
+    """The open periods by start date; finds the period of a date by bisect."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        cur = conn.cursor()
+        rows = cur.execute("""SELECT start_date, end_date, period_id
+                              FROM periods WHERE closed = 0
+                              ORDER BY start_date""").fetchall()
+        self.starts = [row[0] for row in rows]
+        self.periods = rows
+
+    def period_of(self, entry_date: str) -> int:
+        i = bisect.bisect_right(self.starts, entry_date) - 1
+        if i >= 0:
+            start_date, end_date, period_id = self.periods[i]
+            if entry_date <= end_date:
+                return period_id
+        raise PostingError(f"no open period for {entry_date}")
+
+
+# ######## posting ############################################################
+
+def check_entry(entry: JournalEntry, accounts: Dict[str, int]) -> None:
+    if len(entry.lines) < 2:
+        raise PostingError("an entry needs at least two lines")
+    for line in entry.lines:
+        if line.account not in accounts:
+            raise PostingError(f"unknown account '{line.account}'")
+        if not isinstance(line.amount, int) or line.amount == 0:
+            raise PostingError(f"amount must be cents other than 0, not {line.amount!r}")  # noqa
+    total = sum(line.amount for line in entry.lines)
+    if total != 0:
+        raise UnbalancedEntry(f"entry of {entry.entry_date} is off by {total} cents")  # noqa
+
+
+def next_id(cur: sqlite3.Cursor, table: str, column: str) -> int:
+    query = f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}"
+    return cur.execute(query).fetchone()[0]
+
+
+def unbalanced_entries(cur: sqlite3.Cursor, first_line_id: int = 1) -> List[Tuple[int, int]]:  # noqa
+    """(entry_id, sum) of the entries not summing up to zero."""
+    query = """SELECT entry_id, SUM(amount) FROM journal_lines
+               WHERE line_id >= ?
+               GROUP BY entry_id
+               HAVING SUM(amount) <> 0"""
+    return cur.execute(query, (first_line_id,)).fetchall()
+
+
+def write_entries(conn: sqlite3.Connection, created_by: str,
+                  entries: List[JournalEntry],
+                  accounts: Dict[str, int]) -> None:
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    add_entry = """INSERT INTO journal_entries (
+                   entry_id, period_id, entry_date, description, reference,
+                   created_by, timestamp)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    add_line = """INSERT INTO journal_lines (
+                  line_id, entry_id, account_id, entry_date, amount)
+                  VALUES (?, ?, ?, ?, ?)"""
+
+    with UnitOfWork(conn) as cur:
+        # BEGIN IMMEDIATE: nobody else hands out ids or closes a period
+        # meanwhile, so the periods are read here and not once per run
+        periods = PeriodIndex(conn)
+        entry_id = next_id(cur, "journal_entries", "entry_id")
+        first_line_id = line_id = next_id(cur, "journal_lines", "line_id")
+        entry_rows, line_rows, totals = [], [], {}
+        last_entries: Dict[int, int] = {}  # period_id -> entry_id
+        for entry in entries:
+            entry_date = iso_date(entry.entry_date)
+            period_id = periods.period_of(entry_date)
+            entry_rows.append((entry_id, period_id, entry_date,
+                               entry.description, entry.reference,
+                               created_by, timestamp))
+            for line in entry.lines:
+                account_id = accounts[line.account]
+                line_rows.append((line_id, entry_id, account_id, entry_date,
+                                  line.amount))
+                add_to_totals(totals, account_id, period_id, line.amount)
+                line_id = line_id + 1
+            last_entries[period_id] = entry_id
+            entry.entry_id = entry_id
+            entry_id = entry_id + 1
+
+        try:
+            cur.executemany(add_entry, entry_rows)
+            cur.executemany(add_line, line_rows)
+        except sqlite3.IntegrityError as e:
+            # the triggers of closing.py, e.g. inside a caller's transaction
+            # that was not started IMMEDIATE
+            if "period is closed" in str(e):
+                raise PostingError(str(e)) from e
+            raise
+
+        # the invariant, checked in the database right before the commit
+        unbalanced = unbalanced_entries(cur, first_line_id)
+        if unbalanced:
+            raise UnbalancedEntry(f"entry {unbalanced[0][0]} is off by {unbalanced[0][1]} cents")  # noqa
+        add_to_balances(cur, totals)
+        cur.executemany("""UPDATE periods SET last_entry_id = ?
+                           WHERE period_id = ?""",
+                        [(last, period_id)
+                         for period_id, last in last_entries.items()])
+
+
+def post_entries(conn: sqlite3.Connection, created_by: str,
+                 entries: Iterable[JournalEntry],
+                 chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Post "entries", one transaction per chunk. Returns the number posted.
+    A PostingError stops the run; the chunks before it stay posted.
+    """
+    accounts = account_index(conn).ids
+    posted = 0
+    entries = iter(entries)
+    while True:
+        chunk = list(islice(entries, chunk_size))
+        if not chunk:
+            return posted
+        for entry in chunk:
+            check_entry(entry, accounts)
+        write_entries(conn, created_by, chunk, accounts)
+        posted = posted + len(chunk)
+
+
+def post_entry(conn: sqlite3.Connection, created_by: str,
+               entry: JournalEntry) -> int:
+    """Post a single entry, returns its entry_id."""
+    post_entries(conn, created_by, [entry])
+    return entry.entry_id
+
+
+def verify_journal(conn: sqlite3.Connection) -> List[Tuple[int, int]]:
+    """The unbalanced entries of the whole journal, [] if all is well."""
+    return unbalanced_entries(conn.cursor())
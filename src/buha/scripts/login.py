@@ -1,26 +1,42 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # login.py
-import getpass
-import hashlib
-import os
 import sqlite3
 
+from dataclasses import dataclass
 from typing import Tuple
 
 from .constants import enter_initials
 from .constants import choose_option
 from .constants import password_prompt
+from .editing import versioned_update
+from .hashing import current_params
+from .hashing import hash_password
+from .hashing import HashParams
+from .hashing import needs_rehash
+from .hashing import stored_params
+from .hashing import verify_password
 from .helpers import Menu
+from .helpers import Navigation
 
 
 debug = False
 
 
+@dataclass
+class Credentials():
+    """Everything a login needs from table "settings", read in one query."""
+    salt: bytes
+    password_hash: bytes
+    is_internal: bool
+    params: HashParams
+    version: int | None = None
+
+
 class LoginMenu(Menu):
     """Menu options for starting buha."""
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("login")
 
     def display_menu(self, company_name: str, language: str,
@@ -50,17 +66,71 @@ class LoginMenu(Menu):
         debug = False
 
         initials = enter_initials(language)
-        if initials_in_table(conn, initials):
-            if is_internal(conn, initials):
-                if debug:
-                    password = input(password_prompt[language])
-                else:
-                    password = getpass.getpass(password_prompt[language])
-                if password_correct(conn, initials, password):
-                    return True, initials
+
+        # the only database round trip of a login
+        credentials = load_credentials(conn, initials)
+        if credentials is None or not credentials.is_internal:
+            return False, None
+
+        if debug:
+            password = input(password_prompt[language])
+        else:
+            import getpass
+            password = getpass.getpass(password_prompt[language])
+        if credentials_match(credentials, password):
+            if needs_rehash(credentials.params):
+                rehash_password(conn, initials, password,
+                                credentials.version)
+            return True, initials
         return False, None
 
 
+def load_credentials(conn: sqlite3.Connection, initials: str) -> Credentials | None:  # noqa
+    """
+    Salt, password hash, hash parameters and the internal flag of "initials"
+    in one indexed query. Returns None if there are no settings for these
+    initials.
+    """
+    query = """SELECT salt, password_hash, is_internal,
+                      hash_algorithm, hash_iterations, version
+               FROM settings
+               WHERE initials = ?"""
+    cur = conn.cursor()
+    res = cur.execute(query, (initials,))
+    row = res.fetchone()
+    if row is None:
+        return None
+
+    salt, password_hash, internal, algorithm, iterations, version = row
+    params = stored_params(algorithm, iterations)
+    return Credentials(salt, password_hash, bool(internal), params, version)
+
+
+def credentials_match(credentials: Credentials, password: str) -> bool:
+    return verify_password(password, credentials.salt,
+                           credentials.password_hash, credentials.params)
+
+
+def rehash_password(conn: sqlite3.Connection, initials: str,
+                    password: str, version: int | None = None) -> None:
+    """
+    Replace a hash made with outdated parameters. Only possible right after a
+    successful login because the plain password is needed. With "version"
+    nothing is written if the settings changed since the login read them,
+    e.g. the password was changed meanwhile.
+    """
+    params = current_params()
+    salt, password_hash = hash_password(password, params=params)
+    changes = {"salt": salt, "password_hash": password_hash,
+               "hash_algorithm": params.algorithm,
+               "hash_iterations": params.iterations}
+
+    with conn:
+        cur = conn.cursor()
+        versioned_update(cur, "settings", changes, {"initials": initials},
+                         version)
+
+
 def is_internal(conn: sqlite3.Connection, initials: str) -> bool:
     with conn:
         cur = conn.cursor()
@@ -72,53 +142,9 @@ def is_internal(conn: sqlite3.Connection, initials: str) -> bool:
         return False
 
 
-def hash_password(password, salt=None):
-    if not salt:
-        salt = os.urandom(16)  # Generate a random salt
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)  # noqa
-    return salt, password_hash
-
-
-def initials_in_table(conn: sqlite3.Connection, initials: str) -> bool:
-    with conn:
-        cur = conn.cursor()
-        res = cur.execute("SELECT initials FROM persons")
-        res_initials = res.fetchall()
-        for res in res_initials:
-            abbr = ''.join(str(c) for c in res)
-            if 0:
-                print("res_initials: ", res_initials)
-                print("abbr: ", abbr)
-                print("initials: ", initials)
-            if abbr == initials:
-                return True
-    return False
-
-
 def password_correct(conn: sqlite3.Connection, initials: str, password: str) -> bool:  # noqa
+    credentials = load_credentials(conn, initials)
+    if credentials is None:
+        return False
 
-    with conn:
-        cur = conn.cursor()
-
-        # Retrieve salt from database
-        get_salt = "SELECT salt FROM settings WHERE initials = ?"
-        cur.execute(get_salt, (initials,))
-        salt_tuple = cur.fetchone()
-        if salt_tuple:
-            salt = salt_tuple[0]
-        else:
-            return False
-
-        # Retrieve hashed password from database
-        get_pw = "SELECT password_hash FROM settings WHERE initials = ?"
-        cur.execute(get_pw, (initials,))
-        hashed_pw_tuple = cur.fetchone()
-
-        if hashed_pw_tuple:
-            password_hash = hashed_pw_tuple[0]
-        else:
-            return False
-
-        _, computed_password_hash = hash_password(password, salt)
-
-        return computed_password_hash == password_hash
+    return credentials_match(credentials, password)
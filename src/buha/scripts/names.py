@@ -15,17 +15,22 @@ from .constants import middlenames_prompt
 from .constants import nickname_prompt
 from .constants import previous_prompt
 from .constants import salutation_prompt
+from .constants import similar_names_prompt
 from .constants import suffix_prompt
 from .constants import enter_prompt
+from .duplicates import add_name_blocks
+from .duplicates import find_similar_names
 from .helpers import Menu
+from .helpers import Navigation
 from .shared import Name
+from .shared import name_key
 
 
 class MenuName(Menu):
     """Menu to enter the names of a contact."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("names")
 
         self.entries = {
@@ -86,14 +91,12 @@ class MenuName(Menu):
         name = self.generate_name_instance()
         if name.first_name is None or name.last_name is None:
             print("No valid name. Name needs first and last names.")
-            super().go_back()
             return None
 
         # note: the actual commitment to the database will be done by the
         # calling function from person.py because person_id is needed and can
         # only be provided from there
 
-        super().go_back()
         return name
 
     def enter_firstname(self, language: str) -> None:
@@ -141,39 +144,37 @@ class MenuName(Menu):
             print(name)
         return name
 
-    def generate_table_names(self, conn: sqlite3.Connection) -> None:
-        table_names = """CREATE TABLE IF NOT EXISTS names (
-                         name_id INTEGER PRIMARY KEY,
-                         person_id INTEGER,
-                         created_by TEXT,
-                         timestamp TEXT,
-                         first_name TEXT NOT NULL,
-                         middle_names TEXT,
-                         last_name TEXT NOT NULL,
-                         nickname TEXT,
-                         previous_name TEXT,
-                         suffix TEXT,
-                         salutation TEXT,
-                         FOREIGN KEY (person_id)
-                            REFERENCES persons(person_id)
-                            ON DELETE CASCADE
-                         )"""
-        with conn:
-            cur = conn.cursor()
-            cur.execute(table_names)
-            conn.commit()
-
-    def commit_name_to_db(self, conn: sqlite3.Connection, created_by: str,
-                          name: Name, person_id: int, language: str) -> None:
-        self.generate_table_names(conn)
-        if not self.name_already_in_db(conn, name, language):
-            self.add_name_to_db(conn, created_by, name, person_id)
-            self.reset_entries()
-        else:
-            self.handle_double_entry(conn, created_by, name, person_id, language)  # noqa
+    def check_name(self, conn: sqlite3.Connection, name: Name,
+                   language: str) -> Name | None:
+        """
+        The name to store or None if it is in the database already. Asks for
+        a middle name when first and last names are taken. Nothing is written
+        here, so no write lock is held while the user types.
+        """
+        if self.name_already_in_db(conn, name, language):
+            name = self.handle_double_entry(conn, name, language)
+        if name is None:
+            return None
+        return self.handle_similar_names(conn, name, language)
+
+    def handle_similar_names(self, conn: sqlite3.Connection, name: Name,
+                             language: str) -> Name | None:
+        """"Mueller" when "Müller" exists: show the candidates and ask."""
+        similar = find_similar_names(conn, name)
+        if not similar:
+            return name
+
+        for match in similar[:5]:
+            names = [match.first_name, match.middle_names, match.last_name]
+            print(f"    {' '.join(n for n in names if n)} ({match.score}%)")
+        choice = enter_prompt(similar_names_prompt, language)
+        if choice == "y":
+            return name
+        self.reset_entries()
+        return None
 
-    def handle_double_entry(self, conn: sqlite3.Connection, created_by: str,
-                            name: Name, person_id: int, language: str) -> None:
+    def handle_double_entry(self, conn: sqlite3.Connection, name: Name,
+                            language: str) -> Name | None:
         double = """
         Entry with these first and last names already exists.
         Please add a middle name!
@@ -184,51 +185,58 @@ class MenuName(Menu):
         name = self.generate_name_instance()
 
         if not self.name_already_in_db(conn, name, language):
-            self.add_name_to_db(conn, created_by, name, person_id)
-            self.reset_entries()
-            return
+            return name
         else:
             message_name_exists = "Name already exists. Aborting"
             print(message_name_exists)
             self.reset_entries()
-            return
+            return None
 
     def add_name_to_db(self, conn: sqlite3.Connection, created_by: str,
                        name: Name, person_id: int) -> None:
-        add_name = """INSERT INTO names (
-                      person_id, created_by, timestamp, first_name,
-                      middle_names, last_name, nickname, previous_name, suffix,
-                      salutation)
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        """Does not commit, the caller's transaction does (see UnitOfWork)."""
         timestamp = str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
         # timestamp = str(datetime.date.today())
-
-        with conn:
-            cur = conn.cursor()
-            cur.execute(add_name, (person_id, created_by, timestamp,
-                                   name.first_name, name.middle_names,
-                                   name.last_name, name.nickname,
-                                   name.previous_name, name.suffix,
-                                   name.salutation))
-            conn.commit()
+        insert_name(conn, created_by, timestamp, name, person_id)
 
     def name_already_in_db(self, conn: sqlite3.Connection, name: Name,
                            language) -> bool:
-        select_names = "SELECT first_name, middle_names, last_name FROM names"
-        with conn:
-            cur = conn.cursor()
-            res = cur.execute(select_names)
-            names = res.fetchall()
-
-        for name_tuple in names:
-            fn, mn, ln = name_tuple[0], name_tuple[1], name_tuple[2]
-            if 0:
-                print(fn, mn, ln)
-            if fn.lower() == name.first_name.lower():
-                if ln.lower() == name.last_name.lower():
-                    if mn is None and name.middle_names is None:
-                        return True
-                    elif mn is None and name.middle_names is not None:
-                        return False
-                    else:
-                        return mn.lower() == name.middle_names.lower()
+        return name_in_db(conn, name)
+
+
+def name_in_db(conn: sqlite3.Connection, name: Name) -> bool:
+    """
+    Same first, middle and last names, ignoring case and whitespace.
+    A single lookup in the index on "name_key".
+    """
+    select_name = "SELECT 1 FROM names WHERE name_key = ? LIMIT 1"
+    key = name_key(name.first_name, name.middle_names, name.last_name)
+    cur = conn.cursor()
+    return cur.execute(select_name, (key,)).fetchone() is not None
+
+
+# the id is given by importer.py (executemany), None lets SQLite pick one
+name_insert = """INSERT INTO names (
+                 name_id, person_id, created_by, timestamp, first_name,
+                 middle_names, last_name, nickname, previous_name, suffix,
+                 salutation, name_key)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def name_row(created_by: str, timestamp: str, name: Name,
+             person_id: int) -> tuple:
+    """The values of a new row of "names", see also importer.py."""
+    key = name_key(name.first_name, name.middle_names, name.last_name)
+    return (person_id, created_by, timestamp, name.first_name,
+            name.middle_names, name.last_name, name.nickname,
+            name.previous_name, name.suffix, name.salutation, key)
+
+
+def insert_name(conn: sqlite3.Connection, created_by: str, timestamp: str,
+                name: Name, person_id: int) -> int:
+    cur = conn.cursor()
+    cur.execute(name_insert, (None, *name_row(created_by, timestamp, name,
+                                              person_id)))
+    name_id = cur.lastrowid
+    add_name_blocks(conn, name_id, name.last_name)
+    return name_id
@@ -2,16 +2,23 @@
 # -*- coding: utf-8 -*-
 # new_entry.py
 import sqlite3
+from .constants import account_exists
+from .constants import account_kind_labels
+from .constants import account_prompts
+from .constants import chart_loaded
+from .constants import chart_prompt
 from .constants import choose_option
+from .database import UnitOfWork
 from .person import MenuNewPerson
 from .helpers import Menu
+from .helpers import Navigation
 
 
 class MenuNewEntry(Menu):
     """Menu options for adding a new entry."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("new entry")
 
         self.choices = {
@@ -51,7 +58,7 @@ class MenuNewEntry(Menu):
 
         print("I was here.")
 
-        menu = MenuNewPerson()
+        menu = MenuNewPerson(self.navigation)
         menu.enter_name(conn, created_by, company_name, language)
 
     def new_entity(self, conn: sqlite3.Connection, created_by: str,
@@ -71,8 +78,51 @@ class MenuNewEntry(Menu):
         print("ToDo")  # pragma: no cover
 
     def new_account(self, conn: sqlite3.Connection, created_by: str,
-                    company_name: str, language: str) -> None:
-        print("ToDo")  # pragma: no cover
+                    company_name: str, language: str) -> int | None:
+        """Add an account to the chart of accounts, returns its id."""
+        from .chart import account_index
+        from .journal import account_kinds
+        from .journal import add_account
+
+        if not len(account_index(conn)):
+            self.choose_chart(conn, created_by, language)
+
+        prompts = account_prompts[language]
+        number = input(prompts["number"]).strip()
+        name = input(prompts["name"]).strip()
+        if not number or not name:
+            return None
+
+        labels = account_kind_labels[language]
+        for i, kind in enumerate(account_kinds, 1):
+            print(f"    {i}: {labels[kind]}")
+        choice = input(prompts["kind"]).strip()
+        if not choice.isdigit() or not 1 <= int(choice) <= len(account_kinds):  # noqa
+            return None
+        kind = account_kinds[int(choice) - 1]
+
+        try:
+            with UnitOfWork(conn):
+                return add_account(conn, created_by, number, name, kind)
+        except sqlite3.IntegrityError:
+            print(account_exists[language])
+            return None
+
+    def choose_chart(self, conn: sqlite3.Connection, created_by: str,
+                     language: str) -> int:
+        """Offer SKR03 or SKR04, returns the number of accounts added."""
+        from .chart import charts
+        from .chart import load_chart
+
+        for i, chart in enumerate(charts, 1):
+            print(f"    {i}: {chart}")
+        choice = input(chart_prompt[language]).strip()
+        if not choice.isdigit() or not 1 <= int(choice) <= len(charts):
+            return 0
+        chart = charts[int(choice) - 1]
+        added = load_chart(conn, created_by, chart)
+        print(chart_loaded[language].format(added=added, chart=chart))
+        return added
 
     def settings(self, conn: sqlite3.Connection, created_by: str,
                  company_name: str, language: str) -> None:
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# onboarding.py
+"""Add many persons at once, e.g. a whole department. The password hashes are
+the expensive part, so they are computed in a pool of processes first. Only
+after all hashes are back the rows for "persons", "names" and "settings" are
+written, all in one transaction."""
+import datetime
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import List
+from typing import Tuple
+
+from .database import UnitOfWork
+from .hashing import current_params
+from .hashing import hash_password
+from .hashing import HashParams
+from .helpers import mk_initials
+from .names import insert_name
+from .person import insert_person
+from .settings import INITIAL_PASSWORD
+from .settings import insert_settings
+from .shared import Name
+
+
+@dataclass
+class NewEmployee():
+    name: Name
+    is_internal: bool = True
+    language: str = "de"
+    password: str = INITIAL_PASSWORD
+
+
+def hash_passwords(passwords: List[str], params: HashParams,
+                   max_workers: int | None = None) -> List[Tuple[bytes, bytes]]:  # noqa
+    """
+    (salt, password_hash) for every password, in the same order. The salts
+    are drawn here, the hashing itself runs in a process pool.
+    """
+    salts = [os.urandom(16) for _ in passwords]
+    if len(passwords) < 2 or max_workers == 1:
+        return [hash_password(password, salt, params)
+                for password, salt in zip(passwords, salts)]
+
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(hash_password, passwords, salts,
+                                 repeat(params), chunksize=chunksize))
+
+
+def add_employees(conn: sqlite3.Connection, created_by: str,
+                  employees: List[NewEmployee],
+                  max_workers: int | None = None) -> List[str]:
+    """Returns the initials of the new persons in the order of "employees"."""
+    params = current_params()
+    passwords = [employee.password for employee in employees]
+    hashes = hash_passwords(passwords, params, max_workers)
+
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    all_initials = []
+    with UnitOfWork(conn):
+        for employee, (salt, password_hash) in zip(employees, hashes):
+            name = employee.name
+            # sees the persons inserted before in this transaction
+            initials = mk_initials(conn, name, 2)
+            person_id = insert_person(conn, created_by, timestamp, name,
+                                      initials)
+            insert_name(conn, created_by, timestamp, name, person_id)
+            insert_settings(conn, created_by, timestamp, employee.language,
+                            person_id, initials, employee.is_internal,
+                            (salt, password_hash, params))
+            all_initials.append(initials)
+
+    return all_initials
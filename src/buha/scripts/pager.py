@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pager.py
+"""Show a table page by page. A page is read with keyset pagination on the
+primary key ("WHERE person_id > ? ORDER BY person_id LIMIT ?"), so going to
+the next page, jumping to an id or filtering by a column never reads more
+than one page of rows, however large the table is. A primary key of several
+columns is compared as a whole: "WHERE (account_id, period_id) > (?, ?)"."""
+import sqlite3
+from dataclasses import dataclass
+from typing import Any
+from typing import List
+from typing import Tuple
+
+from .constants import pager_empty
+from .constants import pager_prompt
+from .shared import clear_screen
+
+
+PAGE_SIZE = 20
+
+
+@dataclass
+class Page():
+    columns: List[str]
+    rows: List[tuple]
+    # more rows before/after this page?
+    has_previous: bool
+    has_next: bool
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> Tuple[List[str], List[str]]:  # noqa
+    """
+    Column names and the columns of the primary key of "table", in key
+    order; ["rowid"] for a table without one. Only tables of the database
+    can be shown, the name is checked before it goes into a query.
+    """
+    cur = conn.cursor()
+    exists = cur.execute("""SELECT 1 FROM sqlite_master
+                            WHERE type = 'table' AND name = ?""", (table,))
+    if exists.fetchone() is None:
+        raise ValueError(f"no table '{table}'")
+    info = cur.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in info]
+    pk = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return columns, pk or ["rowid"]
+
+
+def compare(columns: List[str], operator: str) -> str:
+    """"person_id > ?" or "(account_id, period_id) > (?, ?)"."""
+    if len(columns) == 1:
+        return f"{columns[0]} {operator} ?"
+    placeholders = ", ".join("?" * len(columns))
+    return f"({', '.join(columns)}) {operator} ({placeholders})"
+
+
+def render_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return str(value)
+
+
+def render_page(page: Page) -> str:
+    from prettytable import PrettyTable  # loaded on the first table only
+
+    t = PrettyTable(page.columns)
+    t.align = "l"
+    for row in page.rows:
+        t.add_row([render_value(value) for value in row])
+    return t.get_string()
+
+
+class Pager():
+    """
+    Holds the keys of the first and last row on screen; the next page starts
+    after the last one, the previous page ends before the first one. The
+    key columns are selected in front of the columns shown.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str,
+                 page_size: int = PAGE_SIZE) -> None:
+        self.conn = conn
+        self.table = table
+        self.columns, self.pk = table_columns(conn, table)
+        self.page_size = page_size
+        self.filter: Tuple[str, str] | None = None
+        self.page = Page(self.columns, [], False, False)
+
+    def where(self, condition: str | None, params: list) -> Tuple[str, list]:
+        conditions = [condition] if condition else []
+        if self.filter is not None:
+            column, text = self.filter
+            conditions.append(f"{column} LIKE ?")
+            params = params + [f"%{text}%"]
+        if not conditions:
+            return "", params
+        return "WHERE " + " AND ".join(conditions), params
+
+    def fetch(self, condition: str | None, params: list,
+              descending: bool = False) -> List[tuple]:
+        """One row more than a page, to know whether another page follows."""
+        where, params = self.where(condition, params)
+        direction = "DESC" if descending else "ASC"
+        order = ", ".join(f"{column} {direction}" for column in self.pk)
+        columns = ", ".join(self.pk + self.columns)
+        query = f"""SELECT {columns} FROM {self.table} {where}
+                    ORDER BY {order} LIMIT ?"""
+        cur = self.conn.cursor()
+        return cur.execute(query, params + [self.page_size + 1]).fetchall()
+
+    def key(self, row: tuple) -> list:
+        return list(row[:len(self.pk)])
+
+    def show_rows(self, rows: List[tuple], has_previous: bool,
+                  has_next: bool) -> Page:
+        self.page = Page(self.columns, rows, has_previous, has_next)
+        return self.page
+
+    def first(self) -> Page:
+        rows = self.fetch(None, [])
+        return self.show_rows(rows[:self.page_size], False,
+                              len(rows) > self.page_size)
+
+    def jump(self, key: Any) -> Page:
+        """
+        The page starting at "key" or the next key after it. "key" is the
+        value of the first column of the primary key.
+        """
+        rows = self.fetch(f"{self.pk[0]} >= ?", [key])
+        if not rows:
+            return self.last()
+        before = self.fetch(compare(self.pk, "<"), self.key(rows[0]),
+                            descending=True)
+        return self.show_rows(rows[:self.page_size], bool(before),
+                              len(rows) > self.page_size)
+
+    def last(self) -> Page:
+        rows = self.fetch(None, [], descending=True)
+        return self.show_rows(rows[:self.page_size][::-1],
+                              len(rows) > self.page_size, False)
+
+    def next(self) -> Page:
+        if not self.page.has_next:
+            return self.page
+        rows = self.fetch(compare(self.pk, ">"), self.key(self.page.rows[-1]))
+        if not rows:
+            return self.page  # deleted meanwhile, stay where we are
+        return self.show_rows(rows[:self.page_size], True,
+                              len(rows) > self.page_size)
+
+    def previous(self) -> Page:
+        if not self.page.has_previous:
+            return self.page
+        rows = self.fetch(compare(self.pk, "<"), self.key(self.page.rows[0]),
+                          descending=True)
+        if not rows:
+            return self.page  # deleted meanwhile, stay where we are
+        return self.show_rows(rows[:self.page_size][::-1],
+                              len(rows) > self.page_size, True)
+
+    def filter_by(self, column: str | None, text: str = "") -> Page:
+        """Rows whose "column" contains "text", None shows all rows again."""
+        if column is None:
+            self.filter = None
+        elif column not in self.columns:
+            raise ValueError(f"no column '{column}' in '{self.table}'")
+        else:
+            self.filter = (column, text)
+        return self.first()
+
+    def rendered(self, language: str) -> str:
+        if not self.page.rows:
+            return pager_empty[language]
+        # the primary key selected in front is for paging only
+        page = Page(self.columns,
+                    [row[len(self.pk):] for row in self.page.rows],
+                    self.page.has_previous, self.page.has_next)
+        return render_page(page)
+
+    def run(self, language: str = "de") -> None:
+        self.first()
+        message = ""
+        while True:
+            clear_screen()
+            print(f"    {self.table}")
+            print(self.rendered(language))
+            if message:
+                print(f"    {message}")
+            command = input(pager_prompt[language]).strip()
+            if command.lower() == "q":
+                break
+            try:
+                self.handle(command)
+                message = ""
+            except ValueError as e:
+                message = str(e)
+
+    def handle(self, command: str) -> None:
+        """Commands as in pager_prompt."""
+        action, _, argument = command.partition(" ")
+        action = action.lower()
+        argument = argument.strip()
+        if action in ("", "n"):
+            self.next()
+        elif action == "p":
+            self.previous()
+        elif action == "g" and argument:
+            self.jump(int(argument) if argument.isdigit() else argument)
+        elif action == "f":
+            column, _, text = argument.partition(" ")
+            self.filter_by(column or None, text.strip())
@@ -6,13 +6,17 @@ company's database of the same name as company."""
 import datetime
 import sqlite3
 from dataclasses import dataclass
+from typing import Tuple
 from .constants import choose_option
-from .helpers import continue_
+from .database import UnitOfWork
+from .helpers import check_if_internal
 from .helpers import Menu
+from .helpers import Navigation
 from .helpers import mk_initials
 from .helpers import show_table
 from .names import MenuName
 from .settings import add_settings
+from .settings import initial_credentials
 from .shared import Name
 
 
@@ -28,8 +32,8 @@ class Person():
 class MenuNewPerson(Menu):
     """Menu to enter name and particulars of a person."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("person")
 
         self.choices = {
@@ -57,7 +61,7 @@ class MenuNewPerson(Menu):
             elif choice == "3":
                 self.enter_particulars()
             elif choice == "4":
-                self.show_tables(conn, "persons")
+                self.show_tables(conn, "persons", language)
             else:
                 name = None
                 break
@@ -69,18 +73,25 @@ class MenuNewPerson(Menu):
                    company_name: str, language: str) -> None:
 
         # "company_name" is needed to display the company's name in MenuName
-        menu = MenuName()
+        menu = MenuName(self.navigation)
         name = menu.run(conn, created_by, company_name, language)  # format dataclass "Name"  # noqa
+        if name is not None:
+            name = menu.check_name(conn, name, language)
         if name is None:
-            super().go_back()
             return None
-        else:
-            self.generate_table_persons(conn)
-            initials = self.add_person_to_db(conn, created_by, name, 2)  # unique identifier  # noqa
-            person_id = self.get_person_id(conn, initials)  # foreign key
-            menu.commit_name_to_db(conn, created_by, name, person_id, language)  # needs foreign key  # noqa
-            add_settings(conn, created_by, language, person_id, initials)
-            super().change_menu("person")
+
+        # questions and hashing first, the transaction must not wait for them
+        is_internal = check_if_internal()
+        credentials = initial_credentials()
+
+        # persons, names and settings in one transaction
+        with UnitOfWork(conn):
+            person_id, initials = self.add_person_to_db(conn, created_by, name, 2)  # unique identifier  # noqa
+            menu.add_name_to_db(conn, created_by, name, person_id)  # needs foreign key  # noqa
+            add_settings(conn, created_by, language, person_id, initials,
+                         is_internal, credentials)
+        menu.reset_entries()
+        super().change_menu("person")
 
     def enter_titles(self) -> None:
         print("ToDo")  # pragma: no cover
@@ -88,57 +99,45 @@ class MenuNewPerson(Menu):
     def enter_particulars(self) -> None:
         print("ToDo")  # pragma: no cover
 
-    def generate_table_persons(self, conn: sqlite3.Connection) -> None:
-        table_persons = """CREATE TABLE IF NOT EXISTS persons (
-                        person_id INTEGER PRIMARY KEY,
-                        created_by TEXT,
-                        timestamp TEXT,
-                        first_name TEXT NOT NULL,
-                        middle_names TEXT,
-                        last_name TEXT NOT NULL,
-                        initials TEXT NOT NULL
-                        )"""
-        with conn:
-            cur = conn.cursor()
-            cur.execute(table_persons)
-            conn.commit()
-
     def add_person_to_db(self, conn: sqlite3.Connection,
-                         created_by: str, name: Name, length: int) -> str | None:  # noqa
+                         created_by: str, name: Name, length: int) -> Tuple[int, str]:  # noqa
         """
         Adding the basic data about a person and who created it. "initials"
-        serves as the unique identifier.
+        serves as the unique identifier. Returns person_id and initials.
+        Does not commit, the caller's transaction does (see UnitOfWork).
         """
         initials = mk_initials(conn, name, length)
         if 0:
             print("initials in person.py add_person_to_db: ", initials)
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-        first_name = f"{name.first_name}"
-        last_name = f"{name.last_name}"
-        middle_names = f"{name.middle_names}"
-
-        add_person = """INSERT INTO persons (
-                        created_by, timestamp, first_name,
-                        middle_names, last_name, initials)
-                        VALUES (?, ?, ?, ?, ?, ?)"""
-        with conn:
-            cur = conn.cursor()
-            cur.execute(add_person, (created_by, timestamp, first_name,
-                                     middle_names, last_name, initials))
-            conn.commit()
-        return initials
-
-    def get_person_id(self, conn: sqlite3.Connection, initials: str) -> int:
-        query = """SELECT person_id FROM persons WHERE initials = ?"""
-        with conn:
-            cur = conn.cursor()
-            cur.execute(query, (initials,))
-            res = cur.fetchone()
-            if 0:
-                print("res in get_person_id: ", res)
-                print("res[0]: ", res[0])
-            return res[0]
-
-    def show_tables(self, conn: sqlite3.Connection, table: str) -> None:
-        show_table(conn, table)
-        continue_()
+        person_id = insert_person(conn, created_by, timestamp, name, initials)
+        return person_id, initials
+
+    def show_tables(self, conn: sqlite3.Connection, table: str,
+                    language: str = "de") -> None:
+        show_table(conn, table, language)
+
+
+# the id is given by importer.py (executemany), None lets SQLite pick one
+person_insert = """INSERT INTO persons (
+                   person_id, created_by, timestamp, first_name,
+                   middle_names, last_name, initials)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+def person_row(created_by: str, timestamp: str, name: Name,
+               initials: str) -> Tuple[str, str, str, str, str, str]:
+    """The values of a new row of "persons", see also importer.py."""
+    first_name = f"{name.first_name}"
+    last_name = f"{name.last_name}"
+    middle_names = f"{name.middle_names}"
+    return (created_by, timestamp, first_name, middle_names, last_name,
+            initials)
+
+
+def insert_person(conn: sqlite3.Connection, created_by: str, timestamp: str,
+                  name: Name, initials: str) -> int:
+    cur = conn.cursor()
+    cur.execute(person_insert, (None, *person_row(created_by, timestamp,
+                                                  name, initials)))
+    return cur.lastrowid
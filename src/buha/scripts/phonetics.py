@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# phonetics.py
+"""Blocking keys for the search of similar names: Kölner Phonetik codes and
+trigrams. Names that share no key are never compared, see duplicates.py.
+Plain functions without imports from the rest of buha, schema.py needs them
+to fill "name_blocks" for older databases."""
+import unicodedata
+from typing import List
+from typing import Set
+
+
+umlauts = {"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"}
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def transliterate(text: str) -> str:
+    """"Müller" and "Mueller" both become "mueller"."""
+    text = text.casefold()
+    for umlaut, replacement in umlauts.items():
+        text = text.replace(umlaut, replacement)
+    return strip_accents(text)
+
+
+def words(text: str | None) -> List[str]:
+    """Lowercase words of letters only, "Müller-Lüdenscheidt" has two."""
+    if not text:
+        return []
+    text = transliterate(text)
+    return "".join(c if c.isalpha() else " " for c in text).split()
+
+
+# ######## Kölner Phonetik ####################################################
+
+def koelner_phonetik(word: str) -> str:
+    """
+    Code of the Kölner Phonetik (Postel 1969): "Müller" and "Mueller" are
+    both "657", "Meier", "Maier" and "Mayer" are "67".
+    see also: https://de.wikipedia.org/wiki/Kölner_Phonetik
+    """
+    letters = [c for c in strip_accents(word.casefold().replace("ß", "s"))
+               if c.isalpha()]
+    digits = []
+    for i, c in enumerate(letters):
+        before = letters[i - 1] if i > 0 else ""
+        after = letters[i + 1] if i + 1 < len(letters) else ""
+        if c in "aeijouy":
+            code = "0"
+        elif c == "h":
+            continue
+        elif c == "b":
+            code = "1"
+        elif c == "p":
+            code = "3" if after == "h" else "1"
+        elif c in "dt":
+            code = "8" if after in ("c", "s", "z") else "2"
+        elif c in "fvw":
+            code = "3"
+        elif c in "gkq":
+            code = "4"
+        elif c == "c":
+            if i == 0:
+                code = "4" if after and after in "ahkloqrux" else "8"
+            elif before in ("s", "z"):
+                code = "8"
+            else:
+                code = "4" if after and after in "ahkoqux" else "8"
+        elif c == "x":
+            code = "8" if before in ("c", "k", "q") else "48"
+        elif c == "l":
+            code = "5"
+        elif c in "mn":
+            code = "6"
+        elif c == "r":
+            code = "7"
+        elif c in "sz":
+            code = "8"
+        else:
+            continue
+        digits.append(code)
+
+    collapsed = []
+    for digit in "".join(digits):
+        if not collapsed or collapsed[-1] != digit:
+            collapsed.append(digit)
+    if not collapsed:
+        return ""
+    return collapsed[0] + "".join(d for d in collapsed[1:] if d != "0")
+
+
+# ######## blocking keys ######################################################
+
+def trigrams(word: str) -> Set[str]:
+    if len(word) < 3:
+        return {word}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def blocking_keys(last_name: str) -> Set[str]:
+    """
+    Keys of "name_blocks": "p:" + phonetic code and "t:" + trigram of every
+    word of the last name. First and middle names are left out on purpose,
+    common first names would make the candidate sets large.
+    """
+    keys = set()
+    for word in words(last_name):
+        code = koelner_phonetik(word)
+        if code:
+            keys.add(f"p:{code}")
+        keys.update(f"t:{gram}" for gram in trigrams(word))
+    return keys
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# reconcile.py
+"""Bank reconciliation: which open item does a bank transaction pay?
+
+    BUHA_PASSWORD=... python main.py reconcile --company X --user ab \\
+        --from 2024-03-01 --to 2024-03-31 [--accept]
+
+Comparing every transaction with every open item would be quadratic. The
+open items are read once per run and indexed twice instead:
+
+- by amount, every list sorted by due date: a payment of the same amount
+  within "window" days of the due date is a candidate,
+- by reference, the invoice number without anything but letters and
+  digits: "RE-2024/17" is found in "Zahlung RE 2024 / 17, danke".
+
+Only these candidates are scored, the names with fuzz.ratio like
+helpers.check_for_matches does. The best pairs are proposed, each item and
+each transaction once; accept_matches() writes them."""
+import bisect
+import datetime
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from .database import UnitOfWork
+
+
+WINDOW = 30  # days around the due date
+THRESHOLD = 60
+MIN_REFERENCE = 4  # shorter references would match any number
+
+not_alnum = re.compile(r"[\W_]+")
+digit = re.compile(r"\d")
+word = re.compile(r"\w+")
+
+# points of a score, 100 at most
+AMOUNT_POINTS = 40
+REFERENCE_POINTS = 40
+NAME_POINTS = 20
+
+
+@dataclass
+class OpenItem():
+    item_id: int
+    reference: str | None
+    counterparty: str | None
+    amount: int  # cents, as on the bank statement
+    due_date: str
+
+
+@dataclass
+class BankLine():
+    txn_id: int
+    booking_date: str
+    amount: int
+    counterparty: str | None
+    purpose: str | None
+
+
+@dataclass
+class Match():
+    txn_id: int
+    item_id: int
+    score: int
+
+
+def add_open_item(conn: sqlite3.Connection, created_by: str,
+                  reference: str | None, counterparty: str | None,
+                  amount: int, due_date: str,
+                  entry_id: int | None = None) -> int:
+    """Does not commit, the caller's transaction does (see UnitOfWork)."""
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    add_item = """INSERT INTO open_items (
+                  reference, counterparty, amount, due_date, entry_id,
+                  created_by, timestamp)
+                  VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    cur = conn.cursor()
+    cur.execute(add_item, (reference, counterparty, amount, due_date,
+                           entry_id, created_by, timestamp))
+    return cur.lastrowid
+
+
+# ######## keys ###############################################################
+
+def squeeze(text: str) -> str:
+    """"re-2024/17" -> "RE202417"."""
+    return not_alnum.sub("", text).upper()
+
+
+def reference_keys(text: str | None, max_words: int = 4) -> Set[str]:
+    """
+    Every run of up to "max_words" words of "text", squeezed: a reference
+    may be split by blanks on the statement. Keys without a digit or
+    shorter than MIN_REFERENCE are left out.
+    """
+    if not text:
+        return set()
+    words = text.split()
+    keys = set()
+    for i in range(len(words)):
+        for n in range(1, max_words + 1):
+            if i + n > len(words):
+                break
+            key = squeeze("".join(words[i:i + n]))
+            if len(key) >= MIN_REFERENCE and digit.search(key):
+                keys.add(key)
+    return keys
+
+
+@lru_cache(maxsize=4096)
+def comparable_name(name: str | None) -> str:
+    return " ".join(word.findall(name.lower())) if name else ""
+
+
+@lru_cache(maxsize=1024)
+def shift(date: str, days: int) -> str:
+    return (datetime.date.fromisoformat(date)
+            + datetime.timedelta(days=days)).isoformat()
+
+
+def days_apart(a: str, b: str) -> int:
+    return abs((datetime.date.fromisoformat(a)
+                - datetime.date.fromisoformat(b)).days)
+
+
+# ######## index ##############################################################
+
+class ItemIndex():
+    """The open items by amount and due date and by reference."""
+
+    def __init__(self, items: Iterable[OpenItem]) -> None:
+        items = sorted(items, key=lambda item: (item.amount, item.due_date))
+        # amount -> (due dates, items), both sorted by due date
+        self.by_amount: Dict[int, Tuple[List[str], List[OpenItem]]] = {}
+        self.by_reference: Dict[str, List[OpenItem]] = {}
+        # item_id -> squeezed reference
+        self.references: Dict[int, str] = {}
+        for item in items:
+            dates, same_amount = self.by_amount.setdefault(item.amount,
+                                                           ([], []))
+            dates.append(item.due_date)
+            same_amount.append(item)
+            key = squeeze(item.reference or "")
+            if len(key) >= MIN_REFERENCE:
+                self.by_reference.setdefault(key, []).append(item)
+                self.references[item.item_id] = key
+
+    def candidates(self, line: BankLine, keys: Set[str],
+                   window: int = WINDOW) -> List[OpenItem]:
+        found: Dict[int, OpenItem] = {}
+        if line.amount in self.by_amount:
+            dates, items = self.by_amount[line.amount]
+            first = bisect.bisect_left(dates, shift(line.booking_date,
+                                                    -window))
+            last = bisect.bisect_right(dates, shift(line.booking_date,
+                                                    window))
+            for item in items[first:last]:
+                found[item.item_id] = item
+        for key in keys:
+            for item in self.by_reference.get(key, ()):
+                found[item.item_id] = item
+        return list(found.values())
+
+
+def score(line: BankLine, keys: Set[str], item: OpenItem,
+          index: ItemIndex, fuzz) -> int:
+    total = 0
+    if item.amount == line.amount:
+        total = total + AMOUNT_POINTS
+    if index.references.get(item.item_id) in keys:
+        total = total + REFERENCE_POINTS
+    wanted = comparable_name(line.counterparty)
+    if wanted and item.counterparty:
+        ratio = fuzz.ratio(wanted, comparable_name(item.counterparty))
+        total = total + ratio * NAME_POINTS // 100
+    return total
+
+
+# ######## reconciling ########################################################
+
+def open_items(conn: sqlite3.Connection) -> List[OpenItem]:
+    cur = conn.cursor()
+    rows = cur.execute("""SELECT item_id, reference, counterparty, amount,
+                                 due_date
+                          FROM open_items WHERE txn_id IS NULL""")
+    return [OpenItem(*row) for row in rows]
+
+
+def unmatched_lines(conn: sqlite3.Connection, start: str,
+                    end: str) -> List[BankLine]:
+    cur = conn.cursor()
+    rows = cur.execute("""SELECT b.txn_id, b.booking_date, b.amount,
+                                 b.counterparty, b.purpose
+                          FROM bank_transactions AS b
+                          WHERE b.booking_date BETWEEN ? AND ?
+                          AND NOT EXISTS (SELECT 1 FROM open_items AS o
+                                          WHERE o.txn_id = b.txn_id)
+                          ORDER BY b.booking_date, b.txn_id""",
+                       (start, end))
+    return [BankLine(*row) for row in rows]
+
+
+def propose_matches(lines: Iterable[BankLine], index: ItemIndex,
+                    window: int = WINDOW,
+                    threshold: int = THRESHOLD) -> List[Match]:
+    """The best pairs first; every line and every item in one pair at most."""
+    # loaded only once there is something to score
+    from fuzzywuzzy import fuzz
+
+    pairs = []
+    for line in lines:
+        keys = reference_keys(line.purpose)
+        for item in index.candidates(line, keys, window):
+            points = score(line, keys, item, index, fuzz)
+            if points >= threshold:
+                distance = days_apart(line.booking_date, item.due_date)
+                pairs.append((-points, distance, line.txn_id, item.item_id))
+    pairs.sort()
+
+    matches, used_lines, used_items = [], set(), set()
+    for points, _, txn_id, item_id in pairs:
+        if txn_id in used_lines or item_id in used_items:
+            continue
+        used_lines.add(txn_id)
+        used_items.add(item_id)
+        matches.append(Match(txn_id, item_id, -points))
+    matches.sort(key=lambda match: match.txn_id)
+    return matches
+
+
+def reconcile(conn: sqlite3.Connection, start: str, end: str,
+              window: int = WINDOW,
+              threshold: int = THRESHOLD) -> List[Match]:
+    """Proposals for the unmatched transactions booked from start to end."""
+    index = ItemIndex(open_items(conn))
+    return propose_matches(unmatched_lines(conn, start, end), index, window,
+                           threshold)
+
+
+def accept_matches(conn: sqlite3.Connection, matches: List[Match],
+                   matched_by: str) -> int:
+    """
+    Mark the items as paid, all in one transaction. Items and transactions
+    someone else matched in the meantime are left alone; returns the number
+    written.
+    """
+    matched_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    update = """UPDATE open_items
+                SET txn_id = ?, matched_by = ?, matched_at = ?
+                WHERE item_id = ? AND txn_id IS NULL
+                AND NOT EXISTS (SELECT 1 FROM open_items WHERE txn_id = ?)"""
+    with UnitOfWork(conn) as cur:
+        before = conn.total_changes
+        cur.executemany(update, [(match.txn_id, matched_by, matched_at,
+                                  match.item_id, match.txn_id)
+                                 for match in matches])
+        return conn.total_changes - before
+
+
+# ######## command line #######################################################
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: done, 2: nothing done."""
+    import argparse
+
+    from .batch import open_for_cli
+
+    parser = argparse.ArgumentParser(
+        prog="main.py reconcile",
+        description="Match bank transactions to open items.")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    parser.add_argument("--from", dest="start", required=True,
+                        help="first booking date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", required=True,
+                        help="last booking date, YYYY-MM-DD")
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--threshold", type=int, default=THRESHOLD)
+    parser.add_argument("--accept", action="store_true",
+                        help="write the proposed matches")
+    args = parser.parse_args(argv)
+
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        matches = reconcile(conn, args.start, args.end, args.window,
+                            args.threshold)
+        for match in matches:
+            print(f"{match.txn_id}\t{match.item_id}\t{match.score}")
+        if args.accept:
+            written = accept_matches(conn, matches, args.user)
+            print(f"{written} matches written", file=sys.stderr)
+    finally:
+        conn.close()
+    return 0
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# report_cache.py
+"""Reports already computed, kept in the table "report_cache" of the company
+database. A report is stored under its kind and parameters together with
+its watermark: the highest entry_id posted into the periods it covers
+(periods.last_entry_id, see journal.write_entries). Asking for the same
+report again costs one query over the periods and one lookup by primary
+key. A posting into one of these periods raises the watermark, so exactly
+the reports covering that period are computed anew; the others stay."""
+import datetime
+import json
+import sqlite3
+from typing import Callable
+from typing import Dict
+
+from .database import UnitOfWork
+from .reports import FIRST_DAY
+from .reports import Report
+from .reports import balance_sheet
+from .reports import profit_and_loss
+from .reports import trial_balance
+
+
+def watermark(conn: sqlite3.Connection, start: str, end: str) -> int:
+    """The highest entry_id posted into a period between "start" and "end"."""
+    cur = conn.cursor()
+    return cur.execute("""SELECT COALESCE(MAX(last_entry_id), 0)
+                          FROM periods
+                          WHERE start_date <= ? AND end_date >= ?""",
+                       (end, start)).fetchone()[0]
+
+
+def params_key(params: Dict) -> str:
+    """The same parameters give the same key, whatever their order."""
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def dump_report(report: Report) -> str:
+    return json.dumps({"title": report.title, "columns": report.columns,
+                       "rows": report.rows, "totals": report.totals},
+                      ensure_ascii=False)
+
+
+def load_report(result: str) -> Report:
+    data = json.loads(result)
+    return Report(data["title"], data["columns"],
+                  [tuple(row) for row in data["rows"]],
+                  [tuple(row) for row in data["totals"]])
+
+
+def cached(conn: sqlite3.Connection, report: str, params: Dict, start: str,
+           end: str, compute: Callable[[], Report]) -> Report:
+    """
+    The stored report if nothing was posted into "start" to "end" since it
+    was computed, otherwise compute() and store its result.
+    """
+    key = params_key(params)
+    mark = watermark(conn, start, end)
+    cur = conn.cursor()
+    row = cur.execute("""SELECT result FROM report_cache
+                         WHERE report = ? AND params = ? AND watermark = ?""",
+                      (report, key, mark)).fetchone()
+    if row is not None:
+        return load_report(row[0])
+
+    result = compute()
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    with UnitOfWork(conn) as cur:
+        # a posting in the meantime makes this row stale right away: the
+        # watermark stored is the one read before computing
+        cur.execute("""INSERT INTO report_cache (
+                       report, params, watermark, result, timestamp)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (report, params) DO UPDATE SET
+                           watermark = excluded.watermark,
+                           result = excluded.result,
+                           timestamp = excluded.timestamp""",
+                    (report, key, mark, dump_report(result), timestamp))
+    return result
+
+
+def run_report(conn: sqlite3.Connection, report: str, start: str, end: str,
+               language: str = "de", max_workers: int | None = None,
+               use_cache: bool = True) -> Report:
+    """
+    "trial-balance", "pnl" or "balance-sheet" as in "main.py report", from
+    the cache if possible. The balance sheet only depends on "end".
+    """
+    if report == "balance-sheet":
+        start = FIRST_DAY
+
+        def compute() -> Report:
+            return balance_sheet(conn, end, language, max_workers)
+    elif report == "trial-balance":
+        def compute() -> Report:
+            return trial_balance(conn, start, end, language, max_workers)
+    elif report == "pnl":
+        def compute() -> Report:
+            return profit_and_loss(conn, start, end, language, max_workers)
+    else:
+        raise ValueError(f"unknown report '{report}'")
+
+    if not use_cache:
+        return compute()
+    params = {"start": start, "end": end, "language": language}
+    return cached(conn, report, params, start, end, compute)
+
+
+def clear_cache(conn: sqlite3.Connection) -> None:
+    with UnitOfWork(conn) as cur:
+        cur.execute("DELETE FROM report_cache")
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# reports.py
+"""Trial balance, profit and loss and balance sheet from the journal:
+
+    BUHA_PASSWORD=... python main.py report pnl --company X --user ab \\
+        --from 2024-01-01 --to 2024-12-31 [--csv pnl.csv] [--workers 4] \\
+        [--no-cache]
+
+All of them start from debit and credit per account (account_totals). If
+no period starts or ends inside the dates these are summed up from the
+running balances (see balances.py), one row per account and period.
+Otherwise the journal lines are summed up by one grouped query; with
+"max_workers" one query per account class (the first digit of the
+number, as in SKR03/SKR04) runs in a process pool, each with its own
+connection. The reports are rendered with PrettyTable like the pager's
+pages, or written as CSV. The balance sheet starts from the snapshot of
+the last closed period (see closing.py). "main.py report" takes them from
+the report cache if nothing was posted since (see report_cache.py)."""
+import csv
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from itertools import repeat
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+from .balances import Balance
+from .closing import balances_up_to
+from .constants import report_columns
+from .constants import report_titles
+
+
+FIRST_DAY = "0001-01-01"
+
+account_classes = [str(digit) for digit in range(10)]
+
+
+@dataclass
+class Report():
+    title: str
+    columns: List[str]
+    rows: List[Tuple] = field(default_factory=list)
+    # rows below the line: sums and results
+    totals: List[Tuple] = field(default_factory=list)
+
+
+# ######## account totals #####################################################
+
+def spans_whole_periods(conn: sqlite3.Connection, start: str,
+                        end: str) -> bool:
+    """No period begins before "start" and ends after it, same for "end"."""
+    cur = conn.cursor()
+    cut = cur.execute("""SELECT 1 FROM periods
+                         WHERE (start_date < ? AND end_date >= ?)
+                         OR (start_date <= ? AND end_date > ?)
+                         LIMIT 1""", (start, start, end, end)).fetchone()
+    return cut is None
+
+
+def totals_from_balances(conn: sqlite3.Connection, start: str,
+                         end: str) -> List[Balance]:
+    query = """SELECT a.number, a.name, a.kind,
+                      SUM(b.debit), SUM(b.credit)
+               FROM account_balances AS b
+               JOIN periods AS p ON p.period_id = b.period_id
+               JOIN accounts AS a ON a.account_id = b.account_id
+               WHERE p.start_date >= ? AND p.end_date <= ?
+               GROUP BY a.account_id
+               ORDER BY a.number"""
+    cur = conn.cursor()
+    return [Balance(*row) for row in cur.execute(query, (start, end))]
+
+
+sum_lines = """SELECT a.number, a.name, a.kind,
+                      SUM(MAX(l.amount, 0)), SUM(MAX(-l.amount, 0))
+               FROM accounts AS a
+               JOIN journal_lines AS l ON l.account_id = a.account_id
+               WHERE l.entry_date BETWEEN ? AND ? {condition}
+               GROUP BY a.account_id
+               ORDER BY a.number"""
+
+
+def totals_from_journal(conn: sqlite3.Connection, start: str, end: str,
+                        account_class: str | None = None) -> List[Balance]:
+    """One grouped query, of one account class if "account_class" is set."""
+    params: Tuple = (start, end)
+    condition = ""
+    if account_class is not None:
+        condition = "AND substr(a.number, 1, 1) = ?"
+        params = (start, end, account_class)
+    cur = conn.cursor()
+    query = sum_lines.format(condition=condition)
+    return [Balance(*row) for row in cur.execute(query, params)]
+
+
+def class_totals(db_path: str, start: str, end: str,
+                 account_class: str) -> List[Balance]:
+    """Runs in a worker process of the pool, with a connection of its own."""
+    from .database import connect
+
+    conn = connect(db_path)
+    try:
+        return totals_from_journal(conn, start, end, account_class)
+    finally:
+        conn.close()
+
+
+def database_file(conn: sqlite3.Connection) -> str:
+    """The file of the main database, "" for one in memory."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def account_totals(conn: sqlite3.Connection, start: str, end: str,
+                   max_workers: int | None = None) -> List[Balance]:
+    """Debit and credit of every account with postings, by number."""
+    if spans_whole_periods(conn, start, end):
+        return totals_from_balances(conn, start, end)
+
+    db_path = database_file(conn)
+    if not max_workers or max_workers == 1 or not db_path:
+        return totals_from_journal(conn, start, end)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        parts = executor.map(class_totals, repeat(db_path), repeat(start),
+                             repeat(end), account_classes)
+        totals = [balance for part in parts for balance in part]
+    totals.sort(key=lambda balance: balance.number)
+    return totals
+
+
+# ######## reports ############################################################
+
+def trial_balance(conn: sqlite3.Connection, start: str, end: str,
+                  language: str = "de",
+                  max_workers: int | None = None) -> Report:
+    labels = report_columns[language]
+    report = Report(f"{report_titles[language]['trial balance']} {start} - {end}",  # noqa
+                    [labels["number"], labels["name"], labels["debit"],
+                     labels["credit"], labels["balance"]])
+    totals = account_totals(conn, start, end, max_workers)
+    report.rows = [(b.number, b.name, b.debit, b.credit, b.balance)
+                   for b in totals]
+    debit = sum(b.debit for b in totals)
+    credit = sum(b.credit for b in totals)
+    report.totals = [("", labels["total"], debit, credit, debit - credit)]
+    return report
+
+
+def profit_and_loss(conn: sqlite3.Connection, start: str, end: str,
+                    language: str = "de",
+                    max_workers: int | None = None) -> Report:
+    """Revenue and expenses as positive amounts, the result below them."""
+    labels = report_columns[language]
+    report = Report(f"{report_titles[language]['pnl']} {start} - {end}",
+                    [labels["number"], labels["name"], labels["amount"]])
+    totals = account_totals(conn, start, end, max_workers)
+    revenue = [(b.number, b.name, -b.balance)
+               for b in totals if b.kind == "revenue"]
+    expenses = [(b.number, b.name, b.balance)
+                for b in totals if b.kind == "expense"]
+    report.rows = revenue + expenses
+    total_revenue = sum(row[2] for row in revenue)
+    total_expenses = sum(row[2] for row in expenses)
+    report.totals = [("", labels["revenue"], total_revenue),
+                     ("", labels["expenses"], total_expenses),
+                     ("", labels["result"], total_revenue - total_expenses)]
+    return report
+
+
+def balance_sheet(conn: sqlite3.Connection, end: str, language: str = "de",
+                  max_workers: int | None = None) -> Report:
+    """
+    Assets against liabilities and equity on "end", everything posted up to
+    then. Revenue and expenses not closed yet are shown as the result.
+    """
+    labels = report_columns[language]
+    report = Report(f"{report_titles[language]['balance sheet']} {end}",
+                    [labels["side"], labels["number"], labels["name"],
+                     labels["amount"]])
+    totals = balances_up_to(conn, end, max_workers)
+    assets = [(labels["assets"], b.number, b.name, b.balance)
+              for b in totals if b.kind == "asset" and b.balance]
+    sources = [(labels["liabilities"], b.number, b.name, -b.balance)
+               for b in totals if b.kind in ("liability", "equity")
+               and b.balance]
+    result = -sum(b.balance for b in totals
+                  if b.kind in ("revenue", "expense"))
+    report.rows = assets + sources
+    total_assets = sum(row[3] for row in assets)
+    total_sources = sum(row[3] for row in sources) + result
+    report.totals = [("", "", labels["result"], result),
+                     (labels["assets"], "", labels["total"], total_assets),
+                     (labels["liabilities"], "", labels["total"],
+                      total_sources)]
+    return report
+
+
+# ######## output #############################################################
+
+def format_cents(cents: int, language: str) -> str:
+    """123456 -> "1.234,56" (de) or "1,234.56" (en)."""
+    euros, rest = divmod(abs(cents), 100)
+    text = f"{'-' if cents < 0 else ''}{euros:,}.{rest:02d}"
+    if language == "de":
+        text = text.replace(",", "_").replace(".", ",").replace("_", ".")
+    return text
+
+
+def render_report(report: Report, language: str) -> str:
+    from prettytable import PrettyTable  # loaded on the first table only
+
+    t = PrettyTable(report.columns)
+    t.align = "l"
+    rows = report.rows + report.totals
+    # amounts to the right, the columns are the same in every row
+    for column, value in zip(report.columns, rows[0] if rows else ()):
+        if isinstance(value, int):
+            t.align[column] = "r"
+    for i, row in enumerate(rows):
+        cells = [format_cents(value, language) if isinstance(value, int)
+                 else value for value in row]
+        t.add_row(cells, divider=(i == len(report.rows) - 1))
+    return f"{report.title}\n{t.get_string()}"
+
+
+def write_csv(report: Report, path: Path) -> None:
+    """Amounts in cents, ";" separated like German spreadsheets expect."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(report.columns)
+        writer.writerows(report.rows)
+        writer.writerows(report.totals)
+
+
+# ######## command line #######################################################
+
+def main(argv: List[str]) -> int:
+    """Exit code 0: report done, 2: nothing done."""
+    import argparse
+
+    from .batch import open_for_cli
+    from .report_cache import run_report
+
+    parser = argparse.ArgumentParser(
+        prog="main.py report",
+        description="Trial balance, profit and loss or balance sheet.")
+    parser.add_argument("report", choices=["trial-balance", "pnl",
+                                           "balance-sheet"])
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--user", required=True,
+                        help="initials of an internal employee")
+    parser.add_argument("--from", dest="start", default=FIRST_DAY,
+                        help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", required=True,
+                        help="last day, YYYY-MM-DD")
+    parser.add_argument("--language", choices=["de", "en"], default="de")
+    parser.add_argument("--csv", type=Path, help="write CSV to this file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for summing up the journal")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="compute the report even if it is stored")
+    args = parser.parse_args(argv)
+
+    conn = open_for_cli(args.company, args.user)
+    if conn is None:
+        return 2
+    try:
+        report = run_report(conn, args.report, args.start, args.end,
+                            args.language, args.workers, not args.no_cache)
+    finally:
+        conn.close()
+
+    if args.csv:
+        write_csv(report, args.csv)
+    else:
+        print(render_report(report, args.language))
+    return 0
@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# schema.py
+"""Tables and indexes of a company database. The schema is created or
+migrated once when the database is opened; the version reached is kept in
+"PRAGMA user_version". Writes later on are plain INSERT/UPDATE without DDL.
+
+To change the schema append a migration to "migrations", never edit one that
+has been released: databases out there already ran it."""
+import sqlite3
+from typing import Callable
+from typing import List
+
+from .phonetics import blocking_keys
+from .shared import name_key
+
+
+# ######## helpers for migrations #############################################
+
+def column_names(cur: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+
+
+def add_column(cur: sqlite3.Cursor, table: str, column: str,
+               definition: str) -> None:
+    """ALTER TABLE ... ADD COLUMN that can run twice."""
+    if column not in column_names(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# ######## migrations #########################################################
+
+def create_basic_tables(cur: sqlite3.Cursor) -> None:
+    """
+    persons, names and settings as they were before the schema had a
+    version. "IF NOT EXISTS" because older databases have them already.
+    """
+    table_persons = """CREATE TABLE IF NOT EXISTS persons (
+                       person_id INTEGER PRIMARY KEY,
+                       created_by TEXT,
+                       timestamp TEXT,
+                       first_name TEXT NOT NULL,
+                       middle_names TEXT,
+                       last_name TEXT NOT NULL,
+                       initials TEXT NOT NULL
+                       )"""
+    table_names = """CREATE TABLE IF NOT EXISTS names (
+                     name_id INTEGER PRIMARY KEY,
+                     person_id INTEGER,
+                     created_by TEXT,
+                     timestamp TEXT,
+                     first_name TEXT NOT NULL,
+                     middle_names TEXT,
+                     last_name TEXT NOT NULL,
+                     nickname TEXT,
+                     previous_name TEXT,
+                     suffix TEXT,
+                     salutation TEXT,
+                     FOREIGN KEY (person_id)
+                        REFERENCES persons(person_id)
+                        ON DELETE CASCADE
+                     )"""
+    # Settings with language and password. Except for the language nothing
+    # points back at the owner of the settings.
+    table_settings = """CREATE TABLE IF NOT EXISTS settings (
+                        settings_id INTEGER PRIMARY KEY,
+                        person_id INTEGER,
+                        created_by TEXT,
+                        timestamp TEXT,
+                        language TEXT,
+                        initials TEXT,
+                        is_internal BOOL,
+                        salt BLOB NOT NULL,
+                        password_hash BLOB NOT NULL,
+                        FOREIGN KEY (person_id)
+                            REFERENCES persons(person_id)
+                            ON DELETE CASCADE
+                        )"""
+    cur.execute(table_persons)
+    cur.execute(table_names)
+    cur.execute(table_settings)
+
+
+def index_initials(cur: sqlite3.Cursor) -> None:
+    """Initials are the unique identifier, logins look them up."""
+    cur.execute("""CREATE UNIQUE INDEX IF NOT EXISTS
+                   idx_persons_initials ON persons (initials)""")
+    cur.execute("""CREATE UNIQUE INDEX IF NOT EXISTS
+                   idx_settings_initials ON settings (initials)""")
+
+
+def record_hash_params(cur: sqlite3.Cursor) -> None:
+    """Rows without parameters are legacy hashes, see hashing.py."""
+    add_column(cur, "settings", "hash_algorithm", "TEXT")
+    add_column(cur, "settings", "hash_iterations", "INTEGER")
+
+
+def index_name_keys(cur: sqlite3.Cursor) -> None:
+    """Duplicate names are found by one lookup of "name_key", see shared.py."""
+    add_column(cur, "names", "name_key", "TEXT")
+    rows = cur.execute("""SELECT name_id, first_name, middle_names, last_name
+                          FROM names""").fetchall()
+    cur.executemany("UPDATE names SET name_key = ? WHERE name_id = ?",
+                    [(name_key(fn, mn, ln), name_id)
+                     for name_id, fn, mn, ln in rows])
+    # not unique: older databases may hold duplicates already
+    cur.execute("""CREATE INDEX IF NOT EXISTS
+                   idx_names_name_key ON names (name_key)""")
+
+
+def index_name_blocks(cur: sqlite3.Cursor) -> None:
+    """Blocking keys for the search of similar names, see duplicates.py."""
+    cur.execute("""CREATE TABLE IF NOT EXISTS name_blocks (
+                   block TEXT NOT NULL,
+                   name_id INTEGER NOT NULL,
+                   PRIMARY KEY (block, name_id),
+                   FOREIGN KEY (name_id)
+                       REFERENCES names(name_id)
+                       ON DELETE CASCADE
+                   ) WITHOUT ROWID""")
+    cur.execute("""CREATE INDEX IF NOT EXISTS
+                   idx_name_blocks_name_id ON name_blocks (name_id)""")
+    rows = cur.execute("SELECT name_id, last_name FROM names").fetchall()
+    cur.executemany("""INSERT OR IGNORE INTO name_blocks (block, name_id)
+                       VALUES (?, ?)""",
+                    [(key, name_id)
+                     for name_id, last_name in rows
+                     for key in blocking_keys(last_name)])
+
+
+def index_contacts_fts(cur: sqlite3.Cursor) -> None:
+    """
+    Full-text index for the contact search, see search.py. The rowid is
+    the name_id. Triggers keep it in step with "names" and with the
+    initials in "persons"; no code writes to it directly.
+    """
+    cur.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+                   first_name, middle_names, last_name, nickname,
+                   previous_name, initials,
+                   tokenize = "unicode61 remove_diacritics 2",
+                   prefix = '1 2 3')""")
+    add_contact = """INSERT INTO contacts_fts (
+                     rowid, first_name, middle_names, last_name, nickname,
+                     previous_name, initials)
+                     SELECT new.name_id, new.first_name, new.middle_names,
+                            new.last_name, new.nickname, new.previous_name,
+                            (SELECT initials FROM persons
+                             WHERE person_id = new.person_id);"""
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS names_fts_insert
+                    AFTER INSERT ON names BEGIN
+                        {add_contact}
+                    END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS names_fts_delete
+                   AFTER DELETE ON names BEGIN
+                       DELETE FROM contacts_fts WHERE rowid = old.name_id;
+                   END""")
+    cur.execute(f"""CREATE TRIGGER IF NOT EXISTS names_fts_update
+                    AFTER UPDATE ON names BEGIN
+                        DELETE FROM contacts_fts WHERE rowid = old.name_id;
+                        {add_contact}
+                    END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS persons_fts_initials
+                   AFTER UPDATE OF initials ON persons BEGIN
+                       UPDATE contacts_fts SET initials = new.initials
+                       WHERE rowid IN (SELECT name_id FROM names
+                                       WHERE person_id = new.person_id);
+                   END""")
+    cur.execute("DELETE FROM contacts_fts")
+    cur.execute("""INSERT INTO contacts_fts (
+                   rowid, first_name, middle_names, last_name, nickname,
+                   previous_name, initials)
+                   SELECT n.name_id, n.first_name, n.middle_names,
+                          n.last_name, n.nickname, n.previous_name,
+                          p.initials
+                   FROM names AS n LEFT JOIN persons AS p USING (person_id)""")
+
+
+def version_rows(cur: sqlite3.Cursor) -> None:
+    """
+    Every edit raises "version" by one and only succeeds if the version is
+    still the one read before, see editing.py.
+    """
+    for table in ("persons", "names", "settings"):
+        add_column(cur, table, "version", "INTEGER NOT NULL DEFAULT 1")
+        add_column(cur, table, "updated_at", "TEXT")
+
+
+def create_journal(cur: sqlite3.Cursor) -> None:
+    """
+    Accounts, periods and the journal, see journal.py. Amounts are integer
+    cents, debit positive and credit negative, so the lines of an entry sum
+    up to zero. "entry_date" is repeated in the lines for the index on
+    (account_id, entry_date) that account statements and balances read.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS accounts (
+                   account_id INTEGER PRIMARY KEY,
+                   number TEXT NOT NULL UNIQUE,
+                   name TEXT NOT NULL,
+                   kind TEXT NOT NULL CHECK (kind IN (
+                       'asset', 'liability', 'equity', 'revenue', 'expense')),
+                   created_by TEXT,
+                   timestamp TEXT
+                   )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS periods (
+                   period_id INTEGER PRIMARY KEY,
+                   name TEXT NOT NULL UNIQUE,
+                   start_date TEXT NOT NULL,
+                   end_date TEXT NOT NULL,
+                   closed INTEGER NOT NULL DEFAULT 0,
+                   CHECK (start_date <= end_date)
+                   )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS journal_entries (
+                   entry_id INTEGER PRIMARY KEY,
+                   period_id INTEGER NOT NULL,
+                   entry_date TEXT NOT NULL,
+                   description TEXT,
+                   reference TEXT,
+                   created_by TEXT,
+                   timestamp TEXT,
+                   FOREIGN KEY (period_id) REFERENCES periods(period_id)
+                   )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS journal_lines (
+                   line_id INTEGER PRIMARY KEY,
+                   entry_id INTEGER NOT NULL,
+                   account_id INTEGER NOT NULL,
+                   entry_date TEXT NOT NULL,
+                   amount INTEGER NOT NULL CHECK (amount <> 0),
+                   FOREIGN KEY (entry_id)
+                       REFERENCES journal_entries(entry_id)
+                       ON DELETE CASCADE,
+                   FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+                   )""")
+    # no more indexes than these: every one slows down each posting
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_journal_lines_account_date
+                   ON journal_lines (account_id, entry_date)""")
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_journal_lines_entry
+                   ON journal_lines (entry_id)""")
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_journal_entries_period
+                   ON journal_entries (period_id)""")
+
+
+def create_balances(cur: sqlite3.Cursor) -> None:
+    """
+    Debit and credit per account and period, kept up to date by every
+    posting (see balances.py). Filled from the lines already posted.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS account_balances (
+                   account_id INTEGER NOT NULL,
+                   period_id INTEGER NOT NULL,
+                   debit INTEGER NOT NULL DEFAULT 0,
+                   credit INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (account_id, period_id),
+                   FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+                   FOREIGN KEY (period_id) REFERENCES periods(period_id)
+                   ) WITHOUT ROWID""")
+    cur.execute("""INSERT INTO account_balances (
+                   account_id, period_id, debit, credit)
+                   SELECT l.account_id, e.period_id,
+                          SUM(MAX(l.amount, 0)), SUM(MAX(-l.amount, 0))
+                   FROM journal_lines AS l
+                   JOIN journal_entries AS e ON e.entry_id = l.entry_id
+                   GROUP BY l.account_id, e.period_id""")
+
+
+def create_company_settings(cur: sqlite3.Cursor) -> None:
+    """Settings of the company as a whole, e.g. its chart of accounts."""
+    cur.execute("""CREATE TABLE IF NOT EXISTS company_settings (
+                   key TEXT PRIMARY KEY,
+                   value TEXT NOT NULL
+                   ) WITHOUT ROWID""")
+
+
+def create_bank_transactions(cur: sqlite3.Cursor) -> None:
+    """
+    Transactions of bank statements, see bank_import.py. "txn_key" is the
+    SHA-256 of the fields that identify a transaction; its unique index
+    makes importing the same statement twice add nothing.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS bank_transactions (
+                   txn_id INTEGER PRIMARY KEY,
+                   txn_key BLOB NOT NULL UNIQUE,
+                   account TEXT,
+                   booking_date TEXT NOT NULL,
+                   value_date TEXT,
+                   amount INTEGER NOT NULL,
+                   currency TEXT NOT NULL,
+                   counterparty TEXT,
+                   counterparty_account TEXT,
+                   purpose TEXT,
+                   reference TEXT,
+                   source TEXT NOT NULL,
+                   imported_by TEXT,
+                   timestamp TEXT
+                   )""")
+
+
+def create_open_items(cur: sqlite3.Cursor) -> None:
+    """
+    Invoices not paid yet, see reconcile.py. "amount" is what the bank
+    statement will show: receivables > 0, payables < 0. An item is open as
+    long as "txn_id" is NULL; a bank transaction pays one item at most.
+    """
+    cur.execute("""CREATE TABLE IF NOT EXISTS open_items (
+                   item_id INTEGER PRIMARY KEY,
+                   reference TEXT,
+                   counterparty TEXT,
+                   amount INTEGER NOT NULL CHECK (amount <> 0),
+                   due_date TEXT NOT NULL,
+                   entry_id INTEGER,
+                   txn_id INTEGER UNIQUE,
+                   matched_by TEXT,
+                   matched_at TEXT,
+                   created_by TEXT,
+                   timestamp TEXT,
+                   FOREIGN KEY (entry_id) REFERENCES journal_entries(entry_id),
+                   FOREIGN KEY (txn_id) REFERENCES bank_transactions(txn_id)
+                   )""")
+    # reconciliation reads the open items and the transactions of a month
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_open_items_open
+                   ON open_items (due_date) WHERE txn_id IS NULL""")
+    cur.execute("""CREATE INDEX IF NOT EXISTS idx_bank_transactions_date
+                   ON bank_transactions (booking_date)""")
+
+
+def create_report_cache(cur: sqlite3.Cursor) -> None:
+    """
+    Reports already computed, see report_cache.py. "last_entry_id" of a
+    period is the highest entry posted into it, so the highest of the
+    periods a report covers tells whether anything was posted since.
+    """
+    add_column(cur, "periods", "last_entry_id", "INTEGER NOT NULL DEFAULT 0")
+    cur.execute("""UPDATE periods SET last_entry_id = (
+                   SELECT COALESCE(MAX(entry_id), 0) FROM journal_entries
+                   WHERE journal_entries.period_id = periods.period_id)""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS report_cache (
+                   report TEXT NOT NULL,
+                   params TEXT NOT NULL,
+                   watermark INTEGER NOT NULL,
+                   result TEXT NOT NULL,
+                   timestamp TEXT,
+                   PRIMARY KEY (report, params)
+                   ) WITHOUT ROWID""")
+
+
+def create_snapshots(cur: sqlite3.Cursor) -> None:
+    """
+    Closing balances, see closing.py: debit and credit of every account
+    from the first posting up to the end of a closed period. Triggers keep
+    the snapshots and the journal of closed periods as they are.
+    """
+    add_column(cur, "periods", "closed_by", "TEXT")
+    add_column(cur, "periods", "closed_at", "TEXT")
+    cur.execute("""CREATE TABLE IF NOT EXISTS account_snapshots (
+                   period_id INTEGER NOT NULL,
+                   account_id INTEGER NOT NULL,
+                   debit INTEGER NOT NULL DEFAULT 0,
+                   credit INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (period_id, account_id),
+                   FOREIGN KEY (period_id) REFERENCES periods(period_id),
+                   FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+                   ) WITHOUT ROWID""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS account_snapshots_no_update
+                   BEFORE UPDATE ON account_snapshots BEGIN
+                       SELECT RAISE(ABORT, 'closing snapshots are immutable');
+                   END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS account_snapshots_no_delete
+                   BEFORE DELETE ON account_snapshots BEGIN
+                       SELECT RAISE(ABORT, 'closing snapshots are immutable');
+                   END""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS periods_closed_no_update
+                   BEFORE UPDATE ON periods WHEN old.closed = 1 BEGIN
+                       SELECT RAISE(ABORT, 'period is closed');
+                   END""")
+    for event, row in [("INSERT", "new"), ("UPDATE", "old"),
+                       ("DELETE", "old")]:
+        cur.execute(f"""CREATE TRIGGER IF NOT EXISTS
+                        journal_entries_closed_{event.lower()}
+                        BEFORE {event} ON journal_entries
+                        WHEN (SELECT closed FROM periods
+                              WHERE period_id = {row}.period_id) = 1 BEGIN
+                            SELECT RAISE(ABORT, 'period is closed');
+                        END""")
+    # lines are only appended together with their entry, which is checked
+    # above; changing or removing one of a closed period is not
+    for event in ["UPDATE", "DELETE"]:
+        cur.execute(f"""CREATE TRIGGER IF NOT EXISTS
+                        journal_lines_closed_{event.lower()}
+                        BEFORE {event} ON journal_lines
+                        WHEN (SELECT p.closed FROM journal_entries AS e
+                              JOIN periods AS p ON p.period_id = e.period_id
+                              WHERE e.entry_id = old.entry_id) = 1 BEGIN
+                            SELECT RAISE(ABORT, 'period is closed');
+                        END""")
+
+
+migrations: List[Callable[[sqlite3.Cursor], None]] = [
+    create_basic_tables,  # 1
+    index_initials,  # 2
+    record_hash_params,  # 3
+    index_name_keys,  # 4
+    index_name_blocks,  # 5
+    index_contacts_fts,  # 6
+    version_rows,  # 7
+    create_journal,  # 8
+    create_balances,  # 9
+    create_company_settings,  # 10
+    create_bank_transactions,  # 11
+    create_open_items,  # 12
+    create_report_cache,  # 13
+    create_snapshots,  # 14
+]
+
+SCHEMA_VERSION = len(migrations)
+
+
+# ######## bootstrap ##########################################################
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Bring the database up to SCHEMA_VERSION. All pending migrations run in
+    one transaction; a second process opening the same file waits for it and
+    then finds nothing left to do.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return
+
+    if conn.in_transaction:
+        conn.commit()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        for migration in migrations[version:]:
+            migration(cur)
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
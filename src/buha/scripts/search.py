@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# search.py
+"""Contact search on the FTS5 table "contacts_fts" (see schema.py): first,
+middle, last, nick and previous name and the initials of a person. Every
+word typed is a prefix, case and diacritics are ignored, so "jo mül" finds
+"Jonas Müller". In a terminal the results follow every key pressed."""
+import re
+import sqlite3
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List
+
+from .constants import search_as_you_type
+from .constants import search_no_match
+from .constants import search_prompt
+from .pager import Page
+from .pager import render_page
+from .phonetics import strip_accents
+from .shared import clear_screen
+from .shared import is_posix
+
+
+LIMIT = 20
+CANDIDATES = 200
+# letters typed before the candidates are picked by bm25, see search_contacts
+RANKED_FROM = 3
+
+
+@dataclass
+class Contact():
+    name_id: int
+    person_id: int
+    initials: str | None
+    first_name: str
+    middle_names: str | None
+    last_name: str
+    nickname: str | None
+
+
+def words(text: str) -> List[str]:
+    return re.findall(r"\w+", text)
+
+
+def fts_query(text: str) -> str | None:
+    """
+    "jo mül" -> '"jo"* "mül"*': every word a prefix, all words must match.
+    The words are quoted, FTS5 syntax typed by the user is taken literally.
+    """
+    tokens = words(text)
+    if not tokens:
+        return None
+    return " ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+@lru_cache(maxsize=4096)
+def fold(text: str | None) -> str:
+    """Lowercase without diacritics, like the tokenizer of contacts_fts."""
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    return strip_accents(text).lower()
+
+
+def score(contact: Contact, tokens: List[str]) -> int:
+    """
+    Per word typed: 3 for a whole word of the contact, 2 for the start of
+    the first or last name, 1 for the start of any other word.
+    """
+    first_name, last_name = fold(contact.first_name), fold(contact.last_name)
+    others = [fold(contact.middle_names), fold(contact.nickname),
+              fold(contact.initials)]
+    all_words = [w for part in [first_name, last_name] + others
+                 for w in words(part)]
+    total = 0
+    for token in tokens:
+        if token in all_words:
+            total = total + 3
+        elif first_name.startswith(token) or last_name.startswith(token):
+            total = total + 2
+        else:
+            total = total + 1
+    return total
+
+
+def search_contacts(conn: sqlite3.Connection, text: str,
+                    limit: int = LIMIT,
+                    candidates: int = CANDIDATES) -> List[Contact]:
+    """
+    The best "limit" matches for "text", best first, ranked by score().
+    From RANKED_FROM letters on, the "candidates" scored are the best by
+    FTS5's bm25 ("ORDER BY rank"). With fewer letters they are just the
+    first matches in the index: bm25 reads the whole list of every word
+    typed, for the first key typed that is every "m..." of a million
+    names. That ranking is approximate if there are more matches than
+    "candidates"; the next key typed makes it exact again.
+    """
+    query = fts_query(text)
+    if query is None:
+        return []
+    tokens = [fold(token) for token in words(text)]
+    order = "ORDER BY rank" if sum(map(len, tokens)) >= RANKED_FROM else ""
+    select_contacts = f"""
+        SELECT n.name_id, n.person_id, f.initials, n.first_name,
+               n.middle_names, n.last_name, n.nickname
+        FROM (SELECT rowid, initials FROM contacts_fts
+              WHERE contacts_fts MATCH ?
+              {order}
+              LIMIT ?) AS f
+        JOIN names AS n ON n.name_id = f.rowid"""
+    cur = conn.cursor()
+    rows = cur.execute(select_contacts, (query, candidates)).fetchall()
+    contacts = [Contact(*row) for row in rows]
+
+    contacts.sort(key=lambda contact: (-score(contact, tokens),
+                                       fold(contact.last_name),
+                                       fold(contact.first_name)))
+    return contacts[:limit]
+
+
+class IncrementalSearch():
+    """
+    Results while typing. The last queries are kept, so a backspace shows
+    the results from before at once; a key that does not change the words
+    (e.g. a blank) runs no query.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, limit: int = LIMIT,
+                 cache_size: int = 32) -> None:
+        self.conn = conn
+        self.limit = limit
+        self.cache_size = cache_size
+        self.cache: OrderedDict[str, List[Contact]] = OrderedDict()
+
+    def update(self, text: str) -> List[Contact]:
+        query = fts_query(text)
+        if query is None:
+            return []
+        if query in self.cache:
+            self.cache.move_to_end(query)
+            return self.cache[query]
+        results = search_contacts(self.conn, text, self.limit)
+        self.cache[query] = results
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return results
+
+
+# ######## dialog #############################################################
+
+def render_contacts(contacts: List[Contact], language: str) -> str:
+    if not contacts:
+        return search_no_match[language]
+    columns = ["initials", "first_name", "middle_names", "last_name",
+               "nickname"]
+    rows = [tuple(getattr(contact, column) for column in columns)
+            for contact in contacts]
+    return render_page(Page(columns, rows, False, False))
+
+
+def search_by_line(search: IncrementalSearch, language: str) -> None:
+    """One search per line entered, for pipes and terminals without tty."""
+    while True:
+        text = input(search_prompt[language])
+        if not text.strip():
+            break
+        clear_screen()
+        print(render_contacts(search.update(text), language))
+
+
+def search_by_key(search: IncrementalSearch, language: str) -> None:
+    import termios
+    import tty
+
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    text = ""
+    try:
+        tty.setcbreak(fd)
+        while True:
+            # ANSI clear instead of clear_screen(): no process per key
+            sys.stdout.write("\x1b[2J\x1b[H")
+            print(render_contacts(search.update(text), language)
+                  if text.strip() else "")
+            sys.stdout.write(search_as_you_type[language] + text)
+            sys.stdout.flush()
+            key = sys.stdin.read(1)
+            if key in ("\n", "\r", "\x1b", ""):
+                break
+            elif key in ("\x7f", "\b"):
+                text = text[:-1]
+            elif key.isprintable():
+                text = text + key
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        print()
+
+
+def search_dialog(conn: sqlite3.Connection, language: str) -> None:
+    search = IncrementalSearch(conn)
+    if is_posix() and sys.stdin.isatty():
+        search_by_key(search, language)
+    else:
+        search_by_line(search, language)
@@ -2,115 +2,139 @@
 # -*- coding: utf-8 -*-
 # settings.py
 import datetime
-import hashlib
-import os
 import sqlite3
 from typing import Tuple
 from .constants import choose_option
+from .database import UnitOfWork
+from .editing import load_row_of_person
+from .editing import versioned_update
+from .hashing import current_params
+from .hashing import hash_password
+from .hashing import HashParams
 from .helpers import check_if_internal
 from .helpers import continue_
 from .helpers import get_person_id
 from .helpers import Menu
+from .helpers import Navigation
 from .helpers import pick_language
 from .helpers import show_my_table
 from .login import password_correct
 
 
-def generate_table_settings(conn: sqlite3.Connection) -> None:
-    """
-    Settings with language and password. Except for the language nothing points
-    back at the owner of the settings.
-    """
-    table_settings = """CREATE TABLE IF NOT EXISTS settings (
-                        settings_id INTEGER PRIMARY KEY,
-                        person_id INTEGER,
-                        created_by TEXT,
-                        timestamp TEXT,
-                        language TEXT,
-                        initials TEXT,
-                        is_internal BOOL,
-                        salt BLOB NOT NULL,
-                        password_hash BLOB NOT NULL,
-                        FOREIGN KEY (person_id)
-                            REFERENCES persons(person_id)
-                            ON DELETE CASCADE
-                        )"""
-    with conn:
-        cur = conn.cursor()
-        cur.execute(table_settings)
-        conn.commit()
-        return
+# every new person starts with this password and changes it in the settings
+INITIAL_PASSWORD = "asd"
+
+
+def initial_credentials(password: str = INITIAL_PASSWORD) -> Tuple[bytes, bytes, HashParams]:  # noqa
+    """Salt, hash and hash parameters for a new settings row."""
+    params = current_params()
+    salt, password_hash = hash_password(password, params=params)
+    return salt, password_hash, params
 
 
 def add_settings(conn: sqlite3.Connection, created_by: str, language: str,
-                 person_id: int, initials: str) -> None:
-    add_settings = """INSERT INTO settings (
-                      person_id, created_by, timestamp, language, initials,
-                      is_internal, salt, password_hash)
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+                 person_id: int, initials: str, is_internal: bool | None = None,  # noqa
+                 credentials: Tuple[bytes, bytes, HashParams] | None = None) -> None:  # noqa
+    """
+    Does not commit, the caller's transaction does (see UnitOfWork). Pass
+    "is_internal" and "credentials" to keep the question and the hashing out
+    of the transaction.
+    """
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-    password = "asd"
-    is_internal = check_if_internal()
-    salt, password_hash = hash_password(password)
+    if is_internal is None:
+        is_internal = check_if_internal()
+    if credentials is None:
+        credentials = initial_credentials()
     if 0:
         print("person_id: ", person_id)
         if continue_():
             pass
 
-    with conn:
-        generate_table_settings(conn)
-        cur = conn.cursor()
-        cur.execute(add_settings, (person_id, created_by, timestamp, language,
-                                   initials, is_internal, salt, password_hash))
-        conn.commit()
+    insert_settings(conn, created_by, timestamp, language, person_id,
+                    initials, is_internal, credentials)
+
+
+settings_insert = """INSERT INTO settings (
+                     person_id, created_by, timestamp, language, initials,
+                     is_internal, salt, password_hash, hash_algorithm,
+                     hash_iterations)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def settings_row(created_by: str, timestamp: str, language: str,
+                 person_id: int, initials: str, is_internal: bool,
+                 credentials: Tuple[bytes, bytes, HashParams]) -> tuple:
+    """The values of a new row of "settings", see also importer.py."""
+    salt, password_hash, params = credentials
+    return (person_id, created_by, timestamp, language, initials,
+            is_internal, salt, password_hash, params.algorithm,
+            params.iterations)
+
+
+def insert_settings(conn: sqlite3.Connection, created_by: str, timestamp: str,
+                    language: str, person_id: int, initials: str,
+                    is_internal: bool,
+                    credentials: Tuple[bytes, bytes, HashParams]) -> None:
+    cur = conn.cursor()
+    cur.execute(settings_insert, settings_row(created_by, timestamp, language,
+                                           person_id, initials, is_internal,
+                                           credentials))
 
 
 def update_language(conn: sqlite3.Connection, language: str,
-                    person_id: int) -> None:
+                    person_id: int, version: int | None = None) -> bool:
+    """
+    Does not commit, the caller's transaction does (see UnitOfWork). With
+    "version" only if the row is still at it (see editing.py). Returns
+    False if nothing was written.
+    """
+    cur = conn.cursor()
+    return versioned_update(cur, "settings", {"language": language},
+                            {"person_id": person_id}, version) > 0
 
-    generate_table_settings(conn)
-    update_language = """UPDATE settings
-                         SET language = ?
-                         WHERE person_id = ?"""
 
-    with conn:
-        cur = conn.cursor()
-        cur.execute(update_language, (language, person_id))
-        conn.commit()
-        return
+def write_password(conn: sqlite3.Connection, person_id: int,
+                   credentials: Tuple[bytes, bytes, HashParams],
+                   version: int | None = None) -> bool:
+    """
+    Does not commit, the caller's transaction does (see UnitOfWork). Hash
+    with initial_credentials() before the transaction, it holds the write
+    lock. With "version" only if the row is still at it; returns False if
+    nothing was written.
+    """
+    salt, password_hash, params = credentials
+    changes = {"salt": sqlite3.Binary(salt),
+               "password_hash": sqlite3.Binary(password_hash),
+               "hash_algorithm": params.algorithm,
+               "hash_iterations": params.iterations}
+    cur = conn.cursor()
+    return versioned_update(cur, "settings", changes,
+                            {"person_id": person_id}, version) > 0
 
 
 def update_password(conn: sqlite3.Connection, password: str, initials: str) -> None:  # noqa
-
+    """Does not commit, the caller's transaction does (see UnitOfWork)."""
     person_id = get_person_id(conn, initials)
-    generate_table_settings(conn)
-    salt, password_hash = hash_password(password)
-    update_password = """UPDATE settings
-                          SET salt = ?,
-                          password_hash = ?
-                          WHERE person_id = ?"""
+    params = current_params()
+    salt, password_hash = hash_password(password, params=params)
+    write_password(conn, person_id, (salt, password_hash, params))
+
 
-    with conn:
-        cur = conn.cursor()
-        cur.execute(update_password, (person_id,
-                                      sqlite3.Binary(salt),
-                                      sqlite3.Binary(password_hash)
-                                      ))
-        conn.commit()
-        return
+edit_conflict = "Settings were changed by someone else meanwhile, nothing saved."  # noqa
 
 
-def hash_password(password: str) -> Tuple[str, str]:
-    salt = os.urandom(16)  # Generate a random salt
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)  # noqa
-    return salt, password_hash
+def settings_version(conn: sqlite3.Connection,
+                     person_id: int) -> int | None:
+    """The version the settings are shown with, see editing.py."""
+    row = load_row_of_person(conn, "settings", person_id)
+    return row.version if row is not None else None
 
 
 class MenuSettings(Menu):
     """Menu options for adding a new entry."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("settings")
 
         self.choices = {
@@ -134,8 +158,7 @@ class MenuSettings(Menu):
             if choice == "1":
                 self.change_language(conn, initials)
             elif choice == "2":
-                password = self.change_password(conn, initials, language)
-                update_password(conn, password, initials)
+                self.save_password(conn, initials, language)
             elif choice == "3":
                 person_id = get_person_id(conn, initials)
                 self.show_settings(conn, "settings", person_id)
@@ -147,8 +170,26 @@ class MenuSettings(Menu):
 
     def change_language(self, conn: sqlite3.Connection, initials: str) -> None:
         person_id = get_person_id(conn, initials)
+        version = settings_version(conn, person_id)
         language = pick_language()
-        update_language(conn, language, person_id)
+        with UnitOfWork(conn):
+            written = update_language(conn, language, person_id, version)
+        if not written:
+            print(f"    {edit_conflict}")
+
+    def save_password(self, conn: sqlite3.Connection, initials: str,
+                      language: str) -> None:
+        person_id = get_person_id(conn, initials)
+        version = settings_version(conn, person_id)
+        password = self.change_password(conn, initials, language)
+        if password is None:
+            return
+        # hashed before the transaction, not while holding the write lock
+        credentials = initial_credentials(password)
+        with UnitOfWork(conn):
+            written = write_password(conn, person_id, credentials, version)
+        if not written:
+            print(f"    {edit_conflict}")
 
     def change_password(self, conn: sqlite3.Connection, initials: str,
                         language: str, counter: int = 1) -> str | None:
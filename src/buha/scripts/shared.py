@@ -6,7 +6,6 @@ import os
 import platform
 
 from dataclasses import dataclass, field
-from prettytable import PrettyTable
 from typing import Optional
 
 from .constants import german_attrs
@@ -67,6 +66,8 @@ class AttrDisplay:
 
         see also: https://zetcode.com/python/prettytable/
         """
+        from prettytable import PrettyTable  # loaded on the first table only
+
         if language:
             attrs = self.translate(language)
         else:
@@ -124,3 +125,20 @@ class _Name_base:
 @dataclass
 class Name(_Name_default, _Name_base, AttrDisplay):
     pass
+
+
+def normalize_name(text: Optional[str]) -> str:
+    """Casefolded, whitespace collapsed, "" for a missing name."""
+    if text is None:
+        return ""
+    return " ".join(text.casefold().split())
+
+
+def name_key(first_name: str, middle_names: Optional[str],
+             last_name: str) -> str:
+    """
+    Key of "names.name_key": two names are the same person's name if their
+    keys are equal, i.e. "Jon  D. OUTSH" == "jon d. outsh".
+    """
+    return "|".join(normalize_name(part)
+                    for part in (first_name, middle_names, last_name))
@@ -4,9 +4,8 @@
 import sqlite3
 from .constants import choose_option
 from .helpers import Menu
+from .helpers import Navigation
 from .login import LoginMenu
-from .new_entry import MenuNewEntry
-from .settings import MenuSettings
 
 
 """
@@ -21,8 +20,8 @@ bank_details: name_of_bank, IBAN, BLZ, BIC, account_nr, key
 class MenuStart(Menu):
     """Menu options for adding a new entry."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, navigation: Navigation | None = None):
+        super().__init__(navigation)
         super().change_menu("start")
 
         self.choices = {
@@ -55,24 +54,31 @@ class MenuStart(Menu):
 
     def new_entry(self, conn: sqlite3.Connection, created_by: str,
                   company_name: str, language: str) -> None:
-        menu = MenuNewEntry()
+        # submenus are imported when opened, not when buha starts
+        from .new_entry import MenuNewEntry
+        menu = MenuNewEntry(self.navigation)
         menu.run(conn, created_by, company_name, language)
 
-    def change_entry(self, conn, initials) -> None:
-        print("ToDo")  # pragma: no cover
+    def change_entry(self, conn: sqlite3.Connection, initials: str,
+                     company_name: str, language: str) -> None:
+        from .change_entry import MenuChangeEntry
+        menu = MenuChangeEntry(self.navigation)
+        menu.run(conn, initials, company_name, language)
 
-    def search_entry(self, conn, initials) -> None:
-        print("ToDo")  # pragma: no cover
+    def search_entry(self, conn: sqlite3.Connection, initials: str,
+                     company_name: str, language: str) -> None:
+        from .search import search_dialog
+        search_dialog(conn, language)
 
     def settings(self, conn: sqlite3.Connection, initials: str,
                  company_name: str, language: str) -> None:
-        menu = MenuSettings()
+        from .settings import MenuSettings
+        menu = MenuSettings(self.navigation)
         menu.run(conn, initials, company_name, language)
 
     def logout(self, conn: sqlite3.Connection, initials: str,
                company_name: str, language: str) -> None:
-        Menu.navigation_stack = []
+        self.navigation.reset()
         initials = None
-        super().go_back()
-        login_menu = LoginMenu()
+        login_menu = LoginMenu(self.navigation)
         authenticated, initials = login_menu.run(conn, language, company_name)
@@ -12,11 +12,33 @@ sys.path.append(
 )  # isort: skip # noqa # pylint: disable=wrong-import-position
 
 from buha.scripts import (  # type: ignore # isort:skip # noqa # pylint: disable=unused-import, wrong-import-position
+    config,
     constants,
+    balances,
+    bank_import,
+    batch,
+    catalog,
+    change_entry,
+    chart,
+    closing,
+    database,
+    duplicates,
+    editing,
+    hashing,
+    journal,
+    importer,
     helpers,
     login,
     names,
+    onboarding,
+    pager,
     person,
+    phonetics,
+    reconcile,
+    report_cache,
+    reports,
+    schema,
+    search,
     settings,
     shared,
     start,
@@ -31,6 +53,7 @@ from buha.scripts.helpers import (  # type: ignore # isort:skip # noqa # pylint:
     get_person_id,
     initials_in_table,
     Menu,
+    Navigation,
     mk_initials,
     path_to_database,
     path_to_db_dir,
@@ -78,7 +101,11 @@ from buha.scripts.names import (  # type: ignore # isort:skip # noqa # pylint: d
 from buha.scripts.settings import (  # type: ignore # isort:skip # noqa # pylint: disable=unused-import, wrong-import-position
     MenuSettings,
     add_settings,
-    generate_table_settings,
+)  # pylint: disable=unused-import  # noqa
+
+
+from buha.scripts.schema import (  # type: ignore # isort:skip # noqa # pylint: disable=unused-import, wrong-import-position
+    ensure_schema,
 )  # pylint: disable=unused-import  # noqa
 
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_balances.py
+"""Tests for "balances" module."""
+
+import pytest
+import sqlite3
+
+from context import balances
+from context import database
+from context import ensure_schema
+from context import journal
+
+
+Entry = journal.JournalEntry
+Line = journal.Line
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    with database.UnitOfWork(conn):
+        journal.add_account(conn, "aa", "1200", "Bank", "asset")
+        journal.add_account(conn, "aa", "1600", "Kasse", "asset")
+        journal.add_account(conn, "aa", "8400", "Erlöse 19 %", "revenue")
+        journal.add_account(conn, "aa", "1776", "Umsatzsteuer 19 %", "liability")  # noqa
+        journal.add_period(conn, "2023", "2023-01-01", "2023-12-31")
+        journal.add_period(conn, "2024", "2024-01-01", "2024-12-31")
+    yield conn
+    conn.close()
+
+
+def sale(entry_date, gross=11900, account="1200"):
+    net = round(gross / 1.19)
+    return Entry(entry_date, [Line(account, gross), Line("8400", -net),
+                              Line("1776", net - gross)])
+
+
+def stored(conn):
+    return conn.execute("""SELECT account_id, period_id, debit, credit
+                           FROM account_balances
+                           ORDER BY account_id, period_id""").fetchall()
+
+
+def test_posting_updates_balances(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2023-05-01"),
+                                           sale("2024-03-01"),
+                                           sale("2024-04-01", 2380, "1600")])
+    assert balances.account_balance(mock_conn, "1200") == 23800
+    assert balances.account_balance(mock_conn, "1200", 2) == 11900
+    assert balances.account_balance(mock_conn, "1600", 1) == 0
+    assert balances.account_balance(mock_conn, "8400", 2) == -12000
+    assert balances.account_balance(mock_conn, "9999") == 0
+    assert balances.verify_balances(mock_conn) == []
+
+
+def test_one_row_per_account_and_period(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2024-03-01")] * 50,
+                         chunk_size=7)
+    assert len(stored(mock_conn)) == 3
+    assert balances.account_balance(mock_conn, "1200") == 50 * 11900
+
+
+def test_debit_and_credit_kept_apart(mock_conn):
+    refund = Entry("2024-03-02", [Line("8400", 10000), Line("1776", 1900),
+                                  Line("1200", -11900)])
+    journal.post_entries(mock_conn, "aa", [sale("2024-03-01"), refund])
+    bank = [b for b in balances.period_balances(mock_conn, 2)
+            if b.number == "1200"][0]
+    assert (bank.debit, bank.credit, bank.balance) == (11900, 11900, 0)
+
+
+def test_period_balances_sum_up_to_zero(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2024-03-01"),
+                                           sale("2024-04-01", 2380, "1600")])
+    trial = balances.period_balances(mock_conn, 2)
+    assert [b.number for b in trial] == ["1200", "1600", "1776", "8400"]
+    assert sum(b.debit for b in trial) == sum(b.credit for b in trial)
+    assert sum(b.balance for b in trial) == 0
+    assert balances.period_balances(mock_conn, 1) == []
+
+
+def test_rejected_chunk_leaves_balances(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2024-03-01")])
+    before = stored(mock_conn)
+    with pytest.raises(journal.PostingError):
+        journal.post_entries(mock_conn, "aa", [sale("2024-03-02"),
+                                               sale("2025-01-01")])
+    assert stored(mock_conn) == before
+
+
+def test_verify_and_rebuild(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2024-03-01")])
+    with mock_conn:
+        mock_conn.execute("UPDATE account_balances SET debit = 1 WHERE account_id = 1")  # noqa
+        mock_conn.execute("DELETE FROM account_balances WHERE account_id = 3")  # noqa
+    assert balances.verify_balances(mock_conn) == [
+        (1, 2, (1, 0), (11900, 0)),
+        (3, 2, None, (0, 10000)),
+    ]
+    balances.rebuild_balances(mock_conn)
+    assert balances.verify_balances(mock_conn) == []
+    assert balances.account_balance(mock_conn, "1200") == 11900
+
+
+def test_migration_fills_balances(mock_conn):
+    journal.post_entries(mock_conn, "aa", [sale("2023-03-01"),
+                                           sale("2024-03-01")])
+    expected = stored(mock_conn)
+    with mock_conn:
+        mock_conn.execute("DROP TABLE account_balances")
+    from context import schema
+    schema.create_balances(mock_conn.cursor())
+    assert stored(mock_conn) == expected
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_bank_import.py
+"""Tests for "bank_import" module."""
+
+import io
+import pytest
+import sqlite3
+
+from context import bank_import
+from context import ensure_schema
+
+
+Transaction = bank_import.Transaction
+
+camt = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+ <BkToCstmrStmt>
+  <Stmt>
+   <Id>1</Id>
+   <Acct><Id><IBAN>DE02120300000000202051</IBAN></Id></Acct>
+   <Ntry>
+    <Amt Ccy="EUR">119.00</Amt>
+    <CdtDbtInd>CRDT</CdtDbtInd>
+    <BookgDt><Dt>2024-03-01</Dt></BookgDt>
+    <ValDt><Dt>2024-03-02</Dt></ValDt>
+    <AcctSvcrRef>2024030100001</AcctSvcrRef>
+    <NtryDtls><TxDtls>
+     <RltdPties>
+      <Dbtr><Nm>Müller GmbH</Nm></Dbtr>
+      <DbtrAcct><Id><IBAN>DE89370400440532013000</IBAN></Id></DbtrAcct>
+      <Cdtr><Nm>Becker KG</Nm></Cdtr>
+     </RltdPties>
+     <RmtInf><Ustrd>Rechnung 2024-17</Ustrd><Ustrd>Kunde 4711</Ustrd></RmtInf>
+    </TxDtls></NtryDtls>
+   </Ntry>
+   <Ntry>
+    <Amt Ccy="EUR">23.80</Amt>
+    <CdtDbtInd>DBIT</CdtDbtInd>
+    <BookgDt><DtTm>2024-03-04T10:00:00</DtTm></BookgDt>
+    <NtryDtls><TxDtls>
+     <RltdPties><Cdtr><Nm>Telefon AG</Nm></Cdtr></RltdPties>
+    </TxDtls></NtryDtls>
+   </Ntry>
+   <Ntry>
+    <CdtDbtInd>DBIT</CdtDbtInd>
+    <BookgDt><Dt>2024-03-05</Dt></BookgDt>
+   </Ntry>
+  </Stmt>
+ </BkToCstmrStmt>
+</Document>
+"""
+
+mt940 = """:20:STARTUMS
+:25:12030000/202051
+:28C:0
+:60F:C240229EUR1000,00
+:61:2403020301CR119,00NTRFNONREF//2024030100001
+:86:166?00GUTSCHRIFT?109310?20SVWZ+Rechnung 2024-17 Ku
+nde 4711?30BYLADEM1001?31DE89370400440532013000?32Müller GmbH
+:61:2403040304DR23,80NDDTNONREF
+:86:Lastschrift Telefon AG
+:61:2312290102DR5,00NCHGNONREF
+:61:2403XX0304DR1,00NCHGNONREF
+:62F:C240304EUR1090,20
+-
+"""
+
+bank_csv = """Buchungstag;Valutadatum;Name Zahlungsbeteiligter;IBAN Zahlungsbeteiligter;Verwendungszweck;Betrag;Waehrung
+01.03.2024;02.03.2024;Müller GmbH;DE89370400440532013000;Rechnung 2024-17;119,00;EUR
+04.03.24;;Telefon AG;;Lastschrift;-23,80;EUR
+05.03.2024;;Kaffee;;;-3,50;
+05.03.2024;;Kaffee;;;-3,50;
+31.02.2024;;Falsch;;;1,00;EUR
+"""  # noqa
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def transactions(parsed):
+    return [t for _, t in parsed if isinstance(t, Transaction)]
+
+
+def errors(parsed):
+    return [(p, str(t)) for p, t in parsed
+            if isinstance(t, bank_import.StatementError)]
+
+
+def count(conn):
+    return conn.execute("SELECT COUNT(*) FROM bank_transactions").fetchone()[0]  # noqa
+
+
+# ######## reading ############################################################
+
+def test_read_camt():
+    parsed = list(bank_import.read_camt(io.BytesIO(camt.encode())))
+    first, second = transactions(parsed)
+    assert first == Transaction(
+        account="DE02120300000000202051", booking_date="2024-03-01",
+        amount=11900, currency="EUR", value_date="2024-03-02",
+        counterparty="Müller GmbH",
+        counterparty_account="DE89370400440532013000",
+        purpose="Rechnung 2024-17 Kunde 4711", reference="2024030100001")
+    assert second.amount == -2380
+    assert second.booking_date == "2024-03-04"
+    assert second.counterparty == "Telefon AG"
+    assert errors(parsed) == [(3, "no amount")]
+
+
+def test_read_camt_clears_entries(monkeypatch):
+    import xml.etree.ElementTree as ET
+    iterparse = ET.iterparse
+    statements = []
+
+    def spy(source, events):
+        for event, element in iterparse(source, events):
+            if event == "start" and element.tag.endswith("}Stmt"):
+                statements.append(element)
+            yield event, element
+
+    entry_start = camt.index("   <Ntry>")
+    entry = camt[entry_start:camt.index("   <Ntry>", entry_start + 1)]
+    big = camt.replace(entry, entry * 1000)
+    monkeypatch.setattr(ET, "iterparse", spy)
+    sizes = [len(statements[0])
+             for _ in bank_import.read_camt(io.BytesIO(big.encode()))]
+    assert len(sizes) == 1002
+    # the entries read ahead by the parser, not all entries read so far
+    assert max(sizes) < 100
+
+
+def test_read_mt940():
+    parsed = list(bank_import.read_mt940(io.StringIO(mt940)))
+    first, second, third = transactions(parsed)
+    assert first == Transaction(
+        account="12030000/202051", booking_date="2024-03-01",
+        amount=11900, currency="EUR", value_date="2024-03-02",
+        counterparty="Müller GmbH",
+        counterparty_account="DE89370400440532013000",
+        purpose="SVWZ+Rechnung 2024-17 Kunde 4711", reference="2024030100001")  # noqa
+    assert (second.amount, second.purpose) == (-2380, "Lastschrift Telefon AG")
+    assert second.reference == "NONREF"
+    # value date in December, booked in January
+    assert (third.booking_date, third.value_date) == ("2024-01-02", "2023-12-29")  # noqa
+    assert [p for p, _ in errors(parsed)] == [11]
+
+
+def test_read_bank_csv():
+    parsed = list(bank_import.read_bank_csv(io.StringIO(bank_csv)))
+    found = transactions(parsed)
+    assert found[0] == Transaction(
+        account=None, booking_date="2024-03-01", amount=11900,
+        currency="EUR", value_date="2024-03-02", counterparty="Müller GmbH",
+        counterparty_account="DE89370400440532013000",
+        purpose="Rechnung 2024-17")
+    assert found[1].booking_date == "2024-03-04"
+    assert found[1].amount == -2380
+    assert found[2].currency == "EUR"
+    assert len(found) == 4
+    assert [p for p, _ in errors(parsed)] == [6]
+
+
+def test_read_bank_csv_comma_separated():
+    text = "booking_date,amount,purpose\n2024-03-01,12.50,Test\n"
+    (found,) = transactions(bank_import.read_bank_csv(io.StringIO(text)))
+    assert (found.booking_date, found.amount, found.purpose) == ("2024-03-01", 1250, "Test")  # noqa
+
+
+def test_read_bank_csv_without_amount():
+    with pytest.raises(bank_import.StatementError):
+        list(bank_import.read_bank_csv(io.StringIO("Buchungstag;Text\n")))
+
+
+# ######## writing ############################################################
+
+def test_import_transactions(mock_conn):
+    parsed = bank_import.read_bank_csv(io.StringIO(bank_csv))
+    report = bank_import.import_transactions(mock_conn, "aa", parsed, "csv")
+    assert (report.imported, report.duplicates) == (4, 0)
+    assert report.rejected == [(6, "day is out of range for month")]
+    row = mock_conn.execute("SELECT booking_date, amount, counterparty, source, imported_by FROM bank_transactions WHERE txn_id = 1").fetchone()  # noqa
+    assert row == ("2024-03-01", 11900, "Müller GmbH", "csv", "aa")
+
+
+def test_import_twice_adds_nothing(mock_conn):
+    for _ in range(2):
+        parsed = bank_import.read_mt940(io.StringIO(mt940))
+        report = bank_import.import_transactions(mock_conn, "aa", parsed,
+                                                 "mt940", chunk_size=2)
+    assert (report.imported, report.duplicates) == (0, 3)
+    assert count(mock_conn) == 3
+
+
+def test_overlapping_statements(mock_conn):
+    lines = bank_csv.splitlines(keepends=True)
+    first = lines[:4]  # header and three rows
+    second = [lines[0]] + lines[3:5]
+    bank_import.import_transactions(
+        mock_conn, "aa", bank_import.read_bank_csv(iter(first)), "csv")
+    report = bank_import.import_transactions(
+        mock_conn, "aa", bank_import.read_bank_csv(iter(second)), "csv")
+    # one coffee was in the first file already, the second one is new
+    assert (report.imported, report.duplicates) == (1, 1)
+    assert count(mock_conn) == 4
+
+
+def test_transaction_keys():
+    keys = bank_import.TransactionKeys()
+    coffee = Transaction("DE02", "2024-03-05", -350)
+    first, second = keys.key(coffee), keys.key(coffee)
+    assert first != second
+    assert len(first) == 32
+    assert bank_import.TransactionKeys().key(coffee) == first
+
+
+def test_import_chunks(mock_conn):
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    parsed = ((i, Transaction("DE02", "2024-03-05", -i)) for i in range(1, 26))  # noqa
+    report = bank_import.import_transactions(mock_conn, "aa", parsed, "csv",
+                                             chunk_size=10)
+    mock_conn.set_trace_callback(None)
+    assert report.imported == 25
+    assert statements.count("BEGIN IMMEDIATE") == 3
+    assert count(mock_conn) == 25
+
+
+def test_main_unknown_format(tmp_path, capsys):
+    path = tmp_path / "statement.pdf"
+    path.write_text("")
+    assert bank_import.main([str(path), "--company", "X", "--user", "ab"]) == 2  # noqa
+    assert "use --format" in capsys.readouterr().err
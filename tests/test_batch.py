@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_batch.py
+"""Tests for "batch" module."""
+
+import io
+import json
+import pytest
+import sqlite3
+
+from context import batch
+from context import ensure_schema
+from context import helpers
+from context import login
+from context import onboarding
+from context import Name
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def run(conn, *commands, **kwargs):
+    lines = [c if isinstance(c, str) else json.dumps(c) for c in commands]
+    out = io.StringIO()
+    failures = batch.run_batch(conn, "ab", lines, out, max_workers=1,
+                               **kwargs)
+    return failures, [json.loads(line) for line in out.getvalue().splitlines()]  # noqa
+
+
+# ######## run batch ##########################################################
+
+def test_run_batch_add_person(mock_conn):
+    failures, results = run(mock_conn, {"op": "add_person",
+                                        "first_name": "Tom",
+                                        "last_name": "Test",
+                                        "password": "secret"})
+
+    assert failures == 0
+    assert results == [{"line": 1, "ok": True, "person_id": 1,
+                        "initials": "tt"}]
+    credentials = login.load_credentials(mock_conn, "tt")
+    assert login.credentials_match(credentials, "secret")
+    assert not mock_conn.in_transaction
+
+
+def test_run_batch_failing_command_is_skipped(mock_conn):
+    tom = {"op": "add_person", "first_name": "Tom", "last_name": "Test"}
+    failures, results = run(mock_conn, tom, tom, "no json", {"op": "fly"},
+                            {"op": "add_person", "first_name": "Jon"},
+                            {"op": "add_person", "first_name": "Jon",
+                             "last_name": "Outsh"})
+
+    assert failures == 4
+    assert [result["ok"] for result in results] == [True, False, False, False, False, True]  # noqa
+    assert results[1]["error"] == "name already exists"
+    assert results[3]["error"] == "unknown op 'fly'"
+    rows = mock_conn.execute("SELECT initials FROM persons ORDER BY person_id").fetchall()  # noqa
+    assert rows == [("tt",), ("jo",)]
+
+
+def test_run_batch_savepoint_per_command(mock_conn):
+    # the person is inserted, then the settings fail: nothing of it is kept
+    failures, results = run(mock_conn, {"op": "add_person",
+                                        "first_name": "Tom",
+                                        "last_name": "Test",
+                                        "language": ["not", "a", "language"]})
+
+    assert failures == 1
+    assert mock_conn.execute("SELECT COUNT(*) FROM persons").fetchone() == (0,)  # noqa
+
+
+def test_run_batch_update_language(mock_conn):
+    failures, results = run(mock_conn,
+                            {"op": "add_person", "first_name": "Tom",
+                             "last_name": "Test"},
+                            {"op": "update_language", "initials": "tt",
+                             "language": "en"},
+                            {"op": "update_language", "initials": "xx",
+                             "language": "en"})
+
+    assert failures == 1
+    assert results[2]["error"] == "unknown initials 'xx'"
+    row = mock_conn.execute("SELECT language FROM settings").fetchone()
+    assert row == ("en",)
+
+
+def test_run_batch_update_password(mock_conn):
+    run(mock_conn, {"op": "add_person", "first_name": "Tom",
+                    "last_name": "Test"},
+        {"op": "update_password", "initials": "tt", "password": "new"})
+
+    credentials = login.load_credentials(mock_conn, "tt")
+    assert login.credentials_match(credentials, "new")
+
+
+def test_run_batch_update_password_hashed_before_lock(mock_conn, mocker):
+    run(mock_conn, {"op": "add_person", "first_name": "Tom",
+                    "last_name": "Test"})
+    in_transaction = []
+    real_hash = batch.hash_passwords
+
+    def hash_passwords(*args):
+        in_transaction.append(mock_conn.in_transaction)
+        return real_hash(*args)
+
+    mocker.patch.object(batch, "hash_passwords", side_effect=hash_passwords)
+    version = mock_conn.execute("SELECT version FROM settings").fetchone()[0]
+    failures, results = run(mock_conn, {"op": "update_password",
+                                        "initials": "tt", "password": "new"},
+                            {"op": "update_password", "initials": "tt"})
+
+    assert in_transaction == [False]
+    assert results[0]["ok"]
+    assert results[1]["error"] == "password is required"
+    assert mock_conn.execute("SELECT version FROM settings").fetchone()[0] == version + 1  # noqa
+
+
+def test_run_batch_find_similar(mock_conn):
+    failures, results = run(mock_conn,
+                            {"op": "add_person", "first_name": "Hans",
+                             "last_name": "Müller"},
+                            {"op": "find_similar", "first_name": "Hans",
+                             "last_name": "Mueller"})
+
+    assert results[1]["similar"][0]["last_name"] == "Müller"
+
+
+def test_run_batch_one_transaction_per_chunk(mock_conn):
+    commands = [{"op": "add_person", "first_name": f"Tom{i}",
+                 "last_name": "Test"} for i in range(5)]
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    failures, results = run(mock_conn, *commands, chunk_size=2)
+    mock_conn.set_trace_callback(None)
+
+    assert failures == 0
+    assert statements.count("BEGIN IMMEDIATE") == 3
+    assert statements.count("COMMIT") == 3
+
+
+def test_run_batch_hashes_chunk_at_once(mock_conn, mocker):
+    spy = mocker.spy(batch, "hash_passwords")
+    commands = [{"op": "add_person", "first_name": f"Tom{i}",
+                 "last_name": "Test"} for i in range(3)]
+
+    run(mock_conn, *commands)
+    spy.assert_called_once()
+    assert len(spy.call_args.args[0]) == 3
+
+
+def test_run_batch_no_screen(mock_conn, mocker, capsys):
+    mock_system = mocker.patch("os.system")
+    mock_input = mocker.patch("builtins.input")
+    run(mock_conn, {"op": "add_person", "first_name": "Tom",
+                    "last_name": "Test"})
+
+    mock_system.assert_not_called()
+    mock_input.assert_not_called()
+    assert capsys.readouterr().out == ""
+
+
+# ######## command line #######################################################
+
+@pytest.fixture
+def company(tmp_path, monkeypatch):
+    monkeypatch.setattr(helpers, "path_to_db_dir", lambda: tmp_path)
+    conn = batch.open_company_database(tmp_path / "Test_KG.db")
+    onboarding.add_employees(conn, "aa", [onboarding.NewEmployee(Name("Anna", "Boss"))], max_workers=1)  # noqa
+    conn.close()
+    return tmp_path / "Test_KG.db"
+
+
+def test_main_batch(company, monkeypatch, capsys):
+    monkeypatch.setenv("BUHA_PASSWORD", "asd")
+    monkeypatch.setattr("sys.stdin", io.StringIO(
+        '{"op": "add_person", "first_name": "Tom", "last_name": "Test"}\n'))
+
+    assert batch.main(["--company", "Test KG", "--user", "ab"]) == 0
+    out = capsys.readouterr().out
+    assert json.loads(out)["initials"] == "tt"
+
+
+def test_main_batch_wrong_password(company, monkeypatch, capsys):
+    monkeypatch.setenv("BUHA_PASSWORD", "wrong")
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+
+    assert batch.main(["--company", "Test KG", "--user", "ab"]) == 2
+    assert "Login failed" in capsys.readouterr().err
+
+
+def test_main_batch_unknown_company(company, monkeypatch):
+    monkeypatch.setenv("BUHA_PASSWORD", "asd")
+
+    assert batch.main(["--company", "Other KG", "--user", "ab"]) == 2
+
+
+def test_open_for_cli(company, monkeypatch, capsys):
+    monkeypatch.setenv("BUHA_PASSWORD", "asd")
+    conn = batch.open_for_cli("Test KG", "ab")
+    assert conn.execute("SELECT COUNT(*) FROM persons").fetchone() == (1,)
+    conn.close()
+
+    monkeypatch.setenv("BUHA_PASSWORD", "wrong")
+    assert batch.open_for_cli("Test KG", "ab") is None
+    assert batch.open_for_cli("Other KG", "ab") is None
+    err = capsys.readouterr().err
+    assert "Login failed" in err and "No company database Other_KG.db" in err
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_catalog.py
+"""Tests for "catalog" module."""
+
+import os
+
+from unittest.mock import patch
+
+from context import catalog
+from context import database
+
+
+def touch(db_dir, *filenames):
+    for filename in filenames:
+        (db_dir / filename).touch()
+
+
+def age_catalog(db_dir):
+    """Pretend the catalog was written after the last change of db_dir."""
+    data = catalog.read_catalog(db_dir)
+    catalog.write_catalog(db_dir, data["companies"],
+                          catalog.dir_mtime(db_dir))
+
+
+# ######## normalize ##########################################################
+
+def test_normalize_company():
+    assert catalog.normalize_company("Becker_KG.db") == "becker kg"
+    assert catalog.normalize_company("  becker   KG ") == "becker kg"
+
+
+def test_find_company():
+    companies = ["Becker_KG.db", "Huber_GmbH.db"]
+    assert catalog.find_company("becker_kg.db", companies) == "Becker_KG.db"
+    assert catalog.find_company("Becker.db", companies) is None
+
+
+# ######## list databases #####################################################
+
+def test_list_databases_not_recursive(tmp_path):
+    touch(tmp_path, "b.db", "a.db", "notes.txt")
+    (tmp_path / "backup").mkdir()
+    touch(tmp_path / "backup", "a_2023.db")
+
+    assert catalog.list_databases(tmp_path) == ["a.db", "b.db"]
+
+
+def test_list_databases_missing_dir(tmp_path):
+    assert catalog.list_databases(tmp_path / "missing") == []
+
+
+# ######## load companies #####################################################
+
+def test_load_companies_writes_catalog(tmp_path):
+    touch(tmp_path, "a.db")
+
+    assert catalog.load_companies(tmp_path) == ["a.db"]
+    assert catalog.read_catalog(tmp_path)["companies"] == ["a.db"]
+
+
+def test_load_companies_fresh_catalog_no_listing(tmp_path):
+    touch(tmp_path, "a.db")
+    catalog.load_companies(tmp_path)
+    age_catalog(tmp_path)
+
+    with patch.object(catalog, "list_databases") as mock_list:
+        assert catalog.load_companies(tmp_path) == ["a.db"]
+        mock_list.assert_not_called()
+
+
+def test_load_companies_stale_catalog_lists_again(tmp_path):
+    touch(tmp_path, "a.db")
+    catalog.load_companies(tmp_path)
+    age_catalog(tmp_path)
+    touch(tmp_path, "b.db")  # copied in by hand
+    os.utime(tmp_path, ns=(0, 0))  # mtime resolution of some file systems
+
+    assert catalog.load_companies(tmp_path) == ["a.db", "b.db"]
+
+
+def test_load_companies_broken_catalog(tmp_path):
+    touch(tmp_path, "a.db")
+    catalog.path_to_catalog(tmp_path).write_text("{not json")
+
+    assert catalog.load_companies(tmp_path) == ["a.db"]
+
+
+def test_register_company(tmp_path):
+    touch(tmp_path, "a.db")
+    catalog.load_companies(tmp_path)
+    age_catalog(tmp_path)
+
+    catalog.register_company(tmp_path, "new.db")
+    age_catalog(tmp_path)
+    assert catalog.load_companies(tmp_path) == ["a.db", "new.db"]
+
+
+def test_load_companies_wal_session_keeps_catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("BUHA_DATABASE_JOURNAL_MODE", "wal")
+    conn = database.connect(tmp_path / "Firma.db")
+    conn.close()
+    catalog.load_companies(tmp_path)
+    age_catalog(tmp_path)
+
+    conn = database.connect(tmp_path / "Firma.db")
+    with conn:
+        conn.execute("CREATE TABLE t (x)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+    assert not (tmp_path / "Firma.db-wal").exists()
+    os.utime(tmp_path, ns=(0, 0))  # the directory did change
+
+    with patch.object(catalog, "write_catalog") as mock_write:
+        assert catalog.load_companies(tmp_path) == ["Firma.db"]
+        mock_write.assert_not_called()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_change_entry.py
+"""Tests for "change_entry" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import change_entry
+from context import editing
+from context import ensure_schema
+from context import MenuStart
+from context import Name
+from context import onboarding
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    employees = [onboarding.NewEmployee(Name("Jonas", "Müller"))]
+    onboarding.add_employees(conn, "aa", employees, max_workers=1)
+    yield conn
+    conn.close()
+
+
+def test_change_name(mock_conn, capsys):
+    menu = change_entry.MenuChangeEntry()
+    # initials, then first name ... salutation
+    answers = ["jm", "", "", "Schmidt", "Jo", "", "", "Herr"]
+
+    with patch("builtins.input", side_effect=answers):
+        row = menu.change_row(mock_conn, "names", "en")
+
+    assert row.version == 2
+    assert row.values["last_name"] == "Schmidt"
+    assert row.values["salutation"] == "Herr"
+    assert "Saved." in capsys.readouterr().out
+
+
+def test_change_settings(mock_conn):
+    menu = change_entry.MenuChangeEntry()
+
+    with patch("builtins.input", side_effect=["jm", "fr", "n"]):
+        row = menu.change_row(mock_conn, "settings", "en")
+
+    assert row.values == {"language": "fr", "is_internal": False}
+
+
+def test_change_settings_invalid_value_asked_again(mock_conn, capsys):
+    menu = change_entry.MenuChangeEntry()
+
+    with patch("builtins.input", side_effect=["jm", "xx", "-", "en", ""]):
+        row = menu.change_row(mock_conn, "settings", "en")
+
+    assert row.values["language"] == "en"
+    out = capsys.readouterr().out
+    assert "unknown language 'xx'" in out
+    assert "language cannot be empty" in out
+
+
+def test_change_clears_value(mock_conn):
+    menu = change_entry.MenuChangeEntry()
+    mock_conn.execute("UPDATE names SET nickname = 'Jo'")
+
+    with patch("builtins.input", side_effect=["jm", "", "", "", "-", "", "", ""]):  # noqa
+        row = menu.change_row(mock_conn, "names", "en")
+
+    assert row.values["nickname"] is None
+
+
+def test_change_unknown_initials(mock_conn, capsys):
+    menu = change_entry.MenuChangeEntry()
+
+    with patch("builtins.input", return_value="xx"):
+        assert menu.change_row(mock_conn, "names", "en") is None
+    assert "No entry for these initials." in capsys.readouterr().out
+
+
+def test_change_conflict(mock_conn, capsys):
+    menu = change_entry.MenuChangeEntry()
+
+    def someone_else_saves(row, language):
+        editing.update_row(mock_conn, row, {"language": "de"})
+        return {"language": "en"}
+
+    with patch("builtins.input", return_value="jm"), \
+            patch.object(menu, "ask_changes", side_effect=someone_else_saves):  # noqa
+        row = menu.change_row(mock_conn, "settings", "en")
+
+    assert row.values["language"] == "de"
+    out = capsys.readouterr().out
+    assert "Someone else changed this entry" in out
+    assert "Language: de" in out
+
+
+def test_menu_start_change_entry(mock_conn):
+    menu = MenuStart()
+
+    with patch("buha.scripts.start.choose_option", side_effect=["2", "9"]), \
+            patch.object(change_entry.MenuChangeEntry, "run") as mock_run, \
+            patch("os.system"):
+        menu.run(mock_conn, "aa", "Test_KG.db", "en")
+    mock_run.assert_called_once_with(mock_conn, "aa", "Test_KG.db", "en")
+
+
+def test_menu_change_entry_run(mock_conn):
+    menu = change_entry.MenuChangeEntry()
+
+    choose_option = "buha.scripts.change_entry.choose_option"
+
+    with patch(choose_option, side_effect=["3", "9"]), \
+            patch.object(menu, "change_row") as mock_change_row, \
+            patch("os.system"):
+        menu.run(mock_conn, "aa", "Test_KG.db", "en")
+    mock_change_row.assert_called_once_with(mock_conn, "settings", "en")
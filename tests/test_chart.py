@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_chart.py
+"""Tests for "chart" module."""
+
+import pytest
+import sqlite3
+
+from context import chart
+from context import database
+from context import ensure_schema
+from context import journal
+
+
+@pytest.fixture
+def mock_conn(tmp_path):
+    # a file: the index is kept per database file
+    conn = sqlite3.connect(tmp_path / "test.db")
+    ensure_schema(conn)
+    yield conn
+    chart.forget_index(conn)
+    conn.close()
+
+
+@pytest.mark.parametrize("name", chart.charts)
+def test_chart_files(name):
+    rows = chart.read_chart(chart.chart_file(name))
+    numbers = [number for number, _, _ in rows]
+    assert len(numbers) == len(set(numbers))
+    assert all(len(number) == 4 and number.isdigit() for number in numbers)
+    assert {kind for _, _, kind in rows} <= set(journal.account_kinds)
+    index_ranges = chart.account_classes[name]
+    assert all(any(start <= number <= end for start, end, _ in index_ranges)
+               for number in numbers)
+
+
+def test_chart_file_unknown():
+    with pytest.raises(ValueError):
+        chart.chart_file("SKR99")
+
+
+def test_load_chart(mock_conn):
+    added = chart.load_chart(mock_conn, "aa", "SKR03")
+    total = len(chart.read_chart(chart.chart_file("SKR03")))
+    assert added == total
+    assert chart.company_chart(mock_conn) == "SKR03"
+    row = mock_conn.execute("SELECT name, kind, created_by FROM accounts WHERE number = '1200'").fetchone()  # noqa
+    assert row == ("Bank", "asset", "aa")
+
+
+def test_load_chart_keeps_existing_accounts(mock_conn):
+    with database.UnitOfWork(mock_conn):
+        journal.add_account(mock_conn, "aa", "1200", "Sparkasse", "asset")
+    added = chart.load_chart(mock_conn, "aa", "SKR03")
+    assert chart.load_chart(mock_conn, "aa", "SKR03") == 0
+
+    total = len(chart.read_chart(chart.chart_file("SKR03")))
+    assert added == total - 1
+    assert mock_conn.execute("SELECT name FROM accounts WHERE number = '1200'").fetchone() == ("Sparkasse",)  # noqa
+
+
+def test_load_chart_other_chart(mock_conn):
+    chart.load_chart(mock_conn, "aa", "SKR03")
+    with pytest.raises(ValueError):
+        chart.load_chart(mock_conn, "aa", "SKR04")
+
+
+def test_load_chart_one_transaction(mock_conn):
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    chart.load_chart(mock_conn, "aa", "SKR04")
+    mock_conn.set_trace_callback(None)
+    assert statements.count("BEGIN IMMEDIATE") == 1
+    assert statements.count("COMMIT") == 1
+
+
+@pytest.mark.parametrize("number, expected", [
+    ("0027", "Anlage- und Kapitalkonten"),
+    ("1200", "Finanz- und Privatkonten"),
+    ("4999", "Betriebliche Aufwendungen"),
+    ("8400", "Erlöskonten"),
+    ("5000", None),
+    ("400", "Anlage- und Kapitalkonten"),
+])
+def test_account_class(mock_conn, number, expected):
+    chart.load_chart(mock_conn, "aa", "SKR03")
+    assert chart.account_index(mock_conn).account_class(number) == expected
+
+
+def test_account_class_without_chart(mock_conn):
+    assert chart.account_index(mock_conn).account_class("1200") is None
+
+
+def test_in_class(mock_conn):
+    chart.load_chart(mock_conn, "aa", "SKR04")
+    index = chart.account_index(mock_conn)
+    equity = index.in_class("Eigenkapital")
+    assert [account.number for account in equity] == ["2000", "2100", "2180", "2900", "2970"]  # noqa
+    assert index.get("1800").name == "Bank"
+    assert "1800" in index
+    assert "1801" not in index
+
+
+def test_account_index_cached(mock_conn):
+    chart.load_chart(mock_conn, "aa", "SKR03")
+    index = chart.account_index(mock_conn)
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    assert chart.account_index(mock_conn) is index
+    mock_conn.set_trace_callback(None)
+    # one query; the trace also shows the pragma it reads as "-- PRAGMA"
+    queries = [s for s in statements if not s.startswith("--")]
+    assert len(queries) == 1
+    assert "pragma_database_list" in queries[0]
+
+
+def test_account_index_not_kept_in_transaction(mock_conn):
+    mock_conn.execute("BEGIN IMMEDIATE")
+    journal.add_account(mock_conn, "aa", "1200", "Bank", "asset")
+    assert "1200" in chart.account_index(mock_conn)
+    mock_conn.rollback()
+    assert "1200" not in chart.account_index(mock_conn)
+
+
+def test_account_index_in_memory_not_kept():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    assert chart.account_index(conn) is not chart.account_index(conn)
+    conn.close()
+
+
+def test_account_index_after_add_account(mock_conn):
+    index = chart.account_index(mock_conn)
+    with database.UnitOfWork(mock_conn):
+        journal.add_account(mock_conn, "aa", "1200", "Bank", "asset")
+    assert "1200" not in index
+    assert "1200" in chart.account_index(mock_conn)
+
+
+def test_account_index_after_other_connection(tmp_path):
+    path = tmp_path / "test.db"
+    conn = sqlite3.connect(path)
+    other = sqlite3.connect(path)
+    ensure_schema(conn)
+    assert len(chart.account_index(conn)) == 0
+    with database.UnitOfWork(other):
+        journal.add_account(other, "aa", "1200", "Bank", "asset")
+    assert "1200" in chart.account_index(conn)
+    for c in (conn, other):
+        chart.forget_index(c)
+        c.close()
+
+
+def test_posting_reads_no_accounts_per_line(mock_conn):
+    chart.load_chart(mock_conn, "aa", "SKR03")
+    with database.UnitOfWork(mock_conn):
+        journal.add_period(mock_conn, "2024", "2024-01-01", "2024-12-31")
+    chart.account_index(mock_conn)
+    entries = [journal.JournalEntry("2024-03-01", [journal.Line("1200", 100),
+                                                   journal.Line("8400", -100)])
+               for _ in range(20)]
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    journal.post_entries(mock_conn, "aa", entries)
+    mock_conn.set_trace_callback(None)
+    assert not [s for s in statements
+                if "SELECT account_id, number, name, kind" in s]
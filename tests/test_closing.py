@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_closing.py
+"""Tests for "closing" module."""
+
+import pytest
+import sqlite3
+
+from context import closing
+from context import journal
+from context import reports
+from test_reports import fill
+
+
+Entry = journal.JournalEntry
+Line = journal.Line
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    fill(conn)
+    with conn:
+        journal.add_period(conn, "2024-03", "2024-03-01", "2024-03-31")
+    yield conn
+    conn.close()
+
+
+def rent(entry_date):
+    return Entry(entry_date, [Line("4210", 1000), Line("1200", -1000)])
+
+
+def numbers(balances):
+    return [(b.number, b.debit, b.credit) for b in balances]
+
+
+def test_close_period(mock_conn):
+    assert closing.close_period(mock_conn, "aa", "2024-01") == 4
+    row = mock_conn.execute("SELECT closed, closed_by FROM periods WHERE name = '2024-01'").fetchone()  # noqa
+    assert row == (1, "aa")
+    with pytest.raises(journal.PostingError, match="no open period"):
+        journal.post_entries(mock_conn, "aa", [rent("2024-01-20")])
+
+
+def test_snapshots_are_cumulative(mock_conn):
+    closing.close_period(mock_conn, "aa", "2024-01")
+    closing.close_period(mock_conn, "aa", "2024-02")
+    # no postings in March, the snapshot is February's
+    closing.close_period(mock_conn, "aa", "2024-03")
+    assert numbers(closing.snapshot_balances(mock_conn, 2)) == numbers(
+        reports.account_totals(mock_conn, reports.FIRST_DAY, "2024-02-29"))
+    assert numbers(closing.snapshot_balances(mock_conn, 3)) == numbers(
+        closing.snapshot_balances(mock_conn, 2))
+
+
+def test_close_in_order(mock_conn):
+    with pytest.raises(closing.ClosingError, match="close period '2024-01' first"):  # noqa
+        closing.close_period(mock_conn, "aa", "2024-02")
+    closing.close_period(mock_conn, "aa", "2024-01")
+    with pytest.raises(closing.ClosingError, match="closed already"):
+        closing.close_period(mock_conn, "aa", "2024-01")
+    with pytest.raises(closing.ClosingError, match="no period"):
+        closing.close_period(mock_conn, "aa", "2023")
+    assert mock_conn.execute("SELECT COUNT(*) FROM account_snapshots").fetchone() == (4,)  # noqa
+
+
+def test_closed_period_is_locked(mock_conn):
+    closing.close_period(mock_conn, "aa", "2024-01")
+    statements = [
+        "UPDATE journal_entries SET description = 'x' WHERE entry_id = 1",
+        "DELETE FROM journal_entries WHERE entry_id = 1",
+        "UPDATE journal_lines SET amount = 1 WHERE entry_id = 1",
+        "DELETE FROM journal_lines WHERE entry_id = 2",
+        "INSERT INTO journal_entries (period_id, entry_date) VALUES (1, '2024-01-31')",  # noqa
+        "UPDATE periods SET closed = 0 WHERE period_id = 1",
+        "UPDATE account_snapshots SET debit = 0",
+        "DELETE FROM account_snapshots",
+    ]
+    for statement in statements:
+        with pytest.raises(sqlite3.IntegrityError):
+            mock_conn.execute(statement)
+    # the open periods are not
+    with mock_conn:
+        mock_conn.execute("UPDATE journal_entries SET description = 'x' WHERE entry_id = 3")  # noqa
+
+
+def test_period_closed_while_posting(mock_conn):
+    def entries():
+        yield rent("2024-01-10")
+        # between the chunks, as by another user
+        closing.close_period(mock_conn, "aa", "2024-01")
+        yield rent("2024-01-20")
+
+    with pytest.raises(journal.PostingError, match="no open period"):
+        journal.post_entries(mock_conn, "aa", entries(), chunk_size=1)
+    rows = mock_conn.execute("SELECT entry_date FROM journal_entries WHERE entry_date IN ('2024-01-10', '2024-01-20')").fetchall()  # noqa
+    assert rows == [("2024-01-10",)]
+
+
+def test_opening_balances(mock_conn):
+    assert closing.opening_balances(mock_conn, "2024-02") == []
+    closing.close_period(mock_conn, "aa", "2024-01")
+    opening = closing.opening_balances(mock_conn, "2024-02")
+    assert numbers(opening) == [("0800", 0, 2500000),
+                                ("1200", 2511900, 0),
+                                ("1776", 0, 1900),
+                                ("8400", 0, 10000)]
+
+
+@pytest.mark.parametrize("day", ["2024-01-31", "2024-02-10", "2024-02-29",
+                                 "2024-03-15"])
+def test_balances_up_to(mock_conn, day):
+    expected = numbers(reports.account_totals(mock_conn, reports.FIRST_DAY,
+                                              day))
+    closing.close_period(mock_conn, "aa", "2024-01")
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    assert numbers(closing.balances_up_to(mock_conn, day)) == expected
+    mock_conn.set_trace_callback(None)
+    # January is read from its snapshot only
+    assert "2024-01-02" not in " ".join(statements)
+    assert not [s for s in statements if "journal_lines" in s
+                and "'2024-02-01'" not in s]
+
+
+def test_balance_sheet_after_close(mock_conn):
+    before = reports.balance_sheet(mock_conn, "2024-02-10")
+    closing.close_period(mock_conn, "aa", "2024-01")
+    assert reports.balance_sheet(mock_conn, "2024-02-10") == before
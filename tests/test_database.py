@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_database.py
+"""Tests for "database" module."""
+
+import pytest
+import sqlite3
+
+from context import config
+from context import database
+from context import schema
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "buha.ini"
+    monkeypatch.setenv("BUHA_CONFIG", str(path))
+    config.load_config.cache_clear()
+    yield path
+    config.load_config.cache_clear()
+
+
+def pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+# ######## connect ############################################################
+
+def test_connect_default_pragmas(tmp_path, config_file):
+    conn = database.connect(tmp_path / "test.db")
+
+    assert pragma(conn, "journal_mode") == "wal"
+    assert pragma(conn, "synchronous") == 1  # NORMAL
+    assert pragma(conn, "foreign_keys") == 1
+    assert pragma(conn, "mmap_size") == 256 * 1024 * 1024
+    assert pragma(conn, "cache_size") == -16000
+    conn.close()
+
+
+def test_connect_pragmas_from_config(tmp_path, config_file):
+    config_file.write_text("""[database]
+journal_mode = delete
+synchronous = full
+foreign_keys = off
+cache_size = 500
+""")
+    conn = database.connect(tmp_path / "test.db")
+
+    assert pragma(conn, "journal_mode") == "delete"
+    assert pragma(conn, "synchronous") == 2  # FULL
+    assert pragma(conn, "foreign_keys") == 0
+    assert pragma(conn, "cache_size") == 500
+    conn.close()
+
+
+def test_connect_unknown_journal_mode(tmp_path, config_file):
+    config_file.write_text("[database]\njournal_mode = fast\n")
+    with pytest.raises(ValueError):
+        database.connect(tmp_path / "test.db")
+
+
+def test_connect_unknown_synchronous(tmp_path, config_file, monkeypatch):
+    monkeypatch.setenv("BUHA_DATABASE_SYNCHRONOUS", "sometimes")
+    with pytest.raises(ValueError):
+        database.connect(tmp_path / "test.db")
+
+
+def test_connect_foreign_keys_enforced(tmp_path, config_file):
+    conn = database.open_company_database(tmp_path / "test.db")
+    with pytest.raises(sqlite3.IntegrityError):
+        with conn:
+            conn.execute("""INSERT INTO names (
+                            person_id, first_name, last_name)
+                            VALUES (99, 'Tom', 'Test')""")
+    conn.close()
+
+
+# ######## open company database ##############################################
+
+def test_open_company_database_schema(tmp_path, config_file):
+    conn = database.open_company_database(tmp_path / "test.db")
+    assert schema.schema_version(conn) == schema.SCHEMA_VERSION
+    conn.close()
+
+
+# ######## unit of work #######################################################
+
+@pytest.fixture
+def conn_with_table():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    yield conn
+    conn.close()
+
+
+def count_rows(conn):
+    return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+def test_unit_of_work_commits(conn_with_table):
+    conn = conn_with_table
+    with database.UnitOfWork(conn) as cur:
+        cur.execute("INSERT INTO t VALUES (1)")
+        cur.execute("INSERT INTO t VALUES (2)")
+    assert not conn.in_transaction
+    assert count_rows(conn) == 2
+
+
+def test_unit_of_work_rolls_back(conn_with_table):
+    conn = conn_with_table
+    with pytest.raises(ValueError):
+        with database.UnitOfWork(conn) as cur:
+            cur.execute("INSERT INTO t VALUES (1)")
+            raise ValueError
+    assert not conn.in_transaction
+    assert count_rows(conn) == 0
+
+
+def test_unit_of_work_nested_savepoint(conn_with_table):
+    conn = conn_with_table
+    with database.UnitOfWork(conn) as cur:
+        cur.execute("INSERT INTO t VALUES (1)")
+        with pytest.raises(ValueError):
+            with database.UnitOfWork(conn) as inner:
+                inner.execute("INSERT INTO t VALUES (2)")
+                raise ValueError
+        assert conn.in_transaction  # the outer one is still open
+    assert count_rows(conn) == 1
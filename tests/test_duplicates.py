@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_duplicates.py
+"""Tests for "duplicates" module."""
+
+import pytest
+import sqlite3
+
+from fuzzywuzzy import fuzz
+from unittest.mock import patch
+
+from context import duplicates
+from context import ensure_schema
+from context import Name
+from context import names
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def add_names(conn, all_names):
+    for person_id, name in enumerate(all_names, start=1):
+        names.insert_name(conn, "test_func", "today", name, person_id)
+    conn.commit()
+
+
+# ######## name blocks ########################################################
+
+def test_insert_name_adds_blocks(mock_conn):
+    add_names(mock_conn, [Name("Hans", "Müller")])
+
+    blocks = mock_conn.execute("SELECT block FROM name_blocks WHERE name_id = 1").fetchall()  # noqa
+    assert {block for (block,) in blocks} == duplicates.blocking_keys("Müller")  # noqa
+
+
+def test_name_blocks_deleted_with_name(mock_conn):
+    add_names(mock_conn, [Name("Hans", "Müller")])
+    mock_conn.execute("PRAGMA foreign_keys = ON")
+    mock_conn.execute("DELETE FROM names")
+
+    assert mock_conn.execute("SELECT COUNT(*) FROM name_blocks").fetchone() == (0,)  # noqa
+
+
+def test_probe_keys_skip_common_trigrams(mock_conn):
+    add_names(mock_conn, [Name("Hans", "Schmidt")] * 3 + [Name("Hans", "Schmied")])  # noqa
+    keys = sorted(duplicates.blocking_keys("Schmidt"))
+
+    probe = duplicates.probe_keys(mock_conn.cursor(), keys)
+    # 5 trigrams, a candidate shares at least 3 of them: any 3 will do
+    assert probe[0] == "p:862"
+    assert len(probe) == 1 + 3
+    assert "t:idt" in probe and "t:sch" not in probe
+
+
+# ######## find similar names #################################################
+
+def test_find_similar_names_umlaut(mock_conn):
+    add_names(mock_conn, [Name("Hans", "Müller"), Name("Hans", "Maier")])
+
+    similar = duplicates.find_similar_names(mock_conn, Name("Hans", "Mueller"))  # noqa
+    assert [(s.name_id, s.last_name, s.score) for s in similar] == [(1, "Müller", 100)]  # noqa
+
+
+def test_find_similar_names_swapped_first_and_middle(mock_conn):
+    add_names(mock_conn, [Name("Peter", "Schmidt", middle_names="Hans")])
+
+    similar = duplicates.find_similar_names(mock_conn, Name("Hans", "Schmidt", middle_names="Peter"))  # noqa
+    assert [s.person_id for s in similar] == [1]
+
+
+def test_find_similar_names_typo(mock_conn):
+    add_names(mock_conn, [Name("Johanna", "Schneider")])
+
+    similar = duplicates.find_similar_names(mock_conn, Name("Johanna", "Schnieder"))  # noqa
+    assert [s.person_id for s in similar] == [1]
+
+
+def test_find_similar_names_no_match(mock_conn):
+    add_names(mock_conn, [Name("Hans", "Müller")])
+
+    assert duplicates.find_similar_names(mock_conn, Name("Hans", "Wagner")) == []  # noqa
+
+
+def test_find_similar_names_scores_only_candidates(mock_conn):
+    # 2000 last names without a key in common with "Müller"
+    add_names(mock_conn, [Name("Hans", f"Xy{i:04d}") for i in range(2000)]
+              + [Name("Hans", "Müller")])
+
+    ratio = fuzz.token_sort_ratio
+    with patch.object(fuzz, "token_sort_ratio", side_effect=ratio) as mock_ratio:  # noqa
+        similar = duplicates.find_similar_names(mock_conn, Name("Hans", "Mueller"))  # noqa
+
+    assert [s.last_name for s in similar] == ["Müller"]
+    assert mock_ratio.call_count == 1
+    plan = str(mock_conn.execute("EXPLAIN QUERY PLAN SELECT name_id FROM name_blocks WHERE block IN ('p:657', 't:mue')").fetchall())  # noqa
+    assert "SCAN" not in plan
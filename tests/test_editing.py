@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_editing.py
+"""Tests for "editing" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import database
+from context import editing
+from context import ensure_schema
+from context import login
+from context import Name
+from context import names
+from context import onboarding
+from context import search
+from context import settings
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    employees = [onboarding.NewEmployee(Name("Jonas", "Müller"))]
+    onboarding.add_employees(conn, "aa", employees, max_workers=1)
+    yield conn
+    conn.close()
+
+
+# ######## load ###############################################################
+
+def test_load_row(mock_conn):
+    row = editing.load_row(mock_conn, "names", 1)
+
+    assert row.version == 1
+    assert row.values["first_name"] == "Jonas"
+    assert "name_key" not in row.values
+
+
+def test_load_row_missing(mock_conn):
+    assert editing.load_row(mock_conn, "names", 99) is None
+
+
+def test_load_row_of_person_latest_name(mock_conn):
+    mock_conn.execute("INSERT INTO names (person_id, first_name, last_name) VALUES (1, 'Jonas', 'Meier')")  # noqa
+
+    row = editing.load_row_of_person(mock_conn, "names", 1)
+    assert row.values["last_name"] == "Meier"
+
+
+# ######## update #############################################################
+
+def test_update_row(mock_conn):
+    row = editing.load_row(mock_conn, "settings", 1)
+
+    new_row = editing.update_row(mock_conn, row, {"language": "en"})
+
+    assert new_row.version == 2
+    assert editing.load_row(mock_conn, "settings", 1) == new_row
+    updated_at = mock_conn.execute("SELECT updated_at FROM settings").fetchone()[0]  # noqa
+    assert updated_at is not None
+    assert not mock_conn.in_transaction
+
+
+def test_update_row_without_changes(mock_conn):
+    row = editing.load_row(mock_conn, "names", 1)
+
+    assert editing.update_row(mock_conn, row, {}) is row
+    assert editing.load_row(mock_conn, "names", 1).version == 1
+
+
+def test_update_row_conflict(mock_conn):
+    row = editing.load_row(mock_conn, "names", 1)
+    editing.update_row(mock_conn, row, {"nickname": "Jo"})
+
+    with pytest.raises(editing.EditConflict) as e:
+        editing.update_row(mock_conn, row, {"nickname": "Joni"})
+
+    assert e.value.current.values["nickname"] == "Jo"
+    assert e.value.current.version == 2
+    assert editing.load_row(mock_conn, "names", 1).values["nickname"] == "Jo"
+
+
+def test_update_row_deleted(mock_conn):
+    row = editing.load_row(mock_conn, "names", 1)
+    mock_conn.execute("DELETE FROM names")
+
+    with pytest.raises(editing.EditConflict, match="deleted") as e:
+        editing.update_row(mock_conn, row, {"nickname": "Jo"})
+    assert e.value.current is None
+
+
+def test_update_row_only_editable_columns(mock_conn):
+    row = editing.load_row(mock_conn, "settings", 1)
+
+    with pytest.raises(ValueError, match="password_hash"):
+        editing.update_row(mock_conn, row, {"password_hash": b""})
+
+
+def test_update_name_keeps_lookups_in_step(mock_conn):
+    row = editing.load_row(mock_conn, "names", 1)
+
+    editing.update_row(mock_conn, row, {"last_name": "Schmidt"})
+
+    assert names.name_in_db(mock_conn, Name("Jonas", "Schmidt"))
+    assert not names.name_in_db(mock_conn, Name("Jonas", "Müller"))
+    blocks = {b for b, in mock_conn.execute("SELECT block FROM name_blocks")}  # noqa
+    assert "t:sch" in blocks and "t:mue" not in blocks
+    assert search.search_contacts(mock_conn, "schmidt")[0].first_name == "Jonas"  # noqa
+    assert search.search_contacts(mock_conn, "müller") == []
+
+
+def test_update_row_one_statement_under_lock(mock_conn):
+    row = editing.load_row(mock_conn, "persons", 1)
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    editing.update_row(mock_conn, row, {"middle_names": "Maria"})
+    mock_conn.set_trace_callback(None)
+
+    assert statements[0] == "BEGIN IMMEDIATE"
+    assert statements[1].lstrip().startswith("UPDATE persons")
+    assert statements[-1] == "COMMIT"
+    assert len(statements) == 3
+
+
+def test_settings_writes_bump_version(mock_conn):
+    writes = [
+        lambda: settings.update_language(mock_conn, "en", 1),
+        lambda: settings.update_password(mock_conn, "new", "jm"),
+        lambda: login.rehash_password(mock_conn, "jm", "new"),
+    ]
+    for write in writes:
+        row = editing.load_row(mock_conn, "settings", 1)
+        with database.UnitOfWork(mock_conn):
+            write()
+        assert editing.load_row(mock_conn, "settings", 1).version == row.version + 1  # noqa
+        with pytest.raises(editing.EditConflict):
+            editing.update_row(mock_conn, row, {"is_internal": False})
+
+
+def test_settings_write_with_stale_version(mock_conn):
+    row = editing.load_row(mock_conn, "settings", 1)
+    editing.update_row(mock_conn, row, {"language": "en"})
+
+    with database.UnitOfWork(mock_conn):
+        written = settings.update_language(mock_conn, "fr", 1, row.version)
+    assert not written
+    assert editing.load_row(mock_conn, "settings", 1).values["language"] == "en"  # noqa
+
+
+def test_menu_settings_change_language_conflict(mock_conn, capsys):
+    def someone_else_saves():
+        row = editing.load_row(mock_conn, "settings", 1)
+        editing.update_row(mock_conn, row, {"language": "en"})
+        return "fr"
+
+    menu = settings.MenuSettings()
+    with patch.object(settings, "pick_language", side_effect=someone_else_saves):  # noqa
+        menu.change_language(mock_conn, "jm")
+
+    assert editing.load_row(mock_conn, "settings", 1).values["language"] == "en"  # noqa
+    assert "changed by someone else" in capsys.readouterr().out
+
+
+# ######## two sessions #######################################################
+
+def test_two_sessions_on_one_file(tmp_path):
+    path = tmp_path / "Test_KG.db"
+    alice = database.open_company_database(path)
+    onboarding.add_employees(alice, "aa", [onboarding.NewEmployee(Name("Tom", "Test"))], max_workers=1)  # noqa
+    bob = database.open_company_database(path)
+
+    alice_row = editing.load_row(alice, "names", 1)
+    bob_row = editing.load_row(bob, "names", 1)
+    editing.update_row(bob, bob_row, {"nickname": "Tommy"})
+
+    with pytest.raises(editing.EditConflict) as e:
+        editing.update_row(alice, alice_row, {"nickname": "T"})
+    # alice sees bob's value and can edit on top of it
+    row = editing.update_row(alice, e.value.current, {"nickname": "T"})
+    assert row.version == 3
+    assert editing.load_row(bob, "names", 1).values["nickname"] == "T"
+
+    alice.close()
+    bob.close()
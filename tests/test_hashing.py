@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_hashing.py
+"""Tests for "hashing" and "config" modules."""
+
+import pytest
+
+from context import config
+from context import hashing
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "buha.ini"
+    monkeypatch.setenv("BUHA_CONFIG", str(path))
+    monkeypatch.delenv("BUHA_HASHING_PROFILE", raising=False)
+    config.load_config.cache_clear()
+    yield path
+    config.load_config.cache_clear()
+
+
+# ######## config #############################################################
+
+def test_config_defaults_without_file(config_file):
+    assert config.get_setting("hashing", "profile") == "default"
+
+
+def test_config_file_beats_defaults(config_file):
+    config_file.write_text("[hashing]\nprofile = fast\n")
+    assert config.get_setting("hashing", "profile") == "fast"
+
+
+def test_config_environment_beats_file(config_file, monkeypatch):
+    config_file.write_text("[hashing]\nprofile = fast\n")
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "strong")
+    assert config.get_setting("hashing", "profile") == "strong"
+
+
+# ######## hash params ########################################################
+
+def test_current_params(config_file, monkeypatch):
+    params = hashing.current_params()
+    assert params == hashing.HashParams("pbkdf2_sha256", 100000)
+
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    params = hashing.current_params()
+    assert params == hashing.HashParams("pbkdf2_sha256", 1000)
+
+
+def test_current_params_unknown_profile(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "cheapest")
+    with pytest.raises(ValueError):
+        hashing.current_params()
+
+
+def test_stored_params_legacy():
+    expected = hashing.HashParams("pbkdf2_sha256", 100000)
+    assert hashing.stored_params(None, None) == expected
+    assert hashing.stored_params("pbkdf2_sha256", 5) == hashing.HashParams("pbkdf2_sha256", 5)  # noqa
+
+
+def test_needs_rehash(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "default")
+    assert hashing.needs_rehash(hashing.HashParams("pbkdf2_sha256", 1000))
+    assert hashing.needs_rehash(hashing.HashParams("md5", 100000))
+    if hashing.needs_rehash(hashing.HashParams("pbkdf2_sha256", 100000)):
+        assert False
+
+
+def test_needs_rehash_keeps_stronger_hash(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    if hashing.needs_rehash(hashing.HashParams("pbkdf2_sha256", 100000)):
+        assert False
+    if hashing.needs_rehash(hashing.HashParams("pbkdf2_sha256", 600000)):
+        assert False
+
+
+# ######## hash and verify ####################################################
+
+def test_hash_password_uses_params():
+    params = hashing.HashParams("pbkdf2_sha256", 1000)
+    salt, password_hash = hashing.hash_password("asd", b"salt", params)
+    assert salt == b"salt"
+    assert hashing.verify_password("asd", salt, password_hash, params)
+    if hashing.verify_password("asdf", salt, password_hash, params):
+        assert False
+
+    other = hashing.HashParams("pbkdf2_sha256", 1001)
+    if hashing.verify_password("asd", salt, password_hash, other):
+        assert False
+
+
+def test_hash_password_unknown_algorithm():
+    params = hashing.HashParams("md5", 1)
+    with pytest.raises(ValueError):
+        hashing.hash_password("asd", b"salt", params)
+
+
+@pytest.mark.parametrize("params", [
+    hashing.HashParams("md5", 1),
+    hashing.HashParams("pbkdf2_sha256", 0),
+    hashing.HashParams("pbkdf2_sha256", "many"),
+])
+def test_verify_password_garbage_params(params):
+    if hashing.verify_password("asd", b"salt", b"hash", params):
+        assert False
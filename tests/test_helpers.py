@@ -11,7 +11,6 @@ from pathlib import Path
 from pyfakefs.fake_filesystem_unittest import Patcher
 from unittest.mock import Mock
 from unittest.mock import patch
-from unittest.mock import create_autospec
 
 from context import check_databases
 from context import check_for_matches
@@ -24,6 +23,7 @@ from context import initials_in_table
 from context import mk_initials
 from context import Menu
 from context import Name
+from context import Navigation
 from context import path_to_database
 from context import path_to_db_dir
 from context import pick_language
@@ -50,59 +50,41 @@ def no_clear_screen():
 
 def test_basic_menu_class_attributes():
     menu = Menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
-def test_basic_menu_class_menu_changed_True_attr():
-    menu = Menu()
-    Menu.last_caller_module = "main"
-    Menu.current_caller_module = "start"
-    assert menu.menu_changed()
+def test_basic_menu_class_own_navigation():
+    assert Menu().navigation is not Menu().navigation
 
 
-def test_basic_menu_class_menu_changed_True_modules():
-    menu = Menu()
-    Menu.last_caller_module = "start"
-    Menu.last_caller_module = "start"
-    Menu.navigation_stack = ["start", "settings"]
-    assert menu.menu_changed()
+def test_basic_menu_class_shared_navigation():
+    navigation = Navigation()
+    menu_1 = Menu(navigation)
+    menu_2 = Menu(navigation)
+    menu_1.change_menu("start")
+    menu_2.change_menu("settings")
+    assert navigation.stack == ["start", "settings"]
 
 
-def test_basic_menu_class_menu_changed_True_attr_False_modules():
+def test_basic_menu_class_menu_changed_True():
     menu = Menu()
-    Menu.last_caller_module = "start"
-    Menu.last_caller_module = "settings"
-    Menu.navigation_stack = ["settings", "settings"]
-    assert menu.menu_changed()
+    assert menu.menu_changed("start")
+    assert menu.menu_changed("settings")
 
 
 def test_basic_menu_class_menu_changed_False():
     menu = Menu()
-    Menu.last_caller_module = "person"
-    Menu.current_caller_module = "person"
-    Menu.navigation_stack = ["person", "person"]
-    if menu.menu_changed():
-        assert False
-
-
-def test_basic_menu_class_menu_changed_False_index_error():
-    menu = Menu()
-    Menu.last_caller_module = "person"
-    Menu.current_caller_module = "person"
-    Menu.navigation_stack = ["person"]
-    if menu.menu_changed():
+    menu.menu_changed("person")
+    if menu.menu_changed("person"):
         assert False
 
 
-def test_basic_menu_class_menu_changed_False_no_stack():
+def test_basic_menu_class_menu_changed_after_reset():
     menu = Menu()
-    Menu.last_caller_module = "person"
-    Menu.current_caller_module = "person"
-    Menu.navigation_stack = []
-    if menu.menu_changed():
-        assert False
+    menu.menu_changed("start")
+    menu.navigation.reset()
+    assert menu.menu_changed("start")
 
 
 def test_basic_menu_class_print_headline_clear_screen(mocker):
@@ -137,57 +119,45 @@ def test_basic_menu_class_print_headline_task_headline(mocker, capsys):
     os.system.assert_called_with("clear")
 
 
-def test_basic_menu_class_change_menu(mocker):
+def test_basic_menu_class_change_menu():
     menu = Menu()
-    Menu.navigation_stack = ["person"]
-    task = "names"
-    menu.change_menu(task)
-    assert Menu.navigation_stack == ["person", "names"]
-
-    with patch.object(helpers.Menu, "get_caller_module_name", return_value="names"):  # noqa
-        menu.change_menu(task)
-        assert Menu.current_caller_module == "names"
+    menu.change_menu("person")
+    menu.change_menu("names")
+    assert menu.navigation.stack == ["person", "names"]
+    assert menu.navigation.current == "names"
 
 
-def test_basic_menu_class_change_menu_no_change(mocker):
+def test_basic_menu_class_change_menu_no_change():
     menu = Menu()
-    Menu.navigation_stack = ["person"]
-    Menu.last_caller_module = "person"
-    task = "person"
-    menu.change_menu(task)
-    assert Menu.navigation_stack == ["person", "person"]
-
-    with patch.object(helpers.Menu, "get_caller_module_name", return_value="src.buha.scripts.helpers"):  # noqa
-        menu.change_menu(task)
-        assert Menu.current_caller_module != "src.buha.scripts.helpers"
+    menu.change_menu("person")
+    menu.change_menu("person")
+    assert menu.navigation.stack == ["person"]
 
 
 def test_basic_menu_class_go_back():
     menu = Menu()
-    Menu.last_caller_module = "start"
-    Menu.current_caller_module = "new entry"
-    Menu.navigation_stack = ["start", "new entry"]
-
-    with patch.object(helpers.Menu, "get_caller_module_name", return_value="start"):  # noqa
-        menu.go_back()
-        assert Menu.last_caller_module == "start"
-        assert len(Menu.navigation_stack) == 1
+    menu.change_menu("start")
+    menu.change_menu("new entry")
+    menu.go_back()
+    assert menu.navigation.stack == ["start"]
 
 
-def test_basic_menu_class_go_back_no_stack():
+def test_basic_menu_class_go_back_keeps_first_menu():
     menu = Menu()
-    Menu.last_caller_module = "start"
-    Menu.current_caller_module = "new entry"
-    Menu.navigation_stack = []
-
-    with patch.object(helpers.Menu, "get_caller_module_name", return_value="start"):  # noqa
-        menu.go_back()
-        assert Menu.last_caller_module == "start"
+    menu.go_back()
+    assert menu.navigation.stack == []
+    menu.change_menu("start")
+    menu.go_back()
+    assert menu.navigation.stack == ["start"]
 
 
-def test_basic_menu_class_get_caller_module_name_type_str():
+def test_basic_menu_class_no_frame_inspection():
     menu = Menu()
-    assert isinstance(menu.get_caller_module_name(), str)
+    with patch("inspect.stack") as mock_stack:
+        menu.change_menu("start")
+        menu.go_back()
+        menu.menu_changed("start")
+        mock_stack.assert_not_called()
 
 
 def test_basic_menu_class_display_menu_wo_headline(mocker, capsys):
@@ -250,7 +220,7 @@ def test_create_headline():
 # ######## mk initials ########################################################
 
 def test_mk_initials_not_in_table_length2(mock_conn):
-    with patch.object(helpers, "initials_in_table", return_value=False):
+    with patch.object(helpers, "initials_taken", return_value=set()):
         first_name = "Peter"
         last_name = "Pan"
         name = Name(first_name, last_name)
@@ -261,7 +231,7 @@ def test_mk_initials_not_in_table_length2(mock_conn):
 
 
 def test_mk_initials_not_in_table_length_modulo2(mock_conn):
-    with patch.object(helpers, "initials_in_table", return_value=False):
+    with patch.object(helpers, "initials_taken", return_value=set()):
         first_name = "Peter"
         last_name = "Pan"
         name = Name(first_name, last_name)
@@ -277,40 +247,44 @@ def test_mk_initials_in_table(mock_conn):
     name = Name(first_name, last_name)
     length = 2
 
-    def side_effect(module, func):
-        if mock_func.call_count == 0:
-            return True
-        return False
-
-    with patch.object(helpers, "initials_in_table") as mock_func:
-        mock_func.side_effect = side_effect
-        actual = mk_initials(mock_conn, name, length)
-        assert mock_func.call_count == 1
-
-        length = 3
+    with patch.object(helpers, "initials_taken", return_value={"pp"}) as mock_func:  # noqa
         actual = mk_initials(mock_conn, name, length)
         expected = "pep"
         assert actual == expected
-        assert mock_func.call_count == 2
+        mock_func.assert_called_once()
 
 
-def test_mk_initials_with_recursion(mock_conn):
-    first_name = "Peter"
-    last_name = "Pan"
-    name = Name(first_name, last_name)
+@pytest.mark.usefixtures("setup_db_persons")
+def test_mk_initials_several_lengths_in_one_query(mock_conn):
+    name = Name("Jon", "Outsider")
+    mock_conn.execute("""INSERT INTO persons (created_by, timestamp,
+                      first_name, last_name, initials)
+                      VALUES ('aa', 'today', 'Jon', 'Outshine', 'joo')""")
+    length = 2
+
+    actual = mk_initials(mock_conn, name, length)
+    expected = "joou"  # "jo" and "joo" are taken
+    assert actual == expected
+
+
+@pytest.mark.usefixtures("setup_db_persons")
+def test_mk_initials_all_candidates_taken(mock_conn):
+    name = Name("J", "O")  # "jo" is the only candidate and already taken
+    mock_conn.execute("""INSERT INTO persons (created_by, timestamp,
+                      first_name, last_name, initials)
+                      VALUES ('aa', 'today', 'J', 'O', 'jo2')""")
     length = 2
-    call_count = 0
 
-    def side_effect(*args):
-        nonlocal call_count
-        call_count += 1
-        return call_count == 1
+    actual = mk_initials(mock_conn, name, length)
+    expected = "jo3"
+    assert actual == expected
+
 
-    with patch("buha.scripts.helpers.initials_in_table", side_effect=side_effect) as mock_func:  # noqa
-        actual = mk_initials(mock_conn, name, length)
-        expected = "pep"  # Expecting length to increase to 3
-        assert actual == expected
-        assert mock_func.call_count == 2
+def test_initials_candidates():
+    name = Name("Peter", "Pan")
+    actual = helpers.initials_candidates(name, 2)
+    expected = ["pp", "pep", "pepa", "petpa", "petpan", "petepan", "peterpan"]
+    assert actual == expected
 
 
 # ######## initials in table ##################################################
@@ -321,29 +295,24 @@ def test_print_output():
     assert True
 
 
-def test_initials_in_table(mocker):
-    mock_cursor = create_autospec(sqlite3.Cursor)
-    mock_cursor.fetchall.return_value = [('jd',), ('js',)]
-
-    mock_conn = create_autospec(sqlite3.Connection)
-    mock_conn.cursor.return_value = mock_cursor
-
-    def execute_side_effect(query):
-        print(f"Executing query: {query}")
-        return mock_cursor
-
-    mock_cursor.execute.side_effect = execute_side_effect
-
-    in_table = initials_in_table(mock_conn, 'jd')
-    print(f"Test result for 'jd': {in_table}")
+@pytest.mark.usefixtures("setup_db_persons")
+def test_initials_in_table(mock_conn):
+    in_table = initials_in_table(mock_conn, 'jo')
     assert in_table
 
     in_table = initials_in_table(mock_conn, 'ab')
-    print(f"Test result for 'ab': {in_table}")
     if in_table:
         assert False
 
 
+@pytest.mark.usefixtures("setup_db_persons")
+def test_initials_taken(mock_conn):
+    candidates = ["ab", "jo", "tp", "xy"]
+    actual = helpers.initials_taken(mock_conn, candidates)
+    expected = {"jo", "tp"}
+    assert actual == expected
+
+
 # ######## state company ######################################################
 
 def test_state_company():
@@ -534,18 +503,13 @@ def test_check_if_internal_type_False():
 
 @pytest.mark.usefixtures("setup_db_persons")
 def test_show_table(mock_conn, capsys):
-    expected = """(1, 'aa', 'today', 'Jon', 'D.', 'Outsh', 'jo')
-(2, 'aa', 'today', 'Tom', 'D.', 'Pouch', 'tp')
-(3, 'aa', 'today', 'Bob', 'D.', 'Vouch', 'bv')
-(4, 'aa', 'today', 'Dob', 'D.', 'Grump', 'dg')
-(5, 'aa', 'today', 'Sam', 'D.', 'Bump', 'sb')
-(6, 'aa', 'today', 'Amy', 'D.', 'Hoot', 'ah')
-"""
+    expected = "| 1         | aa         | today     | Jon        | D.           | Outsh     | jo       |"  # noqa
 
-    with patch("builtins.input", return_value="y"):
+    with patch("os.system"), patch("builtins.input", return_value="q"):
         show_table(mock_conn, "persons")
         actual, err = capsys.readouterr()
-        assert actual == expected
+        assert expected in actual
+        assert "| Amy " in actual
 
 
 # ######## show my table persons ##############################################
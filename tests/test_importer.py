@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_importer.py
+"""Tests for "importer" module."""
+
+import io
+import json
+import pytest
+import sqlite3
+
+from context import database
+from context import ensure_schema
+from context import helpers
+from context import importer
+from context import login
+from context import mk_initials
+from context import Name
+from context import onboarding
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def csv_rows(text):
+    return importer.read_rows("persons.csv", io.StringIO(text))
+
+
+# ######## reading ############################################################
+
+def test_read_rows_csv():
+    rows = list(csv_rows("first_name,last_name\nTom,Test\nJon,Outsh\n"))
+    assert rows == [(2, {"first_name": "Tom", "last_name": "Test"}),
+                    (3, {"first_name": "Jon", "last_name": "Outsh"})]
+
+
+def test_read_rows_jsonl():
+    lines = io.StringIO('{"first_name": "Tom", "last_name": "Test"}\n'
+                        '\n'
+                        'no json\n')
+    rows = list(importer.read_rows("persons.jsonl", lines))
+    assert rows == [(1, {"first_name": "Tom", "last_name": "Test"}),
+                    (3, {})]
+
+
+def test_parse_record():
+    record = importer.parse_record(2, {"first_name": " Tom ",
+                                       "last_name": "Test",
+                                       "middle_names": "",
+                                       "language": "en",
+                                       "is_internal": "no"})
+
+    assert record.name == Name("Tom", "Test")
+    assert record.language == "en"
+    assert record.is_internal is False
+    assert record.password == importer.INITIAL_PASSWORD
+
+
+@pytest.mark.parametrize("row, reason", [
+    ({"first_name": "Tom"}, "first_name and last_name are required"),
+    ({}, "first_name and last_name are required"),
+    ({"first_name": "Tom", "last_name": "Test", "language": "xx"},
+     "unknown language 'xx'"),
+])
+def test_parse_record_invalid(row, reason):
+    with pytest.raises(importer.RecordError, match=reason):
+        importer.parse_record(2, row)
+
+
+# ######## initials ###########################################################
+
+def test_initials_pool_like_mk_initials(mock_conn):
+    onboarding.add_employees(mock_conn, "ab", [onboarding.NewEmployee(Name("Tom", "Test"))], max_workers=1)  # noqa
+    pool = importer.InitialsPool(mock_conn)
+
+    for name in (Name("Tom", "Tester"), Name("Anna", "Boss")):
+        assert pool.take(name) == mk_initials(mock_conn, name, 2)
+
+
+def test_initials_pool_numbers_doubles(mock_conn):
+    pool = importer.InitialsPool(mock_conn)
+    initials = [pool.take(Name("Al", "Bo")) for _ in range(5)]
+
+    assert initials == ["ab", "alb", "albo", "albo2", "albo3"]
+
+
+def test_initials_pool_reads_persons_once(mock_conn):
+    pool = importer.InitialsPool(mock_conn)
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    for _ in range(10):
+        pool.take(Name("Tom", "Test"))
+
+    assert statements == []
+
+
+# ######## import persons #####################################################
+
+def test_import_persons(mock_conn):
+    rows = csv_rows("first_name,last_name,language,password\n"
+                    "Tom,Test,en,secret\n"
+                    "Hans,Müller,,\n")
+
+    report = importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+
+    assert report.imported == 2
+    assert report.rejected == []
+    assert report.rows_per_second > 0
+    persons = mock_conn.execute("SELECT person_id, initials FROM persons ORDER BY person_id").fetchall()  # noqa
+    assert persons == [(1, "tt"), (2, "hm")]
+    names = mock_conn.execute("SELECT person_id, name_key FROM names ORDER BY name_id").fetchall()  # noqa
+    assert names == [(1, "tom||test"), (2, "hans||müller")]
+    blocks = mock_conn.execute("SELECT COUNT(*) FROM name_blocks WHERE name_id = 2").fetchone()  # noqa
+    assert blocks[0] > 0
+    credentials = login.load_credentials(mock_conn, "tt")
+    assert login.credentials_match(credentials, "secret")
+    row = mock_conn.execute("SELECT language FROM settings WHERE initials = 'hm'").fetchone()  # noqa
+    assert row == ("de",)
+
+
+def test_import_persons_rejects_duplicates(mock_conn):
+    onboarding.add_employees(mock_conn, "ab", [onboarding.NewEmployee(Name("Tom", "Test"))], max_workers=1)  # noqa
+    rows = csv_rows("first_name,last_name\n"
+                    "TOM,test\n"
+                    "Jon,Outsh\n"
+                    "jon,  outsh\n"
+                    "Jon,\n")
+
+    report = importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+
+    assert report.imported == 1
+    assert report.rejected == [(2, "name already exists"),
+                               (4, "name already exists"),
+                               (5, "first_name and last_name are required")]
+    assert mock_conn.execute("SELECT COUNT(*) FROM persons").fetchone() == (2,)  # noqa
+
+
+def test_import_persons_chunks(mock_conn):
+    rows = [(i, {"first_name": f"Tom{i}", "last_name": "Test"})
+            for i in range(1, 8)]
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    report = importer.import_persons(mock_conn, "ab", rows, chunk_size=3,
+                                     max_workers=1)
+    mock_conn.set_trace_callback(None)
+
+    assert report.imported == 7
+    assert statements.count("COMMIT") == 3
+    # one executemany per table and chunk, not one INSERT per person
+    inserts = [s for s in statements if s.lstrip().startswith("INSERT INTO persons")]  # noqa
+    assert len(inserts) == 7
+    ids = mock_conn.execute("SELECT p.person_id, n.name_id FROM persons AS p JOIN names AS n USING (person_id)").fetchall()  # noqa
+    assert ids == [(i, i) for i in range(1, 8)]
+
+
+def test_import_persons_after_menu_entries(mock_conn):
+    onboarding.add_employees(mock_conn, "ab", [onboarding.NewEmployee(Name("Anna", "Boss"))], max_workers=1)  # noqa
+    rows = [(2, {"first_name": "Tom", "last_name": "Test"})]
+
+    importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+
+    ids = mock_conn.execute("SELECT person_id, initials FROM persons ORDER BY person_id").fetchall()  # noqa
+    assert ids == [(1, "ab"), (2, "tt")]
+    row = mock_conn.execute("SELECT person_id FROM names WHERE first_name = 'Tom'").fetchone()  # noqa
+    assert row == (2,)
+
+
+def test_import_persons_failing_chunk_rolls_back(mock_conn, monkeypatch):
+    monkeypatch.setattr(importer, "settings_row", lambda *args: None)
+    rows = [(2, {"first_name": "Tom", "last_name": "Test"})]
+
+    with pytest.raises(Exception):
+        importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+    assert mock_conn.execute("SELECT COUNT(*) FROM persons").fetchone() == (0,)  # noqa
+
+
+def other_writer(monkeypatch, conn, chunk, statement):
+    """Run "statement" right before the transaction of chunk "chunk"."""
+    calls = []
+    real_hash = importer.hash_passwords
+
+    def hash_passwords(*args):
+        # hashing is the last step before BEGIN IMMEDIATE
+        calls.append(args)
+        if len(calls) == chunk:
+            with conn:
+                conn.execute(statement)
+        return real_hash(*args)
+
+    monkeypatch.setattr(importer, "hash_passwords", hash_passwords)
+
+
+def test_import_persons_sees_concurrent_writer(mock_conn, monkeypatch):
+    # another process adds "tt" after the pool was filled
+    other_writer(monkeypatch, mock_conn, 2, "INSERT INTO persons (first_name, last_name, initials) VALUES ('Tina', 'Tour', 'tt')")  # noqa
+    rows = [(2, {"first_name": "Anna", "last_name": "Boss"}),
+            (3, {"first_name": "Tom", "last_name": "Test"})]
+    report = importer.import_persons(mock_conn, "ab", rows, chunk_size=1,
+                                     max_workers=1)
+
+    assert (report.imported, report.rejected) == (2, [])
+    initials = mock_conn.execute("SELECT initials FROM persons WHERE first_name = 'Tom'").fetchone()  # noqa
+    assert initials == ("tot",)
+
+
+def test_import_persons_sees_concurrent_name(mock_conn, monkeypatch):
+    # another process adds "Tom Test" after it was checked
+    other_writer(monkeypatch, mock_conn, 1, "INSERT INTO names (first_name, last_name, name_key) VALUES ('Tom', 'Test', 'tom||test')")  # noqa
+    rows = [(2, {"first_name": "Tom", "last_name": "Test"}),
+            (3, {"first_name": "Anna", "last_name": "Boss"})]
+    report = importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+
+    assert (report.imported, report.rejected) == (1, [(2, "name already exists")])  # noqa
+    assert mock_conn.execute("SELECT COUNT(*) FROM names WHERE name_key = 'tom||test'").fetchone() == (1,)  # noqa
+
+
+def test_import_persons_checks_initials_of_chunk_only(mock_conn):
+    onboarding.add_employees(mock_conn, "ab", [onboarding.NewEmployee(Name("Anna", "Boss"))], max_workers=1)  # noqa
+    rows = [(i, {"first_name": f"Tom{i}", "last_name": "Test"})
+            for i in range(1, 5)]
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    importer.import_persons(mock_conn, "ab", rows, chunk_size=2,
+                            max_workers=1)
+    mock_conn.set_trace_callback(None)
+
+    queries = [s for s in statements if "SELECT initials FROM persons" in s]
+    assert len(queries) == 3
+    # read once, then one lookup by the index per chunk
+    assert "WHERE" not in queries[0]
+    assert all("WHERE initials IN" in query for query in queries[1:])
+
+
+def test_import_persons_name_free_after_rollback(mock_conn, monkeypatch):
+    calls = []
+    real_write = importer.write_chunk
+
+    def fails_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.IntegrityError("UNIQUE constraint failed")
+        return real_write(*args, **kwargs)
+
+    monkeypatch.setattr(importer, "write_chunk", fails_once)
+    rows = [(2, {"first_name": "Tom", "last_name": "Test"}),
+            (3, {"first_name": "Tom", "last_name": "Test"})]
+    report = importer.import_persons(mock_conn, "ab", rows, chunk_size=1,
+                                     max_workers=1)
+
+    assert report.imported == 1
+    assert report.rejected == [(2, "not written: UNIQUE constraint failed")]
+
+
+def test_import_persons_integrity_error_is_reported(mock_conn, monkeypatch):
+    def failing(*args, **kwargs):
+        raise sqlite3.IntegrityError("UNIQUE constraint failed")
+
+    monkeypatch.setattr(importer, "write_chunk", failing)
+    rows = [(2, {"first_name": "Tom", "last_name": "Test"})]
+    report = importer.import_persons(mock_conn, "ab", rows, max_workers=1)
+
+    assert report.imported == 0
+    assert report.rejected == [(2, "not written: UNIQUE constraint failed")]
+
+
+# ######## command line #######################################################
+
+def test_main_import(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(helpers, "path_to_db_dir", lambda: tmp_path)
+    monkeypatch.setenv("BUHA_PASSWORD", "asd")
+    conn = database.open_company_database(tmp_path / "Test_KG.db")
+    onboarding.add_employees(conn, "aa", [onboarding.NewEmployee(Name("Anna", "Boss"))], max_workers=1)  # noqa
+    conn.close()
+    staff = tmp_path / "staff.jsonl"
+    staff.write_text("\n".join(json.dumps(row) for row in [
+        {"first_name": "Tom", "last_name": "Test"},
+        {"first_name": "Anna", "last_name": "Boss"}]), encoding="utf-8")
+
+    exit_code = importer.main([str(staff), "--company", "Test KG",
+                               "--user", "ab", "--workers", "1"])
+
+    assert exit_code == 1
+    captured = capsys.readouterr()
+    assert "1 imported, 1 rejected" in captured.out
+    assert "line 2: name already exists" in captured.err
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_journal.py
+"""Tests for "journal" module."""
+
+import datetime
+import pytest
+import sqlite3
+
+from decimal import Decimal
+
+from context import database
+from context import ensure_schema
+from context import journal
+
+
+Entry = journal.JournalEntry
+Line = journal.Line
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    with database.UnitOfWork(conn):
+        journal.add_account(conn, "aa", "1200", "Bank", "asset")
+        journal.add_account(conn, "aa", "1600", "Kasse", "asset")
+        journal.add_account(conn, "aa", "8400", "Erlöse 19 %", "revenue")
+        journal.add_account(conn, "aa", "1776", "Umsatzsteuer 19 %", "liability")  # noqa
+        journal.add_period(conn, "2024", "2024-01-01", "2024-12-31")
+    yield conn
+    conn.close()
+
+
+def sale(entry_date="2024-03-01", gross=11900):
+    net = round(gross / 1.19)
+    return Entry(entry_date, [Line("1200", gross), Line("8400", -net),
+                              Line("1776", net - gross)], "Verkauf")
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+# ######## amounts ############################################################
+
+@pytest.mark.parametrize("amount, expected", [
+    ("1.234,56", 123456),
+    ("1234.56", 123456),
+    ("-0,5", -50),
+    (Decimal("12.30"), 1230),
+    (7, 7),
+    (-123456, -123456),
+])
+def test_cents(amount, expected):
+    assert journal.cents(amount) == expected
+
+
+@pytest.mark.parametrize("amount", ["1,234", "abc", "", True])
+def test_cents_invalid(amount):
+    with pytest.raises(ValueError):
+        journal.cents(amount)
+
+
+# ######## accounts and periods ###############################################
+
+def test_add_account_unknown_kind(mock_conn):
+    with pytest.raises(ValueError, match="unknown kind"):
+        journal.add_account(mock_conn, "aa", "0001", "X", "asset?")
+
+
+def test_add_account_number_unique(mock_conn):
+    with pytest.raises(sqlite3.IntegrityError):
+        journal.add_account(mock_conn, "aa", "1200", "Bank 2", "asset")
+
+
+def test_add_period_overlap(mock_conn):
+    with pytest.raises(ValueError, match="overlaps with period '2024'"):
+        journal.add_period(mock_conn, "Q4", "2024-10-01", "2025-03-31")
+
+
+def test_period_index(mock_conn):
+    journal.add_period(mock_conn, "2025", datetime.date(2025, 1, 1),
+                       datetime.date(2025, 12, 31))
+    periods = journal.PeriodIndex(mock_conn)
+
+    assert periods.period_of("2024-01-01") == 1
+    assert periods.period_of("2024-12-31") == 1
+    assert periods.period_of("2025-06-30") == 2
+    with pytest.raises(journal.PostingError, match="no open period"):
+        periods.period_of("2023-12-31")
+
+
+# ######## posting ############################################################
+
+def test_post_entry(mock_conn):
+    entry_id = journal.post_entry(mock_conn, "aa", sale())
+
+    assert entry_id == 1
+    lines = mock_conn.execute("SELECT entry_id, account_id, entry_date, amount FROM journal_lines").fetchall()  # noqa
+    assert lines == [(1, 1, "2024-03-01", 11900), (1, 3, "2024-03-01", -10000),  # noqa
+                     (1, 4, "2024-03-01", -1900)]
+    assert journal.verify_journal(mock_conn) == []
+    assert not mock_conn.in_transaction
+
+
+@pytest.mark.parametrize("entry, message", [
+    (Entry("2024-03-01", [Line("1200", 100), Line("8400", -99)]),
+     "off by 1 cents"),
+    (Entry("2024-03-01", [Line("1200", 100)]), "at least two lines"),
+    (Entry("2024-03-01", [Line("1200", 100), Line("9999", -100)]),
+     "unknown account '9999'"),
+    (Entry("2024-03-01", [Line("1200", 1.5), Line("8400", -1.5)]),
+     "amount must be cents"),
+    (Entry("2023-03-01", [Line("1200", 100), Line("8400", -100)]),
+     "no open period"),
+])
+def test_post_entry_rejected(mock_conn, entry, message):
+    with pytest.raises(journal.PostingError, match=message):
+        journal.post_entry(mock_conn, "aa", entry)
+    assert count(mock_conn, "journal_entries") == 0
+    assert count(mock_conn, "journal_lines") == 0
+
+
+def test_post_entries_chunks(mock_conn):
+    entries = [sale(f"2024-03-{day:02}") for day in range(1, 11)]
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    posted = journal.post_entries(mock_conn, "aa", entries, chunk_size=4)
+    mock_conn.set_trace_callback(None)
+
+    assert posted == 10
+    assert statements.count("COMMIT") == 3
+    assert [entry.entry_id for entry in entries] == list(range(1, 11))
+    assert count(mock_conn, "journal_lines") == 30
+
+
+def test_post_entries_bad_chunk_rolled_back(mock_conn):
+    entries = [sale(), sale(), Entry("2024-03-01", [Line("1200", 1), Line("1600", -2)])]  # noqa
+
+    with pytest.raises(journal.UnbalancedEntry):
+        journal.post_entries(mock_conn, "aa", entries, chunk_size=2)
+    # the first chunk is posted, the second is not
+    assert count(mock_conn, "journal_entries") == 2
+
+
+def test_invariant_checked_before_commit(mock_conn, monkeypatch):
+    # a bug in the Python check must not get an unbalanced entry through
+    monkeypatch.setattr(journal, "check_entry", lambda entry, accounts: None)
+    entry = Entry("2024-03-01", [Line("1200", 100), Line("8400", -99)])
+
+    with pytest.raises(journal.UnbalancedEntry, match="entry 1 is off by 1"):
+        journal.post_entry(mock_conn, "aa", entry)
+    assert count(mock_conn, "journal_lines") == 0
+
+
+def test_post_entries_appends_after_existing(mock_conn):
+    journal.post_entry(mock_conn, "aa", sale())
+    entry = sale()
+    journal.post_entry(mock_conn, "aa", entry)
+
+    assert entry.entry_id == 2
+    line_ids = [row[0] for row in mock_conn.execute("SELECT line_id FROM journal_lines")]  # noqa
+    assert line_ids == list(range(1, 7))
+
+
+def test_account_statement_uses_index(mock_conn):
+    plan = str(mock_conn.execute("EXPLAIN QUERY PLAN SELECT amount FROM journal_lines WHERE account_id = 1 AND entry_date BETWEEN '2024-01-01' AND '2024-03-31'").fetchall())  # noqa
+    assert "idx_journal_lines_account_date" in plan
+
+
+def test_verify_journal_finds_unbalanced(mock_conn):
+    journal.post_entry(mock_conn, "aa", sale())
+    mock_conn.execute("UPDATE journal_lines SET amount = 11901 WHERE line_id = 1")  # noqa
+
+    assert journal.verify_journal(mock_conn) == [(1, 1)]
+
+
+@pytest.mark.parametrize("value", ["2024-3-1", "2024-02-30", "01.03.2024"])
+def test_post_entry_invalid_date(mock_conn, value):
+    entry = sale(entry_date=value)
+    with pytest.raises(ValueError):
+        journal.post_entry(mock_conn, "aa", entry)
@@ -10,7 +10,8 @@ from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from context import add_settings
-from context import generate_table_settings
+from context import ensure_schema
+from context import hashing
 from context import helpers
 from context import LoginMenu
 from context import login
@@ -65,10 +66,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -79,7 +76,7 @@ def setup_db(mock_conn):
     person_id = 1
     initials = "fl"
 
-    generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
     mock_conn.commit()
 
@@ -104,9 +101,8 @@ def setup_db(mock_conn):
 
 def test_login_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## LoginMenu class ####################################################
@@ -114,10 +110,7 @@ def test_login_menu_reset(reset_parent_class_menu):
 def test_login_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu_login = LoginMenu()
-    if menu_login.last_caller_module == "login":
-        assert False
-    assert menu_login.current_caller_module == "src.buha.scripts.login"
-    assert menu_login.navigation_stack == ["login"]
+    assert menu_login.navigation.stack == ["login"]
 
 
 def test_login_menu_display_menu(mocker, capsys, display_with_change):
@@ -162,6 +155,7 @@ def test_login_menu_run_get_choice_to_go_back(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_login_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu_login = LoginMenu()
+    menu_login.navigation.shown = "login"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     expected_display = display_wo_change
@@ -194,75 +188,83 @@ def test_login_menu_run_choice_is_1(mock_conn):
 
 # ######## password ###########################################################
 
-@patch("builtins.input", return_value="y")
 def test_login_password_correct(mock_conn):
     created_by = "test_func"
     initials = "tt"
-    password = "mock_password"
+    password = "asd"
     language = "de"
     person_id = 1
 
-    settings.generate_table_settings(mock_conn)
-    cur = mock_conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
-    settings.add_settings(mock_conn, created_by, language, person_id, initials)
+    ensure_schema(mock_conn)
+    with patch("builtins.input", return_value="y"):
+        settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
+
+    assert login.password_correct(mock_conn, initials, password)
+    if login.password_correct(mock_conn, initials, "not correct"):
+        assert False
 
-    with patch.object(login, "hash_password", return_value=("mock_salt", "mock_password")) as mock_hash_password:  # noqa
-        with patch.object(settings, "generate_table_settings", return_value=None) as mock_generate_table_settings:  # noqa
-            login.password_correct(mock_conn, initials, password)
-            mock_hash_password.assert_called_once()
 
+def test_password_not_correct_no_settings(mock_conn):
+    initials = "test_initials"
+    password = "test_password"
+
+    ensure_schema(mock_conn)
+    if login.password_correct(mock_conn, initials, password):
+        assert False
 
-def test_password_not_correct_salt_is_None(mock_conn):
-    # written by ChatGPT
 
+def test_password_correct_one_query():
     initials = "test_initials"
     password = "test_password"
     fake_salt = b"fake_salt"
-    fake_hash = b"fake_hashed_password"
+    legacy = hashing.HashParams(hashing.ALGORITHM, hashing.LEGACY_ITERATIONS)
+    _, fake_hash = login.hash_password(password, fake_salt, legacy)
 
-    # Mock cursor and connection
     mock_cursor = MagicMock()
     mock_conn = MagicMock()
-
-    # Set up the cursor's behavior
     mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.execute.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (fake_salt, fake_hash, 1, None, None,
+                                         1)
 
-    # Test when both salt and password hash are present
-    mock_cursor.fetchone.side_effect = [(fake_salt,), (fake_hash,)]
-    with patch('sqlite3.connect', return_value=mock_conn):
-        assert login.password_correct(mock_conn, initials, password) == (fake_hash == login.hash_password(password, fake_salt)[1])  # noqa
+    assert login.password_correct(mock_conn, initials, password)
+    mock_cursor.execute.assert_called_once()
 
-    # Test when salt is not present
-    mock_cursor.fetchone.side_effect = [None, fake_hash]
-    with patch('sqlite3.connect', return_value=mock_conn):
-        assert not login.password_correct(mock_conn, initials, password)
 
+def test_load_credentials(mock_conn):
+    created_by = "test_func"
+    initials = "tt"
+    language = "de"
+    person_id = 1
 
-def test_password_not_correct_hashed_pw_is_None(mock_conn):
-    # written by ChatGPT
+    ensure_schema(mock_conn)
+    with patch("builtins.input", return_value="N"):
+        with patch.object(settings, "hash_password", return_value=(b"salt", b"hash")):  # noqa
+            settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
 
-    initials = "test_initials"
-    password = "test_password"
-    fake_salt = b"fake_salt"
-    fake_hash = b"fake_hashed_password"
+    credentials = login.load_credentials(mock_conn, initials)
+    params = hashing.current_params()
+    assert credentials == login.Credentials(b"salt", b"hash", False, params, 1)
 
-    # Mock cursor and connection
-    mock_cursor = MagicMock()
-    mock_conn = MagicMock()
+    assert login.load_credentials(mock_conn, "not_in_table") is None
 
-    # Set up the cursor's behavior
-    mock_conn.cursor.return_value = mock_cursor
 
-    # Test when both salt and password hash are present
-    mock_cursor.fetchone.side_effect = [(fake_salt,), (fake_hash,)]
-    with patch('sqlite3.connect', return_value=mock_conn):
-        assert login.password_correct(mock_conn, initials, password) == (fake_hash == login.hash_password(password, fake_salt)[1])  # noqa
+def test_load_credentials_uses_index(mock_conn):
+    ensure_schema(mock_conn)
+    query = "EXPLAIN QUERY PLAN SELECT salt, password_hash, is_internal FROM settings WHERE initials = 'tt'"  # noqa
+    plan = mock_conn.execute(query).fetchall()
+    assert "idx_settings_initials" in str(plan)
 
-    # Test when password hash is not present
-    mock_cursor.fetchone.side_effect = [fake_salt, None]
-    with patch('sqlite3.connect', return_value=mock_conn):
-        assert not login.password_correct(mock_conn, initials, password)
+
+def test_load_credentials_legacy_hash(mock_conn):
+    ensure_schema(mock_conn)
+    add_legacy = """INSERT INTO settings (initials, is_internal, salt,
+                    password_hash) VALUES ('tt', 1, x'00', x'01')"""
+    mock_conn.execute(add_legacy)
+
+    credentials = login.load_credentials(mock_conn, "tt")
+    expected = hashing.HashParams(hashing.ALGORITHM, hashing.LEGACY_ITERATIONS)
+    assert credentials.params == expected
 
 
 def test_password_hash(mock_conn):
@@ -282,7 +284,7 @@ def test_login_is_internal_True(mock_conn):
     language = "de"
     person_id = 1
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
     with patch("builtins.input", return_value="y"):
@@ -298,7 +300,7 @@ def test_login_is_internal_False(mock_conn):
     language = "de"
     person_id = 1
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
     with patch("builtins.input", return_value="N"):
@@ -316,7 +318,7 @@ def test_login_is_internal_no_entry(mock_conn):
     language = "de"
     person_id = 1
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
     with patch("builtins.input", return_value="y"):
@@ -330,146 +332,168 @@ def test_login_is_internal_no_entry(mock_conn):
         assert False
 
 
-# ######## initials ###########################################################
+# ######## login ##############################################################
 
-def test_login_initials_in_table(mock_conn):
+def add_employee(conn: sqlite3.Connection, internal: str) -> None:
     created_by = "test_func"
     length = 2
+    language = "de"
+    person_id = 1
+    initials = "tt"
 
     name = Name("test_fn", "test_ln")
-    initials = "tt"
 
+    ensure_schema(conn)
     menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
-
-    res = login.initials_in_table(mock_conn, initials)
-    assert res
+    menu.add_person_to_db(conn, created_by, name, length)
 
+    with patch("builtins.input", return_value=internal):
+        settings.add_settings(conn, created_by, language, person_id, initials)  # noqa
 
-def test_login_initials_not_in_table(mock_conn):
-    created_by = "test_func"
-    length = 2
 
-    name = Name("test_fn", "test_ln")
-    initials = "not_in_table"
+def test_login_login_employee_initials_not_in_table(mock_conn):
+    menu_login = LoginMenu()
+    language = "de"
+    company_name = "Test & Co."
 
-    menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
+    add_employee(mock_conn, "y")
 
-    res = login.initials_in_table(mock_conn, initials)
-    if res:
-        assert False
+    with patch("getpass.getpass") as mock_getpass:
+        with patch("buha.scripts.login.enter_initials", return_value="no no") as mock_enter_initials:  # noqa
+            res = menu_login.login_employee(mock_conn, language, company_name)
 
+            mock_enter_initials.assert_called_once()
+            mock_getpass.assert_not_called()
+            assert res == (False, None)
 
-# ######## login ##############################################################
 
-def test_login_login_employee_initials_not_in_table(mock_conn):
+def test_login_login_employee_initials_in_table_pw_correct(mock_conn):
     menu_login = LoginMenu()
-    created_by = "test_func"
-    length = 2
     language = "de"
     company_name = "Test & Co."
 
-    name = Name("test_fn", "test_ln")
+    add_employee(mock_conn, "y")
 
-    menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
+    with patch("getpass.getpass", return_value="asd"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-    with patch("builtins.input", return_value="no no"):
-        with patch("buha.scripts.login.enter_initials") as mock_enter_initials:
-            res = menu_login.login_employee(mock_conn, language, company_name)
+            assert res == (True, "tt")
+
+
+def test_login_login_employee_initials_in_table_pw_not_correct(mock_conn):
+    menu_login = LoginMenu()
+    language = "de"
+    company_name = "Test & Co."
+
+    add_employee(mock_conn, "y")
+
+    with patch("getpass.getpass", return_value="not correct"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-            mock_enter_initials.assert_called_once()
             assert res == (False, None)
 
 
-def test_login_login_employee_initials_in_table_pw_correct(mock_conn):
+def test_login_login_employee_is_not_internal(mock_conn):
     menu_login = LoginMenu()
-    created_by = "test_func"
-    length = 2
     language = "de"
     company_name = "Test & Co."
-    initials = "tt"
-    person_id = 1
 
-    name = Name("test_fn", "test_ln")
+    add_employee(mock_conn, "N")
 
-    menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
+    with patch("getpass.getpass", return_value="asd") as mock_getpass:
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-    settings.generate_table_settings(mock_conn)
-    cur = mock_conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
-    with patch("builtins.input", return_value="y"):
-        settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
+            mock_getpass.assert_not_called()
+            assert res == (False, None)
 
+
+def test_login_login_employee_one_round_trip(mock_conn):
+    menu_login = LoginMenu()
+    language = "de"
+    company_name = "Test & Co."
+
+    add_employee(mock_conn, "y")
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
     with patch("getpass.getpass", return_value="asd"):
-        with patch("buha.scripts.login.initials_in_table", return_value=True):
-            with patch("buha.scripts.login.enter_initials", return_value="tt"):
-                res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
+    mock_conn.set_trace_callback(None)
 
-                assert res == (True, "tt")
+    assert res == (True, "tt")
+    assert len(statements) == 1
 
 
-def test_login_login_employee_initials_in_table_pw_not_correct(mock_conn):
+def test_login_login_employee_rehash_outdated_hash(mock_conn, monkeypatch):
     menu_login = LoginMenu()
-    created_by = "test_func"
-    length = 2
     language = "de"
     company_name = "Test & Co."
-    initials = "tt"
-    person_id = 1
 
-    name = Name("test_fn", "test_ln")
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    add_employee(mock_conn, "y")
+    old_hash = login.load_credentials(mock_conn, "tt").password_hash
 
-    menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "default")
+    with patch("getpass.getpass", return_value="asd"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-    settings.generate_table_settings(mock_conn)
-    cur = mock_conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
-    with patch("builtins.input", return_value="y"):
-        settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
+    assert res == (True, "tt")
+    credentials = login.load_credentials(mock_conn, "tt")
+    assert credentials.params == hashing.current_params()
+    assert credentials.password_hash != old_hash
+    assert login.password_correct(mock_conn, "tt", "asd")
 
-    with patch("getpass.getpass", return_value="not correct"):
-        with patch("buha.scripts.login.initials_in_table", return_value=True):
-            with patch("buha.scripts.login.enter_initials", return_value="tt"):
-                res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-                if res == (True, "tt"):
-                    assert False
+def test_login_login_employee_no_rehash_current_hash(mock_conn):
+    menu_login = LoginMenu()
+    language = "de"
+    company_name = "Test & Co."
 
+    add_employee(mock_conn, "y")
 
-def test_login_login_employee_is_not_internal(mock_conn):
+    with patch("getpass.getpass", return_value="asd"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            with patch.object(login, "rehash_password") as mock_rehash:
+                menu_login.login_employee(mock_conn, language, company_name)  # noqa
+                mock_rehash.assert_not_called()
+
+
+def test_login_login_employee_strong_hash_not_downgraded(mock_conn, monkeypatch):  # noqa
     menu_login = LoginMenu()
-    created_by = "test_func"
-    length = 2
     language = "de"
     company_name = "Test & Co."
-    initials = "tt"
-    person_id = 1
 
-    name = Name("test_fn", "test_ln")
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "default")
+    add_employee(mock_conn, "y")
+    old_hash = login.load_credentials(mock_conn, "tt").password_hash
 
-    menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name, length)
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    with patch("getpass.getpass", return_value="asd"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-    settings.generate_table_settings(mock_conn)
-    cur = mock_conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
-    with patch("builtins.input", return_value="N"):
-        settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
+    assert res == (True, "tt")
+    credentials = login.load_credentials(mock_conn, "tt")
+    assert credentials.params == hashing.HashParams("pbkdf2_sha256", 100000)
+    assert credentials.password_hash == old_hash
 
-    with patch("getpass.getpass", return_value="not correct"):
-        with patch("buha.scripts.login.initials_in_table", return_value=True):
-            with patch("buha.scripts.login.enter_initials", return_value="tt"):
-                res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
 
-                if res == (True, "tt"):
-                    assert False
+def test_login_login_employee_unknown_algorithm(mock_conn):
+    menu_login = LoginMenu()
+    language = "de"
+    company_name = "Test & Co."
+
+    add_employee(mock_conn, "y")
+    with mock_conn:
+        mock_conn.execute("UPDATE settings SET hash_algorithm = 'rot13' WHERE initials = 'tt'")  # noqa
+
+    with patch("getpass.getpass", return_value="asd"):
+        with patch("buha.scripts.login.enter_initials", return_value="tt"):
+            res = menu_login.login_employee(mock_conn, language, company_name)  # noqa
+
+    assert res == (False, None)
@@ -8,13 +8,18 @@ import main
 import getpass
 from unittest.mock import patch, MagicMock
 
-from context import check_databases
+from main import check_databases
 from context import activate_database
 from context import clear_screen
 from context import state_company
 from context import setup_new_company
 
 
+def touch(db_dir, *filenames):
+    for filename in filenames:
+        (db_dir / filename).touch()
+
+
 # ######## initialize #########################################################
 
 def test_clear_screen(mocker):
@@ -32,17 +37,14 @@ def test_state_company():
         assert state_company(language) == 'Test_Inc..db'
 
 
-def test_check_databases_return_type():
+def test_check_databases_return_type(tmp_path, mocker):
+    mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
     assert type(check_databases()) == list
 
 
 def test_check_databases(tmp_path, mocker):
     mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-    mocker.patch("os.walk", return_value=[
-        (str(tmp_path),
-         [],
-         ["check_db.db"])
-    ])
+    touch(tmp_path, "check_db.db")
     expected = ["check_db.db"]
     actual = check_databases()
     assert actual == expected
@@ -50,11 +52,6 @@ def test_check_databases(tmp_path, mocker):
 
 def test_check_databases_empty(tmp_path, mocker):
     mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-    mocker.patch("os.walk", return_value=[
-        (str(tmp_path),
-         [],
-         [])
-    ])
     expected = []
     actual = check_databases()
     assert actual == expected
@@ -62,11 +59,7 @@ def test_check_databases_empty(tmp_path, mocker):
 
 def test_check_databases_other_than_db(tmp_path, mocker):
     mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-    mocker.patch("os.walk", return_value=[
-        (str(tmp_path),
-         [],
-         ["check_db.db", "__init__.py"])
-    ])
+    touch(tmp_path, "check_db.db", "__init__.py")
     expected = ["check_db.db"]
     actual = check_databases()
     assert actual == expected
@@ -74,11 +67,7 @@ def test_check_databases_other_than_db(tmp_path, mocker):
 
 def test_check_databases_more_than_one(tmp_path, mocker):
     mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-    mocker.patch("os.walk", return_value=[
-        (str(tmp_path),
-         [],
-         ["check_db_1.db", "check_db_2.db"])
-    ])
+    touch(tmp_path, "check_db_1.db", "check_db_2.db")
     expected = ["check_db_1.db", "check_db_2.db"]
     actual = check_databases()
     assert actual == expected
@@ -96,9 +85,7 @@ def test_connects_with_existing_db(tmp_path, mocker, monkeypatch, mock_conn):
     with patch.object(main, "activate_database", return_value=mock_conn) as mock_method:  # noqa
         monkeypatch.setattr("builtins.input", lambda _: "existing db")
         mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-        mocker.patch("os.walk", return_value=[
-            (str(tmp_path), [], ["existing_db.db"])
-        ])
+        touch(tmp_path, "existing_db.db")
         monkeypatch.setattr("os.system", lambda _: None)
         conn, language, company_name = main.initialize()
         assert company_name == "existing_db.db"
@@ -115,9 +102,6 @@ def test_setup_new_db(tmp_path, mocker, monkeypatch, mock_conn):
     with patch.object(main, "setup_new_company", return_value=(mock_conn, "de", "new_company.db")) as mock_method:  # noqa
         monkeypatch.setattr("builtins.input", lambda _: "new company")
         mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-        mocker.patch("os.walk", return_value=[
-            (str(tmp_path), [], [])
-        ])
         monkeypatch.setattr("os.system", lambda _: None)
         conn, language, company_name = main.initialize()
         assert company_name == "new_company.db"
@@ -130,9 +114,7 @@ def test_connect_with_best_match(tmp_path, mocker, monkeypatch, mock_conn):
     with patch.object(main, "activate_database", return_value=mock_conn) as mock_method:  # noqa
         monkeypatch.setattr("builtins.input", lambda _: "existing compa")
         mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-        mocker.patch("os.walk", return_value=[
-            (str(tmp_path), [], ["existing_company.db"])
-        ])
+        touch(tmp_path, "existing_company.db")
         monkeypatch.setattr("os.system", lambda _: None)
         conn, language, match = main.initialize()
         assert match == "existing_company.db"
@@ -140,14 +122,34 @@ def test_connect_with_best_match(tmp_path, mocker, monkeypatch, mock_conn):
         assert conn is mock_conn
 
 
+# exact match ignoring case: no fuzzy matching
+def test_connect_exact_match_no_fuzz(tmp_path, mocker, monkeypatch, mock_conn):  # noqa
+    with patch.object(main, "activate_database", return_value=mock_conn) as mock_method, \
+         patch.object(main, "check_for_matches") as mock_check:  # noqa
+        monkeypatch.setattr("builtins.input", lambda _: "Existing  DB")
+        mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
+        touch(tmp_path, "existing_db.db")
+        monkeypatch.setattr("os.system", lambda _: None)
+        conn, language, match = main.initialize()
+        mock_method.assert_called_once_with("existing_db.db")
+        mock_check.assert_not_called()
+
+
+def test_setup_new_company_registers(tmp_path, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda _: "test company")
+    monkeypatch.setattr("src.buha.scripts.helpers.path_to_db_dir", lambda: tmp_path)  # noqa
+    conn, language, company_name = setup_new_company("test_company.db", "de")  # noqa
+    conn.close()
+
+    assert "test_company.db" in (tmp_path / "catalog.json").read_text()
+
+
 # fork to check_for_matches if there is a database but the input does not match
 def test_check_for_matches(tmp_path, mocker, monkeypatch, mock_conn):
     with patch.object(main, "check_for_matches", return_value=None) as mock_method:  # noqa
         monkeypatch.setattr("builtins.input", lambda _: "different company")
         mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-        mocker.patch("os.walk", return_value=[
-            (str(tmp_path), [], ["existing_db.db"])
-        ])
+        touch(tmp_path, "existing_db.db")
         monkeypatch.setattr("os.system", lambda _: None)
         conn, language, match = main.initialize()
         mock_method.assert_called_once_with("different_company.db", ["existing_db.db"], "de")  # noqa
@@ -158,9 +160,7 @@ def test_existing_db_but_setup_new_db(tmp_path, mocker, monkeypatch, mock_conn):
     with patch.object(main, "setup_new_company", return_value=(mock_conn, "de", "different_company.db")) as mock_method:  # noqa
         monkeypatch.setattr("builtins.input", lambda _: "different company")
         mocker.patch("src.buha.scripts.helpers.path_to_db_dir", return_value=tmp_path)  # noqa
-        mocker.patch("os.walk", return_value=[
-            (str(tmp_path), [], ["existing_db.db"])
-        ])
+        touch(tmp_path, "existing_db.db")
         monkeypatch.setattr("os.system", lambda _: None)
         conn, language, match = main.initialize()
         # assert match is None
@@ -203,6 +203,17 @@ def test_activate_database(tmp_path, monkeypatch):
     conn.close()
 
 
+def test_activate_database_bootstraps_schema(tmp_path, monkeypatch):
+    company_name = "test_schema_db.db"
+    monkeypatch.setattr("src.buha.scripts.helpers.path_to_db_dir", lambda: tmp_path)  # noqa
+
+    conn = activate_database(company_name)
+    tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'contacts_fts_%' ORDER BY name").fetchall()  # noqa
+    assert tables == [("account_balances",), ("account_snapshots",), ("accounts",), ("bank_transactions",), ("company_settings",), ("contacts_fts",), ("journal_entries",), ("journal_lines",), ("name_blocks",), ("names",), ("open_items",), ("periods",), ("persons",), ("report_cache",), ("settings",)]  # noqa
+    assert conn.execute("PRAGMA user_version").fetchone()[0] > 0
+    conn.close()
+
+
 # ######## main ###############################################################
 
 
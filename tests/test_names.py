@@ -10,9 +10,12 @@ import sqlite3
 # from unittest.mock import Mock
 from unittest.mock import patch
 
+from context import ensure_schema
 from context import helpers
 from context import Menu
 from context import MenuName
+from context import Name
+from context import names
 
 
 @pytest.fixture
@@ -78,10 +81,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -89,9 +88,8 @@ def reset_parent_class_menu():
 
 def test_start_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## MenuName class #####################################################
@@ -106,10 +104,7 @@ def test_name_menu_reset_entries():
 def test_name_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu_name = MenuName()
-    if menu_name.last_caller_module == "names":
-        assert False
-    assert menu_name.current_caller_module == "src.buha.scripts.names"
-    assert menu_name.navigation_stack == ["names"]
+    assert menu_name.navigation.stack == ["names"]
 
 
 def test_name_menu_display_menu(mocker, capsys, display_with_change):
@@ -167,6 +162,7 @@ def test_name_menu_run_action_triggers_change_menu(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_name_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu = MenuName()
+    menu.navigation.shown = "names"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     created_by = "tester"
@@ -247,25 +243,6 @@ def test_name_generate_name_instance():
     assert name.last_name == "test_ln"
 
 
-# ######## generate table #####################################################
-
-def test_name_generate_table_names():
-    mock_conn = sqlite3.connect(":memory:")
-    menu = MenuName()
-
-    with mock_conn:
-        menu.generate_table_names(mock_conn)
-        cur = mock_conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='names'")  # noqa
-        assert cur.fetchone() is not None, "Table 'names' was not created"
-
-        cur.execute("PRAGMA table_info('names')")
-        columns = [row[1] for row in cur.fetchall()]
-        expected_columns = ['name_id', 'person_id', 'created_by', 'timestamp', 'first_name',  # noqa
-                            'middle_names', 'last_name', 'nickname', 'previous_name', 'suffix', 'salutation']  # noqa
-        assert columns == expected_columns, "Table schema for 'names' does not match expected schema"  # noqa
-
-
 # ######## add name to table ##################################################
 
 
@@ -287,7 +264,7 @@ def test_names_add_name_to_db(mock_db_connection):
     menu.entries["ln"] = "test_ln"
     name = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     cur = mock_db_connection.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='names'")  # noqa
     assert cur.fetchone() is not None, "Table 'names' was not created"
@@ -299,7 +276,8 @@ def test_names_add_name_to_db(mock_db_connection):
 
     columns = [str(row) if row is not None else None for row in rows[0]]
     expected_row = ['1', '11', 'test_func', timestamp, 'test_fn', None,
-                    'test_ln', None, None, None, None]
+                    'test_ln', None, None, None, None, 'test_fn||test_ln',
+                    '1', None]
     assert columns == expected_row
 
 
@@ -314,7 +292,7 @@ def test_names_name_already_in_db_wo_middlename(mock_db_connection):
     name_1 = menu.generate_name_instance()
     name_2 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
 
     assert isinstance(menu.name_already_in_db(mock_db_connection, name_2, language), bool)  # noqa
@@ -333,7 +311,7 @@ def test_names_name_already_in_db_with_one_middlename(mock_db_connection):
     menu.entries["mn"] = "test_mn"
     name_2 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
 
     if menu.name_already_in_db(mock_db_connection, name_2, language):
@@ -352,7 +330,7 @@ def test_names_name_already_in_db_with_same_middlenames(mock_db_connection):
     name_1 = menu.generate_name_instance()
     name_2 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
 
     assert menu.name_already_in_db(mock_db_connection, name_2, language)
@@ -376,7 +354,7 @@ def test_names_name_already_in_db_wo_middlename_and_several_names(mock_db_connec
     menu.entries["ln"] = "test_3_ln"
     name_3 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
     menu.add_name_to_db(mock_db_connection, created_by, name_2, person_id)
     menu.add_name_to_db(mock_db_connection, created_by, name_3, person_id)
@@ -402,7 +380,7 @@ def test_names_name_not_already_in_db_wo_middlename_and_several_names(mock_db_co
     menu.entries["ln"] = "test_3_ln"
     name_3 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
     menu.add_name_to_db(mock_db_connection, created_by, name_2, person_id)
 
@@ -428,7 +406,7 @@ def test_names_name_not_already_in_db_wo_middlename_and_several_names_and_same_f
     menu.entries["ln"] = "test_3_ln"
     name_3 = menu.generate_name_instance()
 
-    menu.generate_table_names(mock_db_connection)
+    ensure_schema(mock_db_connection)
     menu.add_name_to_db(mock_db_connection, created_by, name_1, person_id)
     menu.add_name_to_db(mock_db_connection, created_by, name_2, person_id)
 
@@ -436,12 +414,37 @@ def test_names_name_not_already_in_db_wo_middlename_and_several_names_and_same_f
         assert False
 
 
+def test_names_name_already_in_db_ignores_case_and_whitespace(mock_db_connection):  # noqa
+    language = "de"
+    name_1 = Name("Jon", "Outsh", middle_names="D.  Eric")
+    name_2 = Name(" JON", "outsh ", middle_names="d. eric")
+
+    menu = MenuName()
+    ensure_schema(mock_db_connection)
+    menu.add_name_to_db(mock_db_connection, "test_func", name_1, 1)
+
+    assert menu.name_already_in_db(mock_db_connection, name_2, language)
+
+
+def test_names_name_already_in_db_checks_all_rows(mock_db_connection):
+    language = "de"
+    name_1 = Name("Jon", "Outsh", middle_names="Adam")
+    name_2 = Name("Jon", "Outsh", middle_names="Bert")
+
+    menu = MenuName()
+    ensure_schema(mock_db_connection)
+    menu.add_name_to_db(mock_db_connection, "test_func", name_1, 1)
+    menu.add_name_to_db(mock_db_connection, "test_func", name_2, 2)
+
+    # the first row with the same first and last name is not the match
+    assert menu.name_already_in_db(mock_db_connection, name_2, language)
+    assert not menu.name_already_in_db(mock_db_connection, Name("Jon", "Outsh", middle_names="Carl"), language)  # noqa
+
+
 # ######## handle double entry ################################################
 
 @patch("builtins.input", return_value="test_foo")
 def test_names_handle_double_entry_true(mock_db_connection):
-    person_id = "11"
-    created_by = "test_func"
     language = "de"
 
     menu = MenuName()
@@ -451,14 +454,13 @@ def test_names_handle_double_entry_true(mock_db_connection):
 
     with patch.object(menu, "enter_middlenames", autospec=True) as mock_enter_middlenames:  # noqa
         with patch.object(menu, "name_already_in_db", return_value=True):
-            menu.handle_double_entry(mock_conn, created_by, name_1, person_id, language)  # noqa
+            actual = menu.handle_double_entry(mock_conn, name_1, language)  # noqa
             mock_enter_middlenames.assert_called_once()
+            assert actual is None
 
 
 @patch("builtins.input", return_value="test_foo")
 def test_names_handle_double_entry_false(mock_db_connection):
-    person_id = "11"
-    created_by = "test_func"
     language = "de"
 
     menu = MenuName()
@@ -469,15 +471,14 @@ def test_names_handle_double_entry_false(mock_db_connection):
     with patch.object(menu, "enter_middlenames", autospec=True) as mock_enter_middlenames:  # noqa
         with patch.object(menu, "name_already_in_db", return_value=False):
             with patch.object(menu, "add_name_to_db", autospec=True) as mock_add_name:  # noqa
-                menu.handle_double_entry(mock_conn, created_by, name_1, person_id, language)  # noqa
+                actual = menu.handle_double_entry(mock_conn, name_1, language)  # noqa
                 mock_enter_middlenames.assert_called_once()
-                mock_add_name.assert_called_once_with(mock_conn, created_by, name_1, person_id)  # noqa
+                mock_add_name.assert_not_called()
+                assert actual == name_1
 
 
 @patch("builtins.input", return_value="test_foo")
-def test_names_commit_name_to_db_but_double(mock_db_connection):
-    person_id = "11"
-    created_by = "test_func"
+def test_names_check_name_but_double(mock_db_connection):
     language = "de"
 
     menu = MenuName()
@@ -485,18 +486,15 @@ def test_names_commit_name_to_db_but_double(mock_db_connection):
     menu.entries["ln"] = "test_1_ln"
     name = menu.generate_name_instance()
 
-    with patch.object(menu, "generate_table_names", autospec=True) as mock_generate_table_names:  # noqa
-        with patch.object(menu, "name_already_in_db", return_value=True):
-            with patch.object(menu, "handle_double_entry", autospec=True) as mock_handle_double:  # noqa
-                menu.commit_name_to_db(mock_conn, created_by, name, person_id, language)  # noqa
-                mock_generate_table_names.assert_called_once()
-                mock_handle_double.assert_called_once_with(mock_conn, created_by, name, person_id, language)  # noqa
+    with patch.object(menu, "name_already_in_db", return_value=True), \
+            patch.object(menu, "handle_similar_names", return_value=name):
+        with patch.object(menu, "handle_double_entry", autospec=True) as mock_handle_double:  # noqa
+            menu.check_name(mock_conn, name, language)
+            mock_handle_double.assert_called_once_with(mock_conn, name, language)  # noqa
 
 
 @patch("builtins.input", return_value="test_foo")
-def test_names_commit_name_to_db_new_entry(mock_db_connection):
-    person_id = "11"
-    created_by = "test_func"
+def test_names_check_name_new_entry(mock_db_connection):
     language = "de"
 
     menu = MenuName()
@@ -504,14 +502,37 @@ def test_names_commit_name_to_db_new_entry(mock_db_connection):
     menu.entries["ln"] = "test_1_ln"
     name = menu.generate_name_instance()
 
-    with patch.object(menu, "generate_table_names", autospec=True) as mock_generate_table_names:  # noqa
-        with patch.object(menu, "name_already_in_db", return_value=False):
-            with patch.object(menu, "add_name_to_db", autospec=True) as mock_add_name:  # noqa
-                menu.commit_name_to_db(mock_conn, created_by, name, person_id, language)  # noqa
-                mock_generate_table_names.assert_called_once()
-                mock_add_name.assert_called_once_with(mock_conn, created_by, name, person_id)  # noqa
-                for key, value in menu.entries.items():
-                    assert value is None
+    with patch.object(menu, "name_already_in_db", return_value=False), \
+            patch.object(menu, "handle_similar_names", side_effect=lambda conn, name, language: name):  # noqa
+        with patch.object(menu, "add_name_to_db", autospec=True) as mock_add_name:  # noqa
+            actual = menu.check_name(mock_conn, name, language)
+            mock_add_name.assert_not_called()
+            assert actual == name
+
+
+# ######## similar names ####################################################
+
+def test_names_handle_similar_names_none(mock_conn):
+    ensure_schema(mock_conn)
+    menu = MenuName()
+
+    name = Name("Hans", "Mueller")
+    assert menu.handle_similar_names(mock_conn, name, "de") == name
+
+
+@pytest.mark.parametrize("choice, added", [("y", True), ("", False)])
+def test_names_handle_similar_names_ask(mock_conn, capsys, choice, added):
+    ensure_schema(mock_conn)
+    menu = MenuName()
+    names.insert_name(mock_conn, "test_func", "today", Name("Hans", "Müller"), 1)  # noqa
+
+    name = Name("Hans", "Mueller")
+    with patch("builtins.input", return_value=choice):
+        actual = menu.handle_similar_names(mock_conn, name, "de")
+
+    assert (actual == name) is added
+    out, _ = capsys.readouterr()
+    assert "Hans Müller (100%)" in out
 
 
 # ######## commit #############################################################
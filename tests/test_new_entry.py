@@ -8,6 +8,7 @@ import sqlite3
 
 from unittest.mock import patch
 
+from context import ensure_schema
 from context import helpers
 from context import Menu
 from context import NewEntry
@@ -70,10 +71,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -81,9 +78,8 @@ def reset_parent_class_menu():
 
 def test_new_entry_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## MenuName class #####################################################
@@ -91,10 +87,7 @@ def test_new_entry_menu_reset(reset_parent_class_menu):
 def test_new_entry_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu_newentry = NewEntry()
-    if menu_newentry.last_caller_module == "new entry":
-        assert False
-    assert menu_newentry.current_caller_module == "src.buha.scripts.new_entry"
-    assert menu_newentry.navigation_stack == ["new entry"]
+    assert menu_newentry.navigation.stack == ["new entry"]
 
 
 def test_new_entry_menu_display_menu(mocker, capsys, display_with_change):
@@ -142,6 +135,7 @@ def test_new_entry_menu_run_get_choice_to_go_back(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_new_entry_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu_newentry = NewEntry()
+    menu_newentry.navigation.shown = "new entry"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     created_by = "tester"
@@ -167,3 +161,55 @@ def test_new_entry_menu_run_choice_is_1(mock_conn):
         menu_newentry.run(mock_conn, created_by, company_name, language)
 
         assert mock_input.call_count == 5
+
+
+# ######## new account ########################################################
+
+@pytest.fixture
+def schema_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def test_new_entry_new_account(schema_conn):
+    menu = NewEntry()
+
+    with patch("builtins.input", side_effect=["", "1200", "Bank", "1"]):
+        account_id = menu.new_account(schema_conn, "aa", "Test_KG.db", "en")
+
+    row = schema_conn.execute("SELECT account_id, number, name, kind, created_by FROM accounts").fetchone()  # noqa
+    assert row == (account_id, "1200", "Bank", "asset", "aa")
+
+
+def test_new_entry_new_account_exists(schema_conn, capsys):
+    menu = NewEntry()
+
+    with patch("builtins.input", side_effect=["", "1200", "Bank", "1", "1200", "Bank 2", "1"]):  # noqa
+        menu.new_account(schema_conn, "aa", "Test_KG.db", "en")
+        assert menu.new_account(schema_conn, "aa", "Test_KG.db", "en") is None
+
+    assert "exists already" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("answers", [["", "", "Bank", "1"], ["", "1200", "Bank", "6"], ["3", "", ""]])  # noqa
+def test_new_entry_new_account_cancelled(schema_conn, answers):
+    menu = NewEntry()
+
+    with patch("builtins.input", side_effect=answers):
+        assert menu.new_account(schema_conn, "aa", "Test_KG.db", "en") is None
+    assert schema_conn.execute("SELECT COUNT(*) FROM accounts").fetchone() == (0,)  # noqa
+
+
+def test_new_entry_new_account_loads_chart(schema_conn, capsys):
+    menu = NewEntry()
+
+    with patch("builtins.input", side_effect=["2", "", "", "0001", "Test", "5"]):  # noqa
+        assert menu.new_account(schema_conn, "aa", "Test_KG.db", "en") is None  # noqa
+        menu.new_account(schema_conn, "aa", "Test_KG.db", "en")
+
+    assert "81 accounts of SKR04 added" in capsys.readouterr().out
+    names = dict(schema_conn.execute("SELECT number, name FROM accounts"))
+    assert names["1800"] == "Bank"
+    assert names["0001"] == "Test"
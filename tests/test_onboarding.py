@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_onboarding.py
+"""Tests for "onboarding" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import ensure_schema
+from context import hashing
+from context import login
+from context import Name
+from context import onboarding
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_hashes(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+# ######## hash passwords #####################################################
+
+def test_hash_passwords_process_pool():
+    params = hashing.current_params()
+    passwords = ["asd", "qwe", "yxc", "asd"]
+
+    hashes = onboarding.hash_passwords(passwords, params, max_workers=2)
+
+    assert len(hashes) == len(passwords)
+    for password, (salt, password_hash) in zip(passwords, hashes):
+        assert hashing.verify_password(password, salt, password_hash, params)
+    # same password, different salt
+    assert hashes[0] != hashes[3]
+
+
+def test_hash_passwords_single_password_no_pool():
+    params = hashing.current_params()
+
+    with patch.object(onboarding, "ProcessPoolExecutor") as mock_pool:
+        hashes = onboarding.hash_passwords(["asd"], params)
+        mock_pool.assert_not_called()
+        assert len(hashes) == 1
+
+
+# ######## add employees ######################################################
+
+def test_add_employees(mock_conn):
+    employees = [
+        onboarding.NewEmployee(Name("Peter", "Pan")),
+        onboarding.NewEmployee(Name("Paul", "Panther"), is_internal=False),
+        onboarding.NewEmployee(Name("Pia", "Pohl"), language="en",
+                               password="secret"),
+    ]
+
+    initials = onboarding.add_employees(mock_conn, "aa", employees,
+                                        max_workers=2)
+
+    assert initials == ["pp", "pap", "pip"]
+    rows = mock_conn.execute("SELECT person_id, initials FROM persons ORDER BY person_id").fetchall()  # noqa
+    assert rows == [(1, "pp"), (2, "pap"), (3, "pip")]
+    rows = mock_conn.execute("SELECT person_id, last_name FROM names").fetchall()  # noqa
+    assert rows == [(1, "Pan"), (2, "Panther"), (3, "Pohl")]
+
+    assert login.password_correct(mock_conn, "pp", "asd")
+    assert login.password_correct(mock_conn, "pip", "secret")
+    assert login.load_credentials(mock_conn, "pip").is_internal
+    if login.load_credentials(mock_conn, "pap").is_internal:
+        assert False
+
+
+def test_add_employees_one_transaction(mock_conn):
+    employees = [onboarding.NewEmployee(Name("Peter", "Pan")),
+                 onboarding.NewEmployee(Name("Paul", "Panther"))]
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    onboarding.add_employees(mock_conn, "aa", employees, max_workers=1)
+    mock_conn.set_trace_callback(None)
+
+    # the trigger of contacts_fts traces the INSERT INTO names once more
+    inserts = [s.split()[2] for s in statements if s.startswith("INSERT INTO")]  # noqa
+    assert inserts.count("persons") == 2
+    assert inserts.count("settings") == 2
+    assert "names" in inserts
+    assert statements.count("COMMIT") == 1
+    assert statements[-1] == "COMMIT"
+
+
+def test_add_employees_rollback_on_error(mock_conn):
+    employees = [onboarding.NewEmployee(Name("Peter", "Pan")),
+                 onboarding.NewEmployee(Name("Paul", None))]
+
+    with pytest.raises(Exception):
+        onboarding.add_employees(mock_conn, "aa", employees, max_workers=1)
+
+    assert mock_conn.execute("SELECT count(*) FROM persons").fetchone() == (0,)  # noqa
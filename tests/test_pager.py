@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_pager.py
+"""Tests for "pager" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import ensure_schema
+from context import pager
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    add_person = """INSERT INTO persons (
+                    created_by, timestamp, first_name, last_name, initials)
+                    VALUES (?, ?, ?, ?, ?)"""
+    conn.executemany(add_person, [("aa", "today", f"Tom{i}",
+                                   "Test" if i % 10 else "Outsh", f"t{i}")
+                                  for i in range(1, 26)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def first_names(page):
+    return [row[4] for row in page.rows]
+
+
+# ######## paging #############################################################
+
+def test_pager_first_page(mock_conn):
+    page = pager.Pager(mock_conn, "persons", page_size=10).first()
+
+    assert first_names(page) == [f"Tom{i}" for i in range(1, 11)]
+    assert not page.has_previous
+    assert page.has_next
+
+
+def test_pager_next_and_previous(mock_conn):
+    p = pager.Pager(mock_conn, "persons", page_size=10)
+    p.first()
+
+    p.next()
+    page = p.next()
+    assert first_names(page) == [f"Tom{i}" for i in range(21, 26)]
+    assert page.has_previous
+    assert not page.has_next
+    assert p.next() is page
+
+    page = p.previous()
+    assert first_names(page) == [f"Tom{i}" for i in range(11, 21)]
+    assert page.has_previous and page.has_next
+
+
+def test_pager_jump(mock_conn):
+    p = pager.Pager(mock_conn, "persons", page_size=10)
+
+    page = p.jump(18)
+    assert first_names(page) == [f"Tom{i}" for i in range(18, 26)]
+    assert page.has_previous
+    assert not page.has_next
+
+    page = p.jump(99)
+    assert first_names(page) == [f"Tom{i}" for i in range(16, 26)]
+
+
+def test_pager_filter(mock_conn):
+    p = pager.Pager(mock_conn, "persons", page_size=2)
+
+    page = p.filter_by("last_name", "outs")
+    assert first_names(page) == ["Tom10", "Tom20"]
+    assert not page.has_next
+
+    page = p.filter_by(None)
+    assert first_names(page) == ["Tom1", "Tom2"]
+
+
+def test_pager_filter_unknown_column(mock_conn):
+    p = pager.Pager(mock_conn, "persons")
+    with pytest.raises(ValueError, match="no column"):
+        p.filter_by("1; DROP TABLE persons", "x")
+
+
+def test_pager_unknown_table(mock_conn):
+    with pytest.raises(ValueError, match="no table"):
+        pager.Pager(mock_conn, "persons; DROP TABLE persons")
+
+
+def test_pager_reads_one_page(mock_conn):
+    p = pager.Pager(mock_conn, "persons", page_size=10)
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    p.first()
+    p.next()
+    mock_conn.set_trace_callback(None)
+
+    assert len(statements) == 2
+    assert all("LIMIT" in statement for statement in statements)
+
+
+def test_pager_composite_primary_key(mock_conn):
+    mock_conn.execute("""CREATE TABLE balances (
+                         account_id INTEGER, period_id INTEGER, debit INTEGER,
+                         PRIMARY KEY (account_id, period_id)) WITHOUT ROWID""")
+    # three periods per account: the first page ends inside account 2
+    mock_conn.executemany("INSERT INTO balances VALUES (?, ?, ?)",
+                          [(a, p, a * 10 + p)
+                           for a in range(1, 5) for p in range(1, 4)])
+    p = pager.Pager(mock_conn, "balances", page_size=5)
+    assert p.pk == ["account_id", "period_id"]
+
+    seen = [row[2:] for row in p.first().rows]
+    while p.page.has_next:
+        seen.extend(row[2:] for row in p.next().rows)
+    assert seen == [(a, p, a * 10 + p) for a in range(1, 5)
+                    for p in range(1, 4)]
+
+    page = p.previous()
+    assert [row[4] for row in page.rows] == [23, 31, 32, 33, 41]
+    page = p.jump(2)
+    assert [row[4] for row in page.rows] == [21, 22, 23, 31, 32]
+    assert page.has_previous and page.has_next
+
+
+# ######## rendering ##########################################################
+
+def test_render_page_hides_blobs(mock_conn):
+    page = pager.Page(["initials", "salt"], [("tt", b"\x00" * 16), ("ab", None)],  # noqa
+                      False, False)
+
+    rendered = pager.render_page(page)
+    assert "<16 bytes>" in rendered
+    assert rendered.splitlines()[1].startswith("| initials")
+
+
+def test_pager_run(mock_conn, capsys):
+    p = pager.Pager(mock_conn, "persons", page_size=10)
+
+    with patch("os.system"), patch("builtins.input", side_effect=["", "f nope x", "q"]):  # noqa
+        p.run("en")
+
+    out = capsys.readouterr().out
+    assert "| Tom11 " in out
+    assert "no column 'nope' in 'persons'" in out
+
+
+def test_pager_run_empty_table(mock_conn, capsys):
+    mock_conn.execute("DELETE FROM persons")
+
+    with patch("os.system"), patch("builtins.input", return_value="q"):
+        pager.Pager(mock_conn, "persons").run("en")
+
+    assert "No entries." in capsys.readouterr().out
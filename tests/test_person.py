@@ -9,6 +9,7 @@ import sqlite3
 
 from unittest.mock import patch
 
+from context import ensure_schema
 from context import helpers
 from context import Menu
 from context import MenuName
@@ -69,10 +70,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -83,7 +80,7 @@ def setup_db(mock_conn):
     menu_person = NewPerson()
     name = Name("test_fn", "test_ln")
 
-    menu_person.generate_table_persons(mock_conn)
+    ensure_schema(mock_conn)
     menu_person.add_person_to_db(mock_conn, created_by, name, length)
     mock_conn.commit()
 
@@ -108,9 +105,8 @@ def setup_db(mock_conn):
 
 def test_start_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## MenuName class #####################################################
@@ -118,10 +114,7 @@ def test_start_menu_reset(reset_parent_class_menu):
 def test_person_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu = NewPerson()
-    if menu.last_caller_module == "person":
-        assert False
-    assert menu.current_caller_module == "src.buha.scripts.person"
-    assert menu.navigation_stack == ["person"]
+    assert menu.navigation.stack == ["person"]
 
 
 def test_person_menu_display_menu(mocker, capsys, display_with_change):
@@ -169,6 +162,7 @@ def test_person_menu_run_get_choice_to_go_back(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_person_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu_person = NewPerson()
+    menu_person.navigation.shown = "person"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     created_by = "tester"
@@ -241,24 +235,6 @@ def test_person_menu_run_choice_is_4(mock_conn):
             mock_show_tables.assert_called_once()
 
 
-# ######## generate table #####################################################
-
-def test_person_generate_table_persons(mock_conn):
-    menu = NewPerson()
-
-    with mock_conn:
-        menu.generate_table_persons(mock_conn)
-        cur = mock_conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='persons'")  # noqa
-        assert cur.fetchone() is not None, "Table 'persons' was not created"
-
-        cur.execute("PRAGMA table_info('persons')")
-        columns = [row[1] for row in cur.fetchall()]
-        expected_columns = ['person_id', 'created_by', 'timestamp', 'first_name',  # noqa
-                            'middle_names', 'last_name', 'initials']  # noqa
-        assert columns == expected_columns, "Table schema for 'persons' does not match expected schema"  # noqa
-
-
 # ######## add person to table ################################################
 
 def test_person_add_person_to_db(mock_conn):
@@ -269,7 +245,7 @@ def test_person_add_person_to_db(mock_conn):
     name = Name("test_fn", "test_ln")
 
     menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='persons'")  # noqa
     assert cur.fetchone() is not None, "Table 'persons' was not created"
@@ -281,13 +257,13 @@ def test_person_add_person_to_db(mock_conn):
 
     columns = [str(row) if row is not None else None for row in rows[0]]
     expected_row = ['1', 'test_func', timestamp, 'test_fn', 'None',
-                    'test_ln', 'tt']
+                    'test_ln', 'tt', '1', None]
     assert columns == expected_row
 
 
-# ######## get person_id from table ###########################################
+# ######## person_id without a second query ##################################
 
-def test_person_get_person_id(mock_conn):
+def test_person_add_person_to_db_returns_id(mock_conn):
     created_by = "test_func"
     length = 2
 
@@ -295,17 +271,9 @@ def test_person_get_person_id(mock_conn):
     name_2 = Name("fn_test", "ln_test")
 
     menu = NewPerson()
-    menu.generate_table_persons(mock_conn)
-    menu.add_person_to_db(mock_conn, created_by, name_1, length)
-    menu.add_person_to_db(mock_conn, created_by, name_2, length)
-
-    expected_id = 1
-    actual_id = menu.get_person_id(mock_conn, "tt")
-    assert expected_id == actual_id
-
-    expected_id = 2
-    actual_id = menu.get_person_id(mock_conn, "fl")
-    assert expected_id == actual_id
+    ensure_schema(mock_conn)
+    assert menu.add_person_to_db(mock_conn, created_by, name_1, length) == (1, "tt")  # noqa
+    assert menu.add_person_to_db(mock_conn, created_by, name_2, length) == (2, "fl")  # noqa
 
 
 # ######## enter name #########################################################
@@ -330,10 +298,50 @@ def test_person_enter_name_fn_ln(mock_conn):
     name = Name(first_name="test_fn", last_name="test_ln")
     menu_person = NewPerson()
 
-    with patch.object(menu_person, "generate_table_persons", autospec=True) as mock_generate_table:  # noqa
-        with patch("buha.scripts.names.MenuName.run", return_value=name):
+    with patch.object(menu_person, "add_person_to_db", return_value=(1, "tt")) as mock_add_person:  # noqa
+        with patch("buha.scripts.names.MenuName.run", return_value=name), \
+                patch("buha.scripts.names.MenuName.check_name", return_value=name):  # noqa
             menu_person.enter_name(mock_conn, created_by, company_name, language)  # noqa
-            mock_generate_table.assert_called_once()
+            mock_add_person.assert_called_once()
+
+
+def test_person_enter_name_one_transaction(mock_conn, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda *args: "1")
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    ensure_schema(mock_conn)
+    name = Name(first_name="test_fn", last_name="test_ln")
+    menu_person = NewPerson()
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    with patch("buha.scripts.names.MenuName.run", return_value=name):
+        menu_person.enter_name(mock_conn, "test_func", "Test & Co.", "de")
+    mock_conn.set_trace_callback(None)
+
+    assert statements.count("BEGIN IMMEDIATE") == 1
+    assert statements.count("COMMIT") == 1
+    cur = mock_conn.cursor()
+    for table in ("persons", "names", "settings"):
+        cur.execute(f"SELECT person_id FROM {table}")
+        assert cur.fetchall() == [(1,)]
+
+
+def test_person_enter_name_rolls_back(mock_conn, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda *args: "1")
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    ensure_schema(mock_conn)
+    name = Name(first_name="test_fn", last_name="test_ln")
+    menu_person = NewPerson()
+
+    with patch("buha.scripts.names.MenuName.run", return_value=name):
+        with patch("buha.scripts.person.add_settings", side_effect=sqlite3.IntegrityError):  # noqa
+            with pytest.raises(sqlite3.IntegrityError):
+                menu_person.enter_name(mock_conn, "test_func", "Test & Co.", "de")  # noqa
+
+    cur = mock_conn.cursor()
+    for table in ("persons", "names", "settings"):
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        assert cur.fetchone() == (0,)
 
 
 # ######## show table #########################################################
@@ -342,15 +350,10 @@ def test_person_enter_name_fn_ln(mock_conn):
 @pytest.mark.usefixtures("setup_db_persons")
 def test_person_show_tables(mock_conn, capsys):
     menu_person = NewPerson()
-    expected = """(1, 'aa', 'today', 'Jon', 'D.', 'Outsh', 'jo')
-(2, 'aa', 'today', 'Tom', 'D.', 'Pouch', 'tp')
-(3, 'aa', 'today', 'Bob', 'D.', 'Vouch', 'bv')
-(4, 'aa', 'today', 'Dob', 'D.', 'Grump', 'dg')
-(5, 'aa', 'today', 'Sam', 'D.', 'Bump', 'sb')
-(6, 'aa', 'today', 'Amy', 'D.', 'Hoot', 'ah')
-"""
-
-    with patch("builtins.input", return_value="y"):
-        menu_person.show_tables(mock_conn, "persons")
+    expected = ["| Jon ", "| Outsh ", "| Amy ", "| Hoot "]
+
+    with patch("os.system"), patch("builtins.input", return_value="q"):
+        menu_person.show_tables(mock_conn, "persons", "en")
         actual, err = capsys.readouterr()
-        assert actual == expected
+        for cell in expected:
+            assert cell in actual
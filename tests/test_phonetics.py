@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_phonetics.py
+"""Tests for "phonetics" module."""
+
+import pytest
+
+from context import phonetics
+
+
+# ######## Kölner Phonetik ####################################################
+
+@pytest.mark.parametrize("word, expected", [
+    ("Müller-Lüdenscheidt", "65752682"),
+    ("Wikipedia", "3412"),
+    ("Breschnew", "17863"),
+    ("Müller", "657"),
+    ("Mueller", "657"),
+    ("Meier", "67"),
+    ("Mayer", "67"),
+    ("Schmidt", "862"),
+    ("Schmitt", "862"),
+    ("Christoph", "47823"),
+    ("Xaver", "4837"),
+    ("", ""),
+])
+def test_koelner_phonetik(word, expected):
+    assert phonetics.koelner_phonetik(word) == expected
+
+
+# ######## blocking keys ######################################################
+
+def test_transliterate():
+    assert phonetics.transliterate("Müller") == "mueller"
+    assert phonetics.transliterate("Großmann") == "grossmann"
+    assert phonetics.transliterate("Çelik") == "celik"
+
+
+def test_words():
+    assert phonetics.words("Müller-Lüdenscheidt") == ["mueller", "luedenscheidt"]  # noqa
+    assert phonetics.words(None) == []
+
+
+def test_trigrams_short_word():
+    assert phonetics.trigrams("li") == {"li"}
+
+
+def test_blocking_keys_umlaut_and_ue_shared():
+    assert phonetics.blocking_keys("Müller") == phonetics.blocking_keys("Mueller")  # noqa
+    assert "p:657" in phonetics.blocking_keys("Müller")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_reconcile.py
+"""Tests for "reconcile" module."""
+
+import pytest
+import sqlite3
+
+from context import bank_import
+from context import database
+from context import ensure_schema
+from context import reconcile
+
+
+BankLine = reconcile.BankLine
+OpenItem = reconcile.OpenItem
+Transaction = bank_import.Transaction
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_schema(conn)
+    with database.UnitOfWork(conn):
+        reconcile.add_open_item(conn, "aa", "RE-2024/17", "Müller GmbH", 11900, "2024-03-10")  # noqa
+        reconcile.add_open_item(conn, "aa", "RE-2024/18", "Schmidt OHG", 11900, "2024-03-12")  # noqa
+        reconcile.add_open_item(conn, "aa", "ER 55", "Telefon AG", -2380, "2024-03-01")  # noqa
+        reconcile.add_open_item(conn, "aa", "RE-2024/19", "Weber", 5000, "2024-06-01")  # noqa
+    transactions = [
+        (1, Transaction("DE02", "2024-03-11", 11900, counterparty="Schmidt OHG", purpose="Rechnung RE 2024 / 18")),  # noqa
+        (2, Transaction("DE02", "2024-03-08", 11900, counterparty="Mueller GmbH", purpose="RE-2024/17 danke")),  # noqa
+        (3, Transaction("DE02", "2024-03-04", -2380, counterparty="Telefon AG", purpose="Lastschrift")),  # noqa
+        (4, Transaction("DE02", "2024-03-20", 999, counterparty="Unbekannt")),  # noqa
+    ]
+    bank_import.import_transactions(conn, "aa", transactions, "csv")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Zahlung RE 2024/17", {"ZAHLUNGRE202417", "RE202417", "202417"}),
+    ("RE 2024 / 17", {"RE2024", "RE202417", "2024", "202417"}),
+    ("RE-2024/17", {"RE202417"}),
+    ("Miete März", set()),
+    (None, set()),
+    ("Nr 123", {"NR123"}),
+])
+def test_reference_keys(text, expected):
+    assert reconcile.reference_keys(text) == expected
+
+
+def test_squeeze():
+    assert reconcile.squeeze("re-2024/17 ") == "RE202417"
+
+
+def test_candidates_by_amount_and_date():
+    items = [OpenItem(1, None, None, 100, "2024-03-01"),
+             OpenItem(2, None, None, 100, "2024-05-01"),
+             OpenItem(3, None, None, 200, "2024-03-01")]
+    index = reconcile.ItemIndex(items)
+    line = BankLine(1, "2024-03-20", 100, None, None)
+    assert [item.item_id for item in index.candidates(line, set())] == [1]
+    assert index.candidates(line, set(), window=10) == []
+
+
+def test_candidates_by_reference():
+    items = [OpenItem(1, "RE-17", None, 100, "2023-01-01"),
+             OpenItem(2, "RE-2024-17", None, 100, "2023-01-01")]
+    index = reconcile.ItemIndex(items)
+    line = BankLine(1, "2024-03-20", 90, None, "Re 2024-17 minus Skonto")
+    keys = reconcile.reference_keys(line.purpose)
+    # "RE-17" is too short a reference to be indexed
+    assert [item.item_id for item in index.candidates(line, keys)] == [2]
+
+
+def test_reconcile(mock_conn):
+    matches = reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31")
+    assert [(m.txn_id, m.item_id) for m in matches] == [(1, 2), (2, 1), (3, 3)]  # noqa
+    assert matches[0].score == 100
+    assert matches[2].score == 60
+
+
+def test_reconcile_same_amount_goes_to_best_item(mock_conn):
+    # both invoices are 119 EUR, the reference decides
+    matches = reconcile.reconcile(mock_conn, "2024-03-08", "2024-03-08")
+    assert [(m.txn_id, m.item_id) for m in matches] == [(2, 1)]
+
+
+def test_reconcile_threshold(mock_conn):
+    matches = reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31",
+                                  threshold=81)
+    assert [m.txn_id for m in matches] == [1, 2]
+
+
+def test_accept_matches(mock_conn):
+    matches = reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31")
+    assert reconcile.accept_matches(mock_conn, matches, "aa") == 3
+    rows = mock_conn.execute("SELECT item_id, txn_id, matched_by FROM open_items ORDER BY item_id").fetchall()  # noqa
+    assert rows == [(1, 2, "aa"), (2, 1, "aa"), (3, 3, "aa"), (4, None, None)]  # noqa
+
+    # matched transactions and items are not proposed again
+    assert reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31") == []
+    assert [item.item_id for item in reconcile.open_items(mock_conn)] == [4]
+
+
+def test_accept_matches_matched_meanwhile(mock_conn):
+    matches = reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31")
+    reconcile.accept_matches(mock_conn, matches[:1], "bb")
+    stale = [reconcile.Match(1, 4, 60)] + matches
+    assert reconcile.accept_matches(mock_conn, stale, "aa") == 2
+    assert mock_conn.execute("SELECT matched_by FROM open_items WHERE item_id = 2").fetchone() == ("bb",)  # noqa
+
+
+def test_reconcile_scores_only_candidates(mock_conn, monkeypatch):
+    scored = []
+    score = reconcile.score
+
+    def counting(line, keys, item, index, fuzz):
+        scored.append((line.txn_id, item.item_id))
+        return score(line, keys, item, index, fuzz)
+
+    monkeypatch.setattr(reconcile, "score", counting)
+    reconcile.reconcile(mock_conn, "2024-03-01", "2024-03-31")
+    # 4 lines and 4 items, but not 16 pairs
+    assert sorted(scored) == [(1, 1), (1, 2), (2, 1), (2, 2), (3, 3)]
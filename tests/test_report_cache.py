@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_report_cache.py
+"""Tests for "report_cache" module."""
+
+import pytest
+import sqlite3
+from unittest.mock import patch
+
+from context import journal
+from context import report_cache
+from context import reports
+from context import schema
+from test_reports import fill
+
+
+Entry = journal.JournalEntry
+Line = journal.Line
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    fill(conn)
+    yield conn
+    conn.close()
+
+
+def rent(entry_date):
+    return Entry(entry_date, [Line("4210", 1000), Line("1200", -1000)])
+
+
+def computed(conn, report, start, end):
+    """True if run_report() computed the report instead of loading it."""
+    with patch.object(report_cache, "trial_balance",
+                      wraps=reports.trial_balance) as trial, \
+         patch.object(report_cache, "profit_and_loss",
+                      wraps=reports.profit_and_loss) as pnl:
+        report_cache.run_report(conn, report, start, end)
+    return trial.called or pnl.called
+
+
+def test_watermark(mock_conn):
+    assert report_cache.watermark(mock_conn, "2024-01-01", "2024-01-31") == 2  # noqa
+    assert report_cache.watermark(mock_conn, "2024-01-20", "2024-02-10") == 4  # noqa
+    assert report_cache.watermark(mock_conn, "2025-01-01", "2025-12-31") == 0  # noqa
+
+
+def test_cached_report_is_the_same(mock_conn):
+    first = report_cache.run_report(mock_conn, "trial-balance", "2024-01-01",
+                                    "2024-02-29")
+    second = report_cache.run_report(mock_conn, "trial-balance", "2024-01-01",
+                                     "2024-02-29")
+    assert second == first == reports.trial_balance(mock_conn, "2024-01-01",
+                                                    "2024-02-29")
+
+
+def test_second_run_is_one_lookup(mock_conn):
+    report_cache.run_report(mock_conn, "pnl", "2024-01-01", "2024-02-29")
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    report_cache.run_report(mock_conn, "pnl", "2024-01-01", "2024-02-29")
+    mock_conn.set_trace_callback(None)
+    assert len(statements) == 2
+    assert not [s for s in statements if "journal_lines" in s
+                or "account_balances" in s]
+
+
+def test_posting_invalidates_the_period_only(mock_conn):
+    assert computed(mock_conn, "pnl", "2024-01-01", "2024-01-31")
+    assert computed(mock_conn, "pnl", "2024-02-01", "2024-02-29")
+    journal.post_entries(mock_conn, "aa", [rent("2024-02-15")])
+    assert not computed(mock_conn, "pnl", "2024-01-01", "2024-01-31")
+    assert computed(mock_conn, "pnl", "2024-02-01", "2024-02-29")
+    report = report_cache.run_report(mock_conn, "pnl", "2024-02-01",
+                                     "2024-02-29")
+    assert report.totals[1] == ("", "Aufwendungen", 81000)
+
+
+def test_parameters_are_part_of_the_key(mock_conn):
+    de = report_cache.run_report(mock_conn, "pnl", "2024-01-01", "2024-02-29")
+    en = report_cache.run_report(mock_conn, "pnl", "2024-01-01", "2024-02-29",
+                                 "en")
+    assert de.title != en.title
+    assert computed(mock_conn, "trial-balance", "2024-01-01", "2024-02-29")
+    rows = mock_conn.execute("SELECT COUNT(*) FROM report_cache").fetchone()
+    assert rows == (3,)
+
+
+def test_balance_sheet_ignores_start(mock_conn):
+    report_cache.run_report(mock_conn, "balance-sheet", "2024-01-01",
+                            "2024-02-29")
+    report_cache.run_report(mock_conn, "balance-sheet", "2024-02-01",
+                            "2024-02-29")
+    rows = mock_conn.execute("SELECT COUNT(*) FROM report_cache").fetchone()
+    assert rows == (1,)
+
+
+def test_without_cache(mock_conn):
+    report_cache.run_report(mock_conn, "pnl", "2024-01-01", "2024-02-29",
+                            use_cache=False)
+    rows = mock_conn.execute("SELECT COUNT(*) FROM report_cache").fetchone()
+    assert rows == (0,)
+    with pytest.raises(ValueError):
+        report_cache.run_report(mock_conn, "cash-flow", "2024-01-01",
+                                "2024-02-29")
+
+
+def test_migration_fills_last_entry_ids(mock_conn):
+    with mock_conn:
+        mock_conn.execute("UPDATE periods SET last_entry_id = 0")
+    schema.create_report_cache(mock_conn.cursor())
+    last = mock_conn.execute("SELECT last_entry_id FROM periods ORDER BY period_id").fetchall()  # noqa
+    assert last == [(2,), (4,)]
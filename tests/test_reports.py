@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_reports.py
+"""Tests for "reports" module."""
+
+import pytest
+import sqlite3
+
+from context import balances
+from context import database
+from context import ensure_schema
+from context import journal
+from context import reports
+
+
+Entry = journal.JournalEntry
+Line = journal.Line
+
+
+def fill(conn):
+    ensure_schema(conn)
+    with database.UnitOfWork(conn):
+        journal.add_account(conn, "aa", "0800", "Gezeichnetes Kapital", "equity")  # noqa
+        journal.add_account(conn, "aa", "1200", "Bank", "asset")
+        journal.add_account(conn, "aa", "1776", "Umsatzsteuer 19 %", "liability")  # noqa
+        journal.add_account(conn, "aa", "4210", "Miete", "expense")
+        journal.add_account(conn, "aa", "8400", "Erlöse 19 %", "revenue")
+        journal.add_period(conn, "2024-01", "2024-01-01", "2024-01-31")
+        journal.add_period(conn, "2024-02", "2024-02-01", "2024-02-29")
+    journal.post_entries(conn, "aa", [
+        Entry("2024-01-02", [Line("1200", 2500000), Line("0800", -2500000)]),
+        Entry("2024-01-15", [Line("1200", 11900), Line("8400", -10000),
+                             Line("1776", -1900)]),
+        Entry("2024-02-01", [Line("4210", 80000), Line("1200", -80000)]),
+        Entry("2024-02-20", [Line("1200", 23800), Line("8400", -20000),
+                             Line("1776", -3800)]),
+    ])
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    fill(conn)
+    yield conn
+    conn.close()
+
+
+def test_account_totals_from_balances(mock_conn):
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    totals = reports.account_totals(mock_conn, "2024-01-01", "2024-02-29")
+    mock_conn.set_trace_callback(None)
+    assert not [s for s in statements if "journal_lines" in s]
+    assert [(b.number, b.debit, b.credit) for b in totals] == [
+        ("0800", 0, 2500000),
+        ("1200", 2535700, 80000),
+        ("1776", 0, 5700),
+        ("4210", 80000, 0),
+        ("8400", 0, 30000),
+    ]
+
+
+def test_account_totals_from_journal(mock_conn):
+    totals = reports.account_totals(mock_conn, "2024-01-10", "2024-02-10")
+    assert [(b.number, b.debit, b.credit) for b in totals] == [
+        ("1200", 11900, 80000),
+        ("1776", 0, 1900),
+        ("4210", 80000, 0),
+        ("8400", 0, 10000),
+    ]
+
+
+def test_account_totals_agree(mock_conn):
+    for start, end in [("2024-01-01", "2024-01-31"), (reports.FIRST_DAY, "2024-02-29")]:  # noqa
+        assert reports.totals_from_journal(mock_conn, start, end) == reports.totals_from_balances(mock_conn, start, end)  # noqa
+
+
+def test_account_totals_process_pool(tmp_path):
+    conn = database.connect(tmp_path / "test.db")
+    fill(conn)
+    serial = reports.account_totals(conn, "2024-01-10", "2024-02-25")
+    parallel = reports.account_totals(conn, "2024-01-10", "2024-02-25",
+                                      max_workers=2)
+    assert parallel == serial
+    conn.close()
+
+
+def test_trial_balance(mock_conn):
+    report = reports.trial_balance(mock_conn, "2024-01-01", "2024-01-31", "en")  # noqa
+    assert report.title == "Trial balance 2024-01-01 - 2024-01-31"
+    assert report.columns == ["Account", "Name", "Debit", "Credit", "Balance"]
+    assert report.rows[1] == ("1200", "Bank", 2511900, 0, 2511900)
+    assert report.totals == [("", "Total", 2511900, 2511900, 0)]
+
+
+def test_profit_and_loss(mock_conn):
+    report = reports.profit_and_loss(mock_conn, "2024-01-01", "2024-02-29")
+    assert report.rows == [("8400", "Erlöse 19 %", 30000),
+                           ("4210", "Miete", 80000)]
+    assert report.totals == [("", "Erträge", 30000),
+                             ("", "Aufwendungen", 80000),
+                             ("", "Ergebnis", -50000)]
+
+
+def test_balance_sheet(mock_conn):
+    report = reports.balance_sheet(mock_conn, "2024-02-29", "en")
+    assert report.rows == [
+        ("Assets", "1200", "Bank", 2455700),
+        ("Equity and liabilities", "0800", "Gezeichnetes Kapital", 2500000),
+        ("Equity and liabilities", "1776", "Umsatzsteuer 19 %", 5700),
+    ]
+    result, assets, sources = report.totals
+    assert result[3] == -50000
+    assert assets[3] == sources[3] == 2455700
+
+
+def test_balance_sheet_within_period(mock_conn):
+    report = reports.balance_sheet(mock_conn, "2024-02-10", "en")
+    result, assets, sources = report.totals
+    assert assets[3] == sources[3] == 2511900 - 80000
+
+
+@pytest.mark.parametrize("cents, language, expected", [
+    (123456, "de", "1.234,56"),
+    (123456, "en", "1,234.56"),
+    (-5, "de", "-0,05"),
+    (0, "en", "0.00"),
+])
+def test_format_cents(cents, language, expected):
+    assert reports.format_cents(cents, language) == expected
+
+
+def test_render_report(mock_conn):
+    report = reports.profit_and_loss(mock_conn, "2024-01-01", "2024-02-29")
+    text = reports.render_report(report, "de")
+    assert text.startswith("Gewinn- und Verlustrechnung 2024-01-01 - 2024-02-29")  # noqa
+    assert "|  800,00 |" in text
+    assert "| -500,00 |" in text
+
+
+def test_write_csv(mock_conn, tmp_path):
+    report = reports.trial_balance(mock_conn, "2024-01-01", "2024-01-31")
+    path = tmp_path / "trial.csv"
+    reports.write_csv(report, path)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "Konto;Bezeichnung;Soll;Haben;Saldo"
+    assert lines[2] == "1200;Bank;2511900;0;2511900"
+    assert lines[-1] == ";Summe;2511900;2511900;0"
+    assert len(lines) == 6
+
+
+def test_trial_balance_matches_running_balances(mock_conn):
+    report = reports.trial_balance(mock_conn, "2024-02-01", "2024-02-29")
+    period = balances.period_balances(mock_conn, 2)
+    assert [row[:4] for row in report.rows] == [
+        (b.number, b.name, b.debit, b.credit) for b in period]
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_schema.py
+"""Tests for "schema" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import ensure_schema
+from context import Name
+from context import NewPerson
+from context import schema
+from context import settings
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info('{table}')")]
+
+
+# ######## ensure schema ######################################################
+
+def test_ensure_schema_sets_user_version(mock_conn):
+    assert schema.schema_version(mock_conn) == 0
+    ensure_schema(mock_conn)
+    assert schema.schema_version(mock_conn) == schema.SCHEMA_VERSION
+
+
+def test_ensure_schema_no_ddl_when_up_to_date(mock_conn):
+    ensure_schema(mock_conn)
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    ensure_schema(mock_conn)
+    mock_conn.set_trace_callback(None)
+
+    assert statements == ["PRAGMA user_version"]
+
+
+def test_ensure_schema_rollback_on_error(mock_conn):
+    def broken_migration(cur):
+        raise sqlite3.OperationalError("broken")
+
+    with patch.object(schema, "migrations", schema.migrations + [broken_migration]):  # noqa
+        with patch.object(schema, "SCHEMA_VERSION", schema.SCHEMA_VERSION + 1):  # noqa
+            with pytest.raises(sqlite3.OperationalError):
+                ensure_schema(mock_conn)
+
+    assert schema.schema_version(mock_conn) == 0
+    tables = mock_conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()  # noqa
+    assert tables == []
+
+
+def test_ensure_schema_migrates_unversioned_database(mock_conn):
+    old_settings = """CREATE TABLE settings (
+                      settings_id INTEGER PRIMARY KEY,
+                      person_id INTEGER,
+                      created_by TEXT,
+                      timestamp TEXT,
+                      language TEXT,
+                      initials TEXT,
+                      is_internal BOOL,
+                      salt BLOB NOT NULL,
+                      password_hash BLOB NOT NULL
+                      )"""
+    mock_conn.execute(old_settings)
+    mock_conn.execute("""INSERT INTO settings (initials, salt, password_hash)
+                         VALUES ('tt', x'00', x'01')""")
+    mock_conn.commit()
+
+    ensure_schema(mock_conn)
+
+    assert table_columns(mock_conn, "settings")[-4:-2] == ['hash_algorithm', 'hash_iterations']  # noqa
+    row = mock_conn.execute("SELECT initials, hash_algorithm FROM settings").fetchone()  # noqa
+    assert row == ("tt", None)
+
+
+def test_ensure_schema_backfills_name_keys(mock_conn):
+    schema.create_basic_tables(mock_conn.cursor())
+    mock_conn.execute("""INSERT INTO names (
+                         first_name, middle_names, last_name)
+                         VALUES (' Jon ', NULL, 'OUTSH')""")
+    mock_conn.commit()
+
+    ensure_schema(mock_conn)
+
+    row = mock_conn.execute("SELECT name_key FROM names").fetchone()
+    assert row == ("jon||outsh",)
+    plan = mock_conn.execute("EXPLAIN QUERY PLAN SELECT 1 FROM names WHERE name_key = 'jon||outsh'").fetchall()  # noqa
+    assert "idx_names_name_key" in str(plan)
+
+
+def test_ensure_schema_versions_existing_rows(mock_conn):
+    schema.create_basic_tables(mock_conn.cursor())
+    mock_conn.execute("""INSERT INTO persons (first_name, last_name, initials)
+                         VALUES ('Tom', 'Test', 'tt')""")
+    mock_conn.commit()
+
+    ensure_schema(mock_conn)
+
+    row = mock_conn.execute("SELECT version, updated_at FROM persons").fetchone()  # noqa
+    assert row == (1, None)
+
+
+# ######## tables #############################################################
+
+def test_schema_table_persons(mock_conn):
+    ensure_schema(mock_conn)
+    expected_columns = ['person_id', 'created_by', 'timestamp', 'first_name',
+                        'middle_names', 'last_name', 'initials', 'version',
+                        'updated_at']
+    assert table_columns(mock_conn, "persons") == expected_columns
+
+
+def test_schema_table_names(mock_conn):
+    ensure_schema(mock_conn)
+    expected_columns = ['name_id', 'person_id', 'created_by', 'timestamp',
+                        'first_name', 'middle_names', 'last_name', 'nickname',
+                        'previous_name', 'suffix', 'salutation', 'name_key',
+                        'version', 'updated_at']
+    assert table_columns(mock_conn, "names") == expected_columns
+
+
+def test_schema_table_settings(mock_conn):
+    ensure_schema(mock_conn)
+    expected_columns = ['settings_id', 'person_id', 'created_by',
+                        'timestamp', 'language', 'initials', 'is_internal',
+                        'salt', 'password_hash', 'hash_algorithm',
+                        'hash_iterations', 'version', 'updated_at']
+    assert table_columns(mock_conn, "settings") == expected_columns
+
+
+def test_schema_unique_initials(mock_conn):
+    ensure_schema(mock_conn)
+
+    add_person = """INSERT INTO persons (first_name, last_name, initials)
+                    VALUES ('Tom', 'Test', 'tt')"""
+    mock_conn.execute(add_person)
+    with pytest.raises(sqlite3.IntegrityError):
+        mock_conn.execute(add_person)
+
+    plan = mock_conn.execute("EXPLAIN QUERY PLAN SELECT 1 FROM persons WHERE initials = 'tt'").fetchall()  # noqa
+    assert "idx_persons_initials" in str(plan)
+
+
+# ######## no DDL on writes ###################################################
+
+def test_writes_without_ddl(mock_conn):
+    ensure_schema(mock_conn)
+
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+    menu = NewPerson()
+    menu.add_person_to_db(mock_conn, "aa", Name("Tom", "Test"), 2)
+    with patch.object(settings, "check_if_internal", return_value=True):
+        settings.add_settings(mock_conn, "aa", "de", 1, "tt")
+    settings.update_language(mock_conn, "en", 1)
+    mock_conn.set_trace_callback(None)
+
+    assert not [s for s in statements if "CREATE" in s or "ALTER" in s]
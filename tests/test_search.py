@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_search.py
+"""Tests for "search" module."""
+
+import pytest
+import sqlite3
+
+from unittest.mock import patch
+
+from context import ensure_schema
+from context import MenuStart
+from context import Name
+from context import onboarding
+from context import schema
+from context import search
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+
+
+@pytest.fixture
+def mock_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("PRAGMA foreign_keys = ON")
+    ensure_schema(conn)
+    employees = [onboarding.NewEmployee(Name("Jonas", "Müller")),
+                 onboarding.NewEmployee(Name("René", "Lovič",
+                                             nickname="Rocky")),
+                 onboarding.NewEmployee(Name("Anna", "Jonsson",
+                                             middle_names="Maria"))]
+    onboarding.add_employees(conn, "aa", employees, max_workers=1)
+    yield conn
+    conn.close()
+
+
+def last_names(contacts):
+    return [contact.last_name for contact in contacts]
+
+
+# ######## query ##############################################################
+
+@pytest.mark.parametrize("text, expected", [
+    ("jo mül", '"jo"* "mül"*'),
+    ('a"b OR', '"a"* "b"* "OR"*'),
+    ("  ", None),
+    ("*-()", None),
+])
+def test_fts_query(text, expected):
+    assert search.fts_query(text) == expected
+
+
+# ######## search contacts ####################################################
+
+@pytest.mark.parametrize("text, expected", [
+    ("müller", ["Müller"]),
+    ("muller", ["Müller"]),
+    ("MÜL", ["Müller"]),
+    ("rene lovic", ["Lovič"]),
+    ("rocky", ["Lovič"]),
+    ("maria", ["Jonsson"]),
+    ("jm", ["Müller"]),
+    ("xyz", []),
+])
+def test_search_contacts(mock_conn, text, expected):
+    assert last_names(search.search_contacts(mock_conn, text)) == expected
+
+
+def test_search_contacts_prefix_matches_all(mock_conn):
+    contacts = search.search_contacts(mock_conn, "jon")
+    assert sorted(last_names(contacts)) == ["Jonsson", "Müller"]
+
+
+def test_search_contacts_best_first(mock_conn):
+    contacts = search.search_contacts(mock_conn, "jonas")
+    assert last_names(contacts) == ["Müller"]
+
+    # same score for both, then by last name
+    contacts = search.search_contacts(mock_conn, "jon")
+    assert last_names(contacts) == ["Jonsson", "Müller"]
+
+
+@pytest.mark.parametrize("tokens, expected", [
+    (["muller"], 3),
+    (["mul"], 2),
+    (["ro"], 1),
+    (["rene", "ro"], 4),
+])
+def test_score(tokens, expected):
+    contact = search.Contact(1, 1, "rm", "René", None, "Müller", "Rocky")
+    assert search.score(contact, tokens) == expected
+
+
+def test_search_contacts_limit(mock_conn):
+    assert len(search.search_contacts(mock_conn, "jon", limit=1)) == 1
+
+
+def test_search_contacts_candidates_by_rank(mock_conn):
+    # more matches than candidates, the best one added last
+    employees = [onboarding.NewEmployee(Name(
+        "Anna", "Mayerhofer", middle_names=f"Berta Clara Dora Emma {i}"))
+        for i in range(10)] + [onboarding.NewEmployee(Name("Max", "Mayer"))]
+    onboarding.add_employees(mock_conn, "aa", employees, max_workers=1)
+
+    contacts = search.search_contacts(mock_conn, "mayer", candidates=3)
+    assert last_names(contacts)[0] == "Mayer"
+
+
+def test_search_contacts_returns_initials(mock_conn):
+    contact = search.search_contacts(mock_conn, "lovic")[0]
+    assert contact.initials == "rl"
+    assert contact.nickname == "Rocky"
+
+
+# ######## index kept in step by triggers #####################################
+
+def test_index_follows_name_update(mock_conn):
+    mock_conn.execute("UPDATE names SET last_name = 'Meier' WHERE last_name = 'Müller'")  # noqa
+
+    assert search.search_contacts(mock_conn, "müller") == []
+    assert last_names(search.search_contacts(mock_conn, "meier")) == ["Meier"]
+
+
+def test_index_follows_delete(mock_conn):
+    mock_conn.execute("DELETE FROM persons WHERE initials = 'jm'")
+
+    assert search.search_contacts(mock_conn, "müller") == []
+
+
+def test_index_follows_initials(mock_conn):
+    mock_conn.execute("UPDATE persons SET initials = 'jomu' WHERE initials = 'jm'")  # noqa
+
+    assert last_names(search.search_contacts(mock_conn, "jomu")) == ["Müller"]
+    assert search.search_contacts(mock_conn, "jm") == []
+
+
+def test_index_filled_for_older_databases():
+    conn = sqlite3.connect(":memory:")
+    for migration in schema.migrations[:5]:
+        migration(conn.cursor())
+    conn.execute("INSERT INTO persons (person_id, first_name, last_name, initials) VALUES (1, 'Tom', 'Test', 'tt')")  # noqa
+    conn.execute("INSERT INTO names (person_id, first_name, last_name) VALUES (1, 'Tom', 'Test')")  # noqa
+    conn.execute("PRAGMA user_version = 5")
+    ensure_schema(conn)
+
+    contact = search.search_contacts(conn, "test")[0]
+    assert (contact.first_name, contact.initials) == ("Tom", "tt")
+
+
+def test_search_uses_fts_index(mock_conn):
+    plan = str(mock_conn.execute("EXPLAIN QUERY PLAN SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'mu*'").fetchall())  # noqa
+    assert "VIRTUAL TABLE INDEX" in plan
+
+
+# ######## incremental search #################################################
+
+def test_incremental_search_cache(mock_conn):
+    incremental = search.IncrementalSearch(mock_conn)
+    statements = []
+    mock_conn.set_trace_callback(statements.append)
+
+    first = incremental.update("mül")
+    assert incremental.update("mül ") is first
+    incremental.update("müll")
+    assert incremental.update("mül") is first
+    mock_conn.set_trace_callback(None)
+
+    assert len([s for s in statements if "MATCH" in s]) == 2
+
+
+def test_incremental_search_cache_size(mock_conn):
+    incremental = search.IncrementalSearch(mock_conn, cache_size=2)
+    for text in ("j", "jo", "jon"):
+        incremental.update(text)
+
+    assert list(incremental.cache) == ['"jo"*', '"jon"*']
+
+
+# ######## dialog #############################################################
+
+def test_search_dialog_by_line(mock_conn, capsys):
+    with patch("os.system"), patch("builtins.input", side_effect=["mül", "nobody", ""]):  # noqa
+        search.search_dialog(mock_conn, "en")
+
+    out = capsys.readouterr().out
+    assert "| Jonas " in out
+    assert "No matches." in out
+
+
+def test_menu_start_search_entry(mock_conn):
+    menu = MenuStart()
+
+    with patch.object(search, "search_dialog") as mock_dialog:
+        menu.search_entry(mock_conn, "aa", "Test KG", "en")
+        mock_dialog.assert_called_once_with(mock_conn, "en")
+
+
+def test_menu_start_run_search_entry(mock_conn):
+    menu = MenuStart()
+
+    with patch("buha.scripts.start.choose_option", side_effect=["3", "9"]), \
+            patch.object(search, "search_dialog") as mock_dialog, \
+            patch("os.system"):
+        menu.run(mock_conn, "aa", "Test KG", "en")
+    mock_dialog.assert_called_once()
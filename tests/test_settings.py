@@ -10,8 +10,9 @@ import sqlite3
 from unittest.mock import patch
 
 from context import add_settings
-from context import generate_table_settings
+from context import ensure_schema
 from context import helpers
+from context import login
 from context import Menu
 from context import MenuSettings
 from context import settings
@@ -66,10 +67,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -80,7 +77,7 @@ def setup_db(mock_conn):
     person_id = 1
     initials = "fl"
 
-    generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
     mock_conn.commit()
 
@@ -105,9 +102,8 @@ def setup_db(mock_conn):
 
 def test_settings_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## MenuSettings class #################################################
@@ -115,10 +111,7 @@ def test_settings_menu_reset(reset_parent_class_menu):
 def test_settings_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu_settings = MenuSettings()
-    if menu_settings.last_caller_module == "settings":
-        assert False
-    assert menu_settings.current_caller_module == "src.buha.scripts.settings"
-    assert menu_settings.navigation_stack == ["settings"]
+    assert menu_settings.navigation.stack == ["settings"]
 
 
 def test_settings_menu_display_menu(mocker, capsys, display_with_change):
@@ -166,6 +159,7 @@ def test_settings_menu_run_get_choice_to_go_back(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_settings_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu_settings = MenuSettings()
+    menu_settings.navigation.shown = "settings"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     created_by = "tester"
@@ -204,6 +198,7 @@ def test_settings_menu_run_choice_is_2(mock_conn):
     menu_settings = MenuSettings()
 
     choose_option_side_effect = ["2", "9"]
+    ensure_schema(mock_conn)
 
     with patch("buha.scripts.settings.choose_option", side_effect=choose_option_side_effect):  # noqa
         with patch.object(menu_settings, "change_password", return_value=None) as mock_change_password:  # noqa
@@ -229,24 +224,6 @@ def test_settings_menu_run_choice_is_3(mock_conn, capsys):
                 mock_show_settings.assert_called_once()
 
 
-# ######## generate table #####################################################
-
-def test_settings_generate_table_settings(mock_conn):
-
-    with mock_conn:
-        settings.generate_table_settings(mock_conn)
-        cur = mock_conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
-        assert cur.fetchone() is not None, "Table 'settings' was not created"
-
-        cur.execute("PRAGMA table_info('settings')")
-        columns = [row[1] for row in cur.fetchall()]
-        expected_columns = ['settings_id', 'person_id', 'created_by',
-                            'timestamp', 'language', 'initials', 'is_internal',
-                            'salt', 'password_hash']  # noqa
-        assert columns == expected_columns, "Table schema for 'settings' does not match expected schema"  # noqa
-
-
 # ######## add settings to table ##############################################
 
 def test_settings_add_settings(mock_conn):
@@ -255,7 +232,7 @@ def test_settings_add_settings(mock_conn):
     person_id = 1
     initials = "tt"
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
     assert cur.fetchone() is not None, "Table 'settings' was not created"
@@ -270,7 +247,7 @@ def test_settings_add_settings(mock_conn):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
     columns = [str(row) if row is not None else None for row in rows[0]]
-    expected_row = ['1', '1', 'test_func', timestamp, 'de', 'tt', 'y', 'mocked_salt', 'mocked_hash']  # noqa
+    expected_row = ['1', '1', 'test_func', timestamp, 'de', 'tt', 'y', 'mocked_salt', 'mocked_hash', 'pbkdf2_sha256', '100000', '1', None]  # noqa
     assert columns == expected_row
 
 
@@ -282,6 +259,7 @@ def test_settings_change_language(mock_conn):
     language = "de"
     menu_settings = MenuSettings()
     choose_option_side_effect = ["1", "9"]
+    ensure_schema(mock_conn)
 
     with patch("buha.scripts.settings.choose_option", side_effect=choose_option_side_effect):  # noqa
         with patch.object(settings, "get_person_id", return_value=1) as mock_get_person_id:  # noqa
@@ -301,7 +279,7 @@ def test_settings_update_language(mock_conn):
     person_id = 1
     initials = "tt"
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
 
@@ -314,7 +292,7 @@ def test_settings_update_language(mock_conn):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
         columns = [str(row) if row is not None else None for row in rows[0]]
-        expected_row = ['1', '1', 'test_func', timestamp, 'de', 'tt', 'y', 'mocked_salt', 'mocked_hash']  # noqa
+        expected_row = ['1', '1', 'test_func', timestamp, 'de', 'tt', 'y', 'mocked_salt', 'mocked_hash', 'pbkdf2_sha256', '100000', '1', None]  # noqa
         assert columns == expected_row
 
     new_language = "test_language"
@@ -327,8 +305,9 @@ def test_settings_update_language(mock_conn):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
         columns = [str(row) if row is not None else None for row in rows[0]]
-        expected_row = ['1', '1', 'test_func', timestamp, 'test_language', 'tt', 'y', 'mocked_salt', 'mocked_hash']  # noqa
-        assert columns == expected_row
+        expected_row = ['1', '1', 'test_func', timestamp, 'test_language', 'tt', 'y', 'mocked_salt', 'mocked_hash', 'pbkdf2_sha256', '100000', '2']  # noqa
+        assert columns[:-1] == expected_row
+        assert columns[-1] is not None  # updated_at
 
 
 # ######## update password ####################################################
@@ -337,17 +316,15 @@ def test_settings_update_password(mock_conn):
     initials = "tt"
     password = "password"
 
-    settings.generate_table_settings(mock_conn)
+    ensure_schema(mock_conn)
     cur = mock_conn.cursor()
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'")  # noqa
 
     with patch.object(settings, "get_person_id", return_value=1) as mock_get_person_id:  # noqa
-        with patch.object(settings, "generate_table_settings", return_value=None) as mock_generate_table_settings:  # noqa
-            with patch.object(settings, "hash_password", return_value=(b"mocked_salt", b"mocked_hash")) as mock_hash_password:  # noqa
-                settings.update_password(mock_conn, password, initials)
-                mock_get_person_id.assert_called_once()
-                mock_generate_table_settings.assert_called_once()
-                mock_hash_password.assert_called_once()
+        with patch.object(settings, "hash_password", return_value=(b"mocked_salt", b"mocked_hash")) as mock_hash_password:  # noqa
+            settings.update_password(mock_conn, password, initials)
+            mock_get_person_id.assert_called_once()
+            mock_hash_password.assert_called_once()
 
 
 # ######## change password ####################################################
@@ -391,3 +368,23 @@ def test_settings_show_my_table(mock_conn):
     with patch.object(settings, "show_my_table", return_value=None) as mock_show_my_table:  # noqa
         menu_settings.show_settings(mock_conn, person_id)
         mock_show_my_table.assert_called_once()
+
+
+def test_settings_update_password_stores_params(mock_conn, monkeypatch):
+    created_by = "test_func"
+    language = "de"
+    person_id = 1
+    initials = "tt"
+
+    ensure_schema(mock_conn)
+    with patch.object(settings, "check_if_internal", return_value=True):
+        settings.add_settings(mock_conn, created_by, language, person_id, initials)  # noqa
+
+    monkeypatch.setenv("BUHA_HASHING_PROFILE", "fast")
+    with patch.object(settings, "get_person_id", return_value=person_id):
+        settings.update_password(mock_conn, "new_password", initials)
+
+    query = "SELECT hash_algorithm, hash_iterations FROM settings WHERE initials = ?"  # noqa
+    row = mock_conn.execute(query, (initials,)).fetchone()
+    assert row == ("pbkdf2_sha256", 1000)
+    assert login.password_correct(mock_conn, initials, "new_password")
@@ -126,3 +126,16 @@ def test_shared_language_not_de(capsys):
     actual, _ = capsys.readouterr()
 
     assert actual == expected
+
+
+# ######## name key ###########################################################
+
+def test_shared_normalize_name():
+    assert shared.normalize_name("  Jon \t Eric ") == "jon eric"
+    assert shared.normalize_name("STRAẞE") == "strasse"
+    assert shared.normalize_name(None) == ""
+
+
+def test_shared_name_key():
+    assert shared.name_key("Jon", None, "Outsh") == "jon||outsh"
+    assert shared.name_key("Jon", "D.  E.", "Outsh") == "jon|d. e.|outsh"
@@ -66,10 +66,6 @@ def display_wo_change():
 
 @pytest.fixture
 def reset_parent_class_menu():
-    Menu.last_caller_module = None
-    Menu.current_caller_module = None
-    Menu.navigation_stack = []
-
     return Menu
 
 
@@ -77,9 +73,8 @@ def reset_parent_class_menu():
 
 def test_start_menu_reset(reset_parent_class_menu):
     menu = reset_parent_class_menu()
-    assert menu.last_caller_module is None
-    assert menu.current_caller_module is None
-    assert menu.navigation_stack == []
+    assert menu.navigation.stack == []
+    assert menu.navigation.shown is None
 
 
 # ######## MenuName class #####################################################
@@ -87,10 +82,7 @@ def test_start_menu_reset(reset_parent_class_menu):
 def test_start_menu_class_init(reset_parent_class_menu):
     reset_parent_class_menu()
     menu_start = MenuStart()
-    if menu_start.last_caller_module == "start":
-        assert False
-    assert menu_start.current_caller_module == "src.buha.scripts.start"
-    assert menu_start.navigation_stack == ["start"]
+    assert menu_start.navigation.stack == ["start"]
 
 
 def test_start_menu_display_menu(mocker, capsys, display_with_change):
@@ -148,6 +140,7 @@ def test_start_menu_run_action_triggers_change_menu(mocker):
 @patch("builtins.input", return_value="not valid")
 def test_start_menu_run_get_choice_not_valid(mocker, capsys, display_wo_change):  # noqa
     menu_start = MenuStart()
+    menu_start.navigation.shown = "start"  # headline on screen
     company_name = "Test & Co.   "
     language = "de"
     created_by = "tester"
@@ -178,7 +171,7 @@ def test_start_menu_run_choice_is_4(mock_conn):
     menu_start = MenuStart()
 
     with patch("builtins.input", side_effect=["4", "1", "9", "9"]) as mock_input:  # noqa
-        with patch("buha.scripts.start.MenuSettings.run", autoinspec=True) as mock_settings:  # noqa
+        with patch("buha.scripts.settings.MenuSettings.run", autoinspec=True) as mock_settings:  # noqa
             menu_start.run(mock_conn, created_by, company_name, language)
 
             assert mock_input.call_count == 4
@@ -197,3 +190,28 @@ def test_start_menu_run_choice_is_5(mock_conn):
 
             assert mock_input.call_count == 4
             mock_login.assert_called_once()
+
+
+def test_start_menu_submenu_shares_navigation(mock_conn):
+    menu_start = MenuStart()
+    stacks = []
+
+    def record(menu, *args):
+        stacks.append(list(menu.navigation.stack))
+
+    with patch("builtins.input", side_effect=["4", "9"]):
+        with patch("buha.scripts.settings.MenuSettings.run", autospec=True, side_effect=record):  # noqa
+            menu_start.run(mock_conn, "test_func", "Test & Co.", "de")
+
+    assert stacks == [["start", "settings"]]
+
+
+def test_start_menu_logout_resets_navigation(mock_conn):
+    menu_start = MenuStart()
+    menu_start.navigation.shown = "start"
+
+    with patch("buha.scripts.start.LoginMenu.run", return_value=(False, None)):  # noqa
+        menu_start.logout(mock_conn, "tt", "Test & Co.", "de")
+
+    assert menu_start.navigation.stack == ["login"]
+    assert menu_start.navigation.shown is None
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_startup.py
+"""Startup time of buha: "import main" stays within the budget configured in
+buha.ini and does not load modules that only some menus need."""
+
+import os
+import subprocess
+import sys
+
+from context import config
+
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+# loaded on first use, never by "import main"
+lazy_modules = [
+    "fuzzywuzzy",
+    "prettytable",
+    "hashlib",
+    "getpass",
+    "src.buha.scripts.person",
+    "src.buha.scripts.new_entry",
+    "src.buha.scripts.settings",
+]
+
+
+def import_time_us() -> int:
+    """Cumulative import time of main in microseconds, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],  # noqa
+                            cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    for line in reversed(result.stderr.splitlines()):
+        _, cumulative_us, module = line.split("|")
+        if module.strip() == "main":
+            return int(cumulative_us)
+    raise AssertionError("main not found in -X importtime output")
+
+
+def test_startup_within_budget():
+    budget_us = config.get_int("startup", "import_budget_ms") * 1000
+    # best of three, a busy machine should not fail the test
+    assert min(import_time_us() for _ in range(3)) <= budget_us
+
+
+def test_startup_lazy_modules():
+    code = "import sys, main; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    assert [module for module in lazy_modules if module in loaded] == []